@@ -0,0 +1,217 @@
+"""
+In-process audio playback for Jarvis
+One playback thread fed by a queue. Clips are written to the output device in
+small blocks, so stop() takes effect within a few milliseconds and drops
+anything queued behind the current clip. Uses PyAudio when installed and
+winsound on Windows otherwise; with no output device, playback is simulated
+in real time so the rest of the pipeline behaves the same (headless, tests).
+The level of everything played is kept as a reference for echo suppression
+(main/barge_in.py).
+"""
+import io
+import logging
+import platform
+import queue
+import threading
+import time
+import wave
+from collections import deque
+
+from main.capture import frame_rms
+
+PYAUDIO_AVAILABLE = False
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    pass
+
+# PyAV (installed with faster-whisper) decodes compressed audio (Opus/MP3)
+AV_AVAILABLE = False
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    pass
+
+BLOCK_SECONDS = 0.05
+
+
+def read_wav(data: bytes):
+    """(pcm_bytes, sample_rate, sample_width, channels) from WAV bytes"""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        return wav.readframes(wav.getnframes()), wav.getframerate(), wav.getsampwidth(), wav.getnchannels()
+
+
+def pcm_to_wav(pcm: bytes, rate: int, width: int = 2, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(width)
+        wav.setframerate(rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def decode_compressed(data: bytes, rate: int):
+    """Decode Ogg/Opus, MP3, ... bytes to 16-bit mono PCM at rate (needs PyAV)"""
+    container = av.open(io.BytesIO(data))
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=rate)
+    pcm = bytearray()
+    try:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                pcm += bytes(out.planes[0])[:out.samples * 2]
+        for out in resampler.resample(None):
+            pcm += bytes(out.planes[0])[:out.samples * 2]
+    finally:
+        container.close()
+    return Clip(bytes(pcm), rate)
+
+
+class Clip:
+    """Raw PCM queued for playback"""
+
+    def __init__(self, pcm: bytes, rate: int, width: int = 2, channels: int = 1):
+        self.pcm = pcm
+        self.rate = rate
+        self.width = width
+        self.channels = channels
+        self.done = threading.Event()
+
+    @classmethod
+    def from_wav(cls, data: bytes):
+        pcm, rate, width, channels = read_wav(data)
+        return cls(pcm, rate, width, channels)
+
+    @property
+    def seconds(self) -> float:
+        return len(self.pcm) / float(self.rate * self.width * self.channels)
+
+
+class AudioPlayer:
+    """Queue-fed playback thread with prompt stop()"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._playing = threading.Event()
+        self._pa = None
+        self._streams = {}
+        self._warned = False
+        # (monotonic time, RMS) of every block sent to the output: the echo reference
+        self._levels = deque(maxlen=int(10 / BLOCK_SECONDS))
+        self._thread = threading.Thread(target=self._run, name="jarvis-audio", daemon=True)
+        self._thread.start()
+
+    @property
+    def available(self) -> bool:
+        return PYAUDIO_AVAILABLE or platform.system() == "Windows"
+
+    @property
+    def is_playing(self) -> bool:
+        return self._playing.is_set()
+
+    def playback_level(self, window: float = 0.4) -> float:
+        """Loudest block played in the last window seconds (0 if silent)"""
+        since = time.monotonic() - window
+        levels = [rms for at, rms in list(self._levels) if at >= since]
+        return max(levels) if levels else 0.0
+
+    def _note_level(self, data: bytes, at: float = None):
+        self._levels.append((time.monotonic() if at is None else at, frame_rms(data)))
+
+    def play(self, clip: Clip, block: bool = True) -> Clip:
+        """Queue a clip; with block=True wait until it finished (or was stopped)"""
+        with self._lock:
+            self._queue.put((clip, self._generation))
+        if block:
+            clip.done.wait()
+        return clip
+
+    def play_wav(self, data: bytes, block: bool = True) -> Clip:
+        return self.play(Clip.from_wav(data), block)
+
+    def play_file(self, path: str, block: bool = True) -> Clip:
+        with open(path, "rb") as f:
+            return self.play_wav(f.read(), block)
+
+    def stop(self):
+        """Stop the current clip and drop queued ones"""
+        with self._lock:
+            self._generation += 1
+            now = time.monotonic()
+            # Levels scheduled ahead for a clip that will no longer play
+            while self._levels and self._levels[-1][0] > now:
+                self._levels.pop()
+        if not PYAUDIO_AVAILABLE and platform.system() == "Windows":
+            import winsound
+            winsound.PlaySound(None, winsound.SND_PURGE)
+
+    def _stream(self, clip: Clip):
+        key = (clip.rate, clip.width, clip.channels)
+        if key not in self._streams:
+            if self._pa is None:
+                self._pa = pyaudio.PyAudio()
+            self._streams[key] = self._pa.open(
+                format=self._pa.get_format_from_width(clip.width),
+                channels=clip.channels, rate=clip.rate, output=True
+            )
+        return self._streams[key]
+
+    def _play_now(self, clip: Clip, generation: int):
+        if PYAUDIO_AVAILABLE:
+            stream = self._stream(clip)
+            block = int(clip.rate * BLOCK_SECONDS) * clip.width * clip.channels
+            for offset in range(0, len(clip.pcm), block):
+                if generation != self._generation:
+                    return
+                self._note_level(clip.pcm[offset:offset + block])
+                stream.write(clip.pcm[offset:offset + block])
+        elif platform.system() == "Windows":
+            import winsound
+            self._schedule_levels(clip)
+            winsound.PlaySound(pcm_to_wav(clip.pcm, clip.rate, clip.width, clip.channels), winsound.SND_MEMORY)
+        else:
+            if not self._warned:
+                logging.warning("No audio output available (install PyAudio); playback is simulated")
+                self._warned = True
+            self._schedule_levels(clip)
+            end = time.monotonic() + clip.seconds
+            while generation == self._generation and time.monotonic() < end:
+                time.sleep(min(BLOCK_SECONDS, max(0.0, end - time.monotonic())))
+
+    def _schedule_levels(self, clip: Clip):
+        """Reference levels for a clip handed to the output in one piece"""
+        block = int(clip.rate * BLOCK_SECONDS) * clip.width * clip.channels
+        start = time.monotonic()
+        for i, offset in enumerate(range(0, len(clip.pcm), block)):
+            self._note_level(clip.pcm[offset:offset + block], start + i * BLOCK_SECONDS)
+
+    def _run(self):
+        while True:
+            clip, generation = self._queue.get()
+            try:
+                if generation == self._generation:
+                    self._playing.set()
+                    self._play_now(clip, generation)
+            except Exception as e:
+                logging.error(f"Audio playback error: {e}")
+            finally:
+                if self._queue.empty():
+                    self._playing.clear()
+                clip.done.set()
+
+
+_player = None
+_player_lock = threading.Lock()
+
+
+def get_player() -> AudioPlayer:
+    """Shared player, started on first use"""
+    global _player
+    with _player_lock:
+        if _player is None:
+            _player = AudioPlayer()
+        return _player
@@ -0,0 +1,208 @@
+"""
+Barge-in for Jarvis
+The microphone keeps running while Jarvis speaks, so the user can cut off a
+long answer by talking over it:
+
+  vad      - the user's voice, louder than the echo of the speakers, for
+             BARGE_IN_MS stops speech immediately (default)
+  wakeword - only the enrolled wake word stops speech (most robust when the
+             speakers are loud)
+  off      - answers always play to the end
+
+Echo suppression: the player keeps the level of everything it plays
+(main/audio.py). The speaker-to-mic gain is calibrated on the first
+ECHO_CALIBRATION seconds of every playback (the user rarely talks over
+Jarvis's first syllables), so loud speakers are learned at once. Mic frames
+whose level is explained by that playback times the gain are attenuated to the noise floor before any
+consumer (VAD, wake word, STT) sees them; frames clearly louder than the
+echo pass through untouched. Local TTS engines play outside the player, so
+while they speak only the wake word can interrupt.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from array import array
+
+from main.audio import get_player
+from main.capture import get_capture, frame_rms
+from main.vad import NoiseProfile, make_vad
+from main.wakeword import WakeWordDetector
+
+BARGE_IN = os.getenv("BARGE_IN", "vad").lower()  # vad | wakeword | off
+BARGE_IN_MS = int(os.getenv("BARGE_IN_MS", "200"))
+ECHO_SUPPRESSION = os.getenv("ECHO_SUPPRESSION", "true").lower() == "true"
+
+ECHO_MARGIN = 2.0     # Mic must be this much louder than the expected echo to count as the user
+ECHO_WINDOW = 0.4     # Seconds of playback history covering the output / room delay
+ECHO_CALIBRATION = 0.3  # Seconds at the start of each playback whose mic level is taken as pure echo
+
+
+def _scale(frame: bytes, factor: float) -> bytes:
+    samples = array("h", frame)
+    return array("h", (int(s * factor) for s in samples)).tobytes()
+
+
+class EchoSuppressor:
+    """Capture filter attenuating mic frames explained by the speakers' output"""
+
+    def __init__(self, player=None, margin: float = ECHO_MARGIN, window: float = ECHO_WINDOW,
+                 calibration: float = ECHO_CALIBRATION):
+        self.player = player or get_player()
+        self.margin = margin
+        self.window = window
+        self.calibration = calibration
+        self.gain = 1.0     # Mic RMS per unit of playback RMS, learned during playback
+        self.floor = None   # Mic RMS while nothing plays
+        self.suppressed = 0
+        self.calibrated = False
+        self._playing_since = None
+        self._ratios = []   # Mic / playback level during the current calibration
+
+    def expected_echo(self) -> float:
+        return self.gain * self.player.playback_level(self.window)
+
+    def __call__(self, frame: bytes) -> bytes:
+        rms = frame_rms(frame)
+        reference = self.player.playback_level(self.window)
+        if reference <= 0:
+            self._playing_since = None
+            if self.floor is None:
+                self.floor = rms
+            else:
+                # Falls quickly, rises slowly: tracks the quiet room, not the user
+                self.floor += (0.2 if rms < self.floor else 0.01) * (rms - self.floor)
+            return frame
+        now = time.monotonic()
+        if self._playing_since is None:
+            self._playing_since = now
+            self._ratios = []
+        if now - self._playing_since < self.calibration:
+            self._ratios.append(rms / reference)
+            return self._attenuate(frame, rms)
+        if self._ratios:
+            self._calibrate()
+        if rms > self.margin * self.gain * reference:
+            return frame
+        # Fine-tunes the calibrated gain between clips (tracks volume changes downwards too)
+        self.gain = max(0.01, 0.95 * self.gain + 0.05 * rms / reference)
+        return self._attenuate(frame, rms)
+
+    def _calibrate(self):
+        """Gain from the median mic/playback ratio at the start of this playback"""
+        ratios, self._ratios = sorted(self._ratios), []
+        measured = ratios[len(ratios) // 2]
+        # The first clip sets the gain; later ones move it halfway, so one noisy start cannot ruin it
+        self.gain = max(0.01, measured if not self.calibrated else 0.5 * (self.gain + measured))
+        self.calibrated = True
+
+    def _attenuate(self, frame: bytes, rms: float) -> bytes:
+        self.suppressed += 1
+        target = self.floor or 0.0
+        if rms <= target:
+            return frame
+        return _scale(frame, target / rms)
+
+
+def enable_echo_suppression(capture=None, player=None):
+    """Install echo suppression on the shared capture (once)"""
+    capture = capture or get_capture()
+    if not isinstance(capture.filter, EchoSuppressor):
+        capture.filter = EchoSuppressor(player)
+        logging.info("[OK] Echo suppression enabled")
+    return capture.filter
+
+
+class BargeInMonitor:
+    """Watches the mic while Jarvis speaks and calls stop() when the user talks over it"""
+
+    def __init__(self, is_speaking, stop, capture=None, player=None, mode: str = BARGE_IN,
+                 wake_word=None, min_ms: int = BARGE_IN_MS):
+        self.is_speaking = is_speaking
+        self.stop_speech = stop
+        self.capture = capture or get_capture()
+        self.player = player or get_player()
+        self.mode = mode
+        self.wake_word = None
+        if mode == "wakeword":
+            if wake_word:
+                # Own detector state: the idle-mode detector keeps its own
+                self.wake_word = WakeWordDetector(wake_word.templates, wake_word.threshold, capture=self.capture)
+            else:
+                logging.warning("[Warning] BARGE_IN=wakeword needs an enrolled wake word, using vad")
+                self.mode = "vad"
+        self.vad = make_vad(NoiseProfile())
+        self.min_frames = max(1, min_ms // self.capture.frame_ms)
+        self.last_trigger = 0.0
+        self._frames = None
+        self._voiced = 0
+        self._armed = True
+
+    def start(self):
+        if self.mode == "vad" and not isinstance(self.capture.filter, EchoSuppressor):
+            # Without it our own voice would count as the user's
+            logging.warning("[Warning] BARGE_IN=vad needs ECHO_SUPPRESSION, barge-in disabled")
+            self.mode = "off"
+        if self.mode == "off" or self._frames is not None:
+            return
+        self.capture.start()
+        self._frames = self.capture.subscribe()
+        threading.Thread(target=self._run, args=(self._frames,), name="jarvis-barge-in", daemon=True).start()
+        logging.info(f"[OK] Barge-in enabled ({self.mode})")
+
+    def stop(self):
+        frames, self._frames = self._frames, None
+        if frames is not None:
+            self.capture.unsubscribe(frames)
+            frames.put(None)
+
+    def triggered_within(self, seconds: float) -> bool:
+        return time.monotonic() - self.last_trigger < seconds
+
+    def _trigger(self, reason: str):
+        self.last_trigger = time.monotonic()
+        self._armed = False
+        self._voiced = 0
+        print(f"\n🛑 Interrupted ({reason})")
+        logging.info(f"Barge-in: {reason}")
+        self.stop_speech()
+
+    def push(self, frame: bytes) -> bool:
+        """Feed one (echo-suppressed) frame; True if it interrupted speech"""
+        if not self.is_speaking():
+            # Re-arm once the interrupted (or finished) answer is gone
+            self._armed = True
+            self._voiced = 0
+            return False
+        if not self._armed:
+            return False
+
+        if self.mode == "wakeword":
+            if self.wake_word.push(frame):
+                self._trigger("wake word")
+                return True
+            return False
+
+        if self.player.playback_level() <= 0:
+            # Local TTS plays outside the player: no echo reference, can't tell voices apart
+            self._voiced = 0
+            return False
+        if self.vad.is_speech(frame, frame_rms(frame)):
+            self._voiced += 1
+            if self._voiced >= self.min_frames:
+                self._trigger("voice")
+                return True
+        else:
+            self._voiced = 0
+        return False
+
+    def _run(self, frames: queue.Queue):
+        while True:
+            frame = frames.get()
+            if frame is None:
+                break
+            try:
+                self.push(frame)
+            except Exception as e:
+                logging.error(f"Barge-in error: {e}")
@@ -0,0 +1,163 @@
+"""
+Continuous microphone capture for Jarvis
+The microphone is opened once and a thread reads fixed-size frames (16 kHz,
+16-bit mono) into a ring buffer. Consumers (streaming recognizers, the local
+endpointer) subscribe to get every new frame on their own queue, optionally
+starting with a little history from the ring buffer. Frames can also be fed
+in from elsewhere (WAV files, tests) with feed().
+"""
+import logging
+import math
+import os
+import queue
+import threading
+from array import array
+from collections import deque
+
+PYAUDIO_AVAILABLE = False
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    pass
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+FRAME_MS = 30
+CAPTURE_BUFFER_SECONDS = int(os.getenv("CAPTURE_BUFFER_SECONDS", "30"))
+MIC_DEVICE_INDEX = os.getenv("MIC_DEVICE_INDEX")
+
+
+def frame_rms(frame: bytes) -> float:
+    """RMS energy of a 16-bit PCM frame"""
+    samples = array("h", frame[:len(frame) - len(frame) % 2])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class AudioCapture:
+    """Mic capture thread + ring buffer + per-consumer frame queues"""
+
+    def __init__(self, rate: int = SAMPLE_RATE, frame_ms: int = FRAME_MS,
+                 buffer_seconds: int = CAPTURE_BUFFER_SECONDS, device_index=None):
+        self.rate = rate
+        self.frame_ms = frame_ms
+        self.frame_samples = rate * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * SAMPLE_WIDTH
+        self.device_index = device_index if device_index is not None else (
+            int(MIC_DEVICE_INDEX) if MIC_DEVICE_INDEX else None)
+        self._ring = deque(maxlen=buffer_seconds * 1000 // frame_ms)
+        self._frames = 0
+        self._subscribers = []
+        # Optional frame -> frame function applied before anything sees the audio (echo suppression)
+        self.filter = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self._pa = None
+        self._stream = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def frame_count(self) -> int:
+        """Frames captured so far (a running clock in frame_ms steps)"""
+        return self._frames
+
+    def start(self):
+        """Open the microphone (once) and start the capture thread"""
+        with self._lock:
+            if self._running:
+                return
+            if not PYAUDIO_AVAILABLE:
+                raise RuntimeError("PyAudio not installed")
+            self._pa = pyaudio.PyAudio()
+            self._stream = self._pa.open(
+                format=pyaudio.paInt16, channels=1, rate=self.rate, input=True,
+                frames_per_buffer=self.frame_samples, input_device_index=self.device_index
+            )
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="jarvis-capture", daemon=True)
+            self._thread.start()
+        logging.info(f"[OK] Microphone capture started ({self.rate} Hz, {self.frame_ms} ms frames)")
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+        if self._stream:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+        if self._pa:
+            self._pa.terminate()
+            self._pa = None
+
+    def _run(self):
+        while self._running:
+            try:
+                frame = self._stream.read(self.frame_samples, exception_on_overflow=False)
+            except Exception as e:
+                logging.error(f"[ERROR] Microphone read failed: {e}")
+                self._running = False
+                break
+            self.feed(frame)
+
+    def feed(self, frame: bytes):
+        """Publish one frame to the ring buffer and all subscribers"""
+        if self.filter:
+            frame = self.filter(frame)
+        with self._lock:
+            self._ring.append(frame)
+            self._frames += 1
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(frame)
+            except queue.Full:
+                # A slow consumer loses its oldest audio, never the capture thread
+                try:
+                    q.get_nowait()
+                    q.put_nowait(frame)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def subscribe(self, history_ms: int = 0, max_seconds: int = 10) -> queue.Queue:
+        """Queue receiving every new frame, prefilled with history_ms of recent audio"""
+        q = queue.Queue(maxsize=max_seconds * 1000 // self.frame_ms)
+        with self._lock:
+            count = min(len(self._ring), history_ms // self.frame_ms)
+            for frame in list(self._ring)[len(self._ring) - count:]:
+                q.put_nowait(frame)
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def recent(self, ms: int) -> bytes:
+        """The last ms of audio from the ring buffer"""
+        with self._lock:
+            count = min(len(self._ring), ms // self.frame_ms)
+            return b"".join(list(self._ring)[len(self._ring) - count:])
+
+
+_capture = None
+_capture_lock = threading.Lock()
+
+
+def get_capture() -> AudioCapture:
+    """Shared capture (the microphone is opened by start(), once)"""
+    global _capture
+    with _capture_lock:
+        if _capture is None:
+            _capture = AudioCapture()
+        return _capture
@@ -0,0 +1,106 @@
+"""
+Retrieval-augmented context for Jarvis
+Looks up relevant memories before the agent runs and packs them into the
+system prompt under a token budget, so personalization costs one local
+vector query instead of an extra recall_memory round-trip to the LLM.
+"""
+import os
+import logging
+
+# Token budget for injected memories (estimated, see estimate_tokens)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("MEMORY_CONTEXT_TOKENS", "256"))
+# Chroma L2 distance above which a hit is considered unrelated
+CONTEXT_MAX_DISTANCE = float(os.getenv("MEMORY_CONTEXT_MAX_DISTANCE", "1.2"))
+# How long process_message waits for retrieval before going without it
+CONTEXT_TIMEOUT = float(os.getenv("MEMORY_CONTEXT_TIMEOUT", "0.5"))
+
+CONTEXT_HEADER = "Relevant things you remember about the user (use them if helpful):"
+CHAT_SYSTEM_PROMPT = "You are Jarvis, a helpful AI assistant. Answer concisely in 1-2 sentences."
+
+CONTEXT_AVAILABLE = False
+try:
+    from tools.memory import search_memory_hits, MEMORY_AVAILABLE as CONTEXT_AVAILABLE
+except ImportError:
+    pass
+except Exception as e:
+    logging.warning(f"⚠️ Memory context unavailable: {e}")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English).
+    Good enough for budgeting without loading a tokenizer.
+    """
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+def pack_context(hits: list, budget: int = CONTEXT_TOKEN_BUDGET,
+                 max_distance: float = CONTEXT_MAX_DISTANCE) -> str:
+    """
+    Pack the closest hits into a prompt block that fits the token budget.
+    Hits that do not fit are skipped so shorter ones further down can still be used.
+
+    Args:
+        hits: List of {"text", "source", "distance"} dicts
+        budget: Maximum estimated tokens for the whole block
+        max_distance: Drop hits further away than this
+
+    Returns:
+        Context block, or "" if nothing relevant fits
+    """
+    used = estimate_tokens(CONTEXT_HEADER)
+    lines = []
+    seen = set()
+
+    for hit in sorted(hits, key=lambda h: h.get("distance", 0.0)):
+        if hit.get("distance", 0.0) > max_distance:
+            break
+        text = " ".join(hit["text"].split())
+        if not text or text in seen:
+            continue
+        line = f"- {text}"
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            continue
+        lines.append(line)
+        seen.add(text)
+        used += cost
+
+    if not lines:
+        return ""
+    return CONTEXT_HEADER + "\n" + "\n".join(lines)
+
+
+def build_memory_context(query: str, budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Retrieve memories and past conversations for a query and pack them.
+
+    Returns:
+        Context block for the system prompt, or "" if memory is unavailable
+    """
+    if not CONTEXT_AVAILABLE or not query:
+        return ""
+    try:
+        return pack_context(search_memory_hits(query), budget)
+    except Exception as e:
+        logging.error(f"Memory context error: {e}")
+        return ""
+
+
+def chat_messages(message: str, memory_context: str = None) -> list:
+    """
+    System + user messages for a plain chat turn (no tools).
+    memory_context=None retrieves it here; pass "" to go without.
+    """
+    from langchain_core.messages import HumanMessage, SystemMessage
+    if memory_context is None:
+        memory_context = build_memory_context(message)
+    system_prompt = CHAT_SYSTEM_PROMPT
+    if memory_context:
+        system_prompt += "\n\n" + memory_context
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=message)
+    ]
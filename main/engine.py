@@ -1,11 +1,15 @@
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate
 from main.llm import init_llm, llm, ollama_client, OLLAMA_MODEL
+from main.health import BackendUnavailable
+from main.model_router import SMALL, LARGE, model_supports_tools
 from main.vision import VISION_AVAILABLE
 from main.tts import speak_local
 from main.utils import is_refusal, choose_best_sentence
+from main.context import build_memory_context, chat_messages, CONTEXT_AVAILABLE, CONTEXT_TIMEOUT
 
 # Import tools
 from tools.time import get_time
@@ -33,7 +37,7 @@ except ImportError:
 # Journal system
 JOURNAL_AVAILABLE = False
 try:
-    from tools.journal import log_project_day, get_project_day, get_day_accomplishments, get_today_summary, get_project_summary
+    from tools.journal import log_project_day, get_project_day, get_day_accomplishments, get_today_summary, get_project_summary, search_journal
     JOURNAL_AVAILABLE = True
 except ImportError:
     pass
@@ -65,7 +69,8 @@ except ImportError:
 # Reminders & Timers
 REMINDERS_AVAILABLE = False
 try:
-    from tools.reminders import set_reminder, set_timer, quick_timer
+    from tools.reminders import set_reminder, set_timer, quick_timer, list_reminders, cancel_reminder, set_reminder_at, schedule_reminder
+    from tools.time_parser import parse_reminder_request
     REMINDERS_AVAILABLE = True
 except ImportError:
     pass
@@ -97,7 +102,7 @@ except ImportError:
 # Calendar
 CALENDAR_AVAILABLE = False
 try:
-    from tools.calendar_tool import add_calendar_event, check_schedule, list_upcoming_events, delete_calendar_event
+    from tools.calendar_tool import add_calendar_event, check_schedule, list_upcoming_events, delete_calendar_event, add_recurring_event, move_event_occurrence, delete_recurring_event, import_ics, export_ics
     CALENDAR_AVAILABLE = True
 except ImportError:
     pass
@@ -133,15 +138,23 @@ if VISION_AVAILABLE:
 class JarvisEngine:
     def __init__(self):
         self.agent_executor = None
+        self.agent_kind = None
         self.llm = None
+        self.small_llm = None
+        self.router = None
         self.tools = []
+        # Memory retrieval runs here while the message is being routed
+        self._retrieval_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="jarvis-context")
         self.initialize()
 
     def initialize(self):
         # Initialize LLM
         init_llm()
-        from main.llm import llm as initialized_llm
+        from main.llm import llm as initialized_llm, small_llm, model_router
         self.llm = initialized_llm
+        self.small_llm = small_llm
+        # Easy turns go to the small local model, the rest to the remote one
+        self.router = model_router()
         
         # Prepare tools
         self.tools = [
@@ -165,7 +178,7 @@ class JarvisEngine:
             self.tools.extend([remember_fact, recall_memory, store_conversation, get_conversation_context])
         
         if JOURNAL_AVAILABLE:
-            self.tools.extend([log_project_day, get_project_day, get_day_accomplishments, get_today_summary, get_project_summary])
+            self.tools.extend([log_project_day, get_project_day, get_day_accomplishments, get_today_summary, get_project_summary, search_journal])
             
         if VISION_AVAILABLE:
             self.tools.extend([analyze_screen, analyze_image])
@@ -180,7 +193,7 @@ class JarvisEngine:
             self.tools.extend([get_weather, get_detailed_weather])
             
         if REMINDERS_AVAILABLE:
-            self.tools.extend([set_reminder, set_timer, quick_timer])
+            self.tools.extend([set_reminder, set_timer, quick_timer, list_reminders, cancel_reminder, set_reminder_at])
             
         if YOUTUBE_AVAILABLE:
             self.tools.extend([search_youtube, play_youtube, open_youtube_video, youtube_music])
@@ -192,7 +205,7 @@ class JarvisEngine:
             self.tools.extend([send_email, read_latest_emails, check_unread_count])
             
         if CALENDAR_AVAILABLE:
-            self.tools.extend([add_calendar_event, check_schedule, list_upcoming_events, delete_calendar_event])
+            self.tools.extend([add_calendar_event, check_schedule, list_upcoming_events, delete_calendar_event, add_recurring_event, move_event_occurrence, delete_recurring_event, import_ics, export_ics])
             
         if MUSIC_AVAILABLE:
             self.tools.extend([play_spotify_song, control_music_playback, get_current_track, set_music_volume])
@@ -211,18 +224,19 @@ When the user greets you (hello, hi, hey, jarvis), respond briefly and warmly.
 Always be concise and helpful. Use tools when needed to answer questions accurately.
 If you need to search the web, take screenshots, or check time zones, use the appropriate tools.
 
-Important: Keep responses conversational and natural."""),
+Important: Keep responses conversational and natural.
+
+{memory_context}"""),
             ("human", "{input}"),
             ("placeholder", "{agent_scratchpad}"),
         ])
 
         try:
             if self.llm:
-                # Check if using phi model (fast but simple)
+                # Models like phi can't call tools: remote turns then use plain chat
                 model_name = os.getenv('OLLAMA_MODEL', 'phi')
-                use_simple_mode = 'phi' in model_name.lower()
                 
-                if use_simple_mode:
+                if not model_supports_tools(model_name):
                     self.agent_executor = None
                 elif not hasattr(self.llm, 'bind_tools') or 'OllamaProxyAdapter' in str(type(self.llm)):
                     from langchain.agents import create_react_agent, AgentExecutor as ReactAgentExecutor
@@ -236,6 +250,7 @@ Important: Keep responses conversational and natural."""),
                         handle_parsing_errors=True,
                         max_iterations=15
                     )
+                    self.agent_kind = "react"
                 else:
                     agent = create_tool_calling_agent(self.llm, self.tools, prompt)
                     self.agent_executor = AgentExecutor(
@@ -245,39 +260,151 @@ Important: Keep responses conversational and natural."""),
                         handle_parsing_errors=True,
                         max_iterations=15
                     )
+                    self.agent_kind = "tools"
         except Exception as e:
             logging.error(f"Could not create agent: {e}")
             self.agent_executor = None
 
-    def process_message(self, message: str) -> str:
-        if not message:
+    def _collect_context(self, future) -> str:
+        """Wait briefly for memory retrieval; answer without it if it is slow"""
+        if future is None:
             return ""
-            
-        # Basic greetings
+        try:
+            return future.result(timeout=CONTEXT_TIMEOUT)
+        except FutureTimeoutError:
+            logging.info("Memory context not ready in time, continuing without it")
+            future.cancel()
+        except Exception as e:
+            logging.error(f"Memory context error: {e}")
+        return ""
+
+    def _is_greeting(self, message: str) -> bool:
         lower_input = message.lower()
-        if any(word in lower_input for word in ['hello', 'hi', 'hey', 'jarvis']) and len(message.split()) < 5:
-            return "Yes sir, how can I help you?"
+        return any(word in lower_input for word in ['hello', 'hi', 'hey', 'jarvis']) and len(message.split()) < 5
+
+    def _chat_llm(self, decision):
+        """Model answering this turn as plain chat, or None if the agent handles it"""
+        if decision.tier == SMALL and self.small_llm:
+            return self.small_llm
+        if not self.agent_executor:
+            return self.llm
+        return None
+
+    def _chat(self, llm, message: str, memory_context: str) -> str:
+        result = llm.invoke(chat_messages(message, memory_context))
+        return result.content if hasattr(result, 'content') else str(result)
+
+    def _small_fallback(self, message: str, memory_context: str, decision, error):
+        """Answer with the small model after the remote one failed; None if it cannot"""
+        if not self.small_llm or decision.tier == SMALL:
+            return None  # No small model, or it already failed on this turn
+        logging.info(f"{error}; answering with the small model")
+        try:
+            return self._chat(self.small_llm, message, memory_context)
+        except Exception as small_error:
+            self.router.small_failed()
+            logging.error(f"Small model error: {small_error}")
+            return None
+
+    def _answer(self, message: str, memory_context: str, decision) -> str:
+        if decision.tier == SMALL and self.small_llm:
+            try:
+                return self._chat(self.small_llm, message, memory_context)
+            except Exception as e:
+                logging.warning(f"[Warning] Small model failed, using the remote model: {e}")
+                self.router.small_failed()
 
         if self.agent_executor:
             try:
-                result = self.agent_executor.invoke({"input": message})
+                if self.agent_kind == "react":
+                    # The hub ReAct prompt has no system slot, so prepend to the question
+                    agent_input = f"{memory_context}\n\n{message}" if memory_context else message
+                    result = self.agent_executor.invoke({"input": agent_input})
+                else:
+                    result = self.agent_executor.invoke({"input": message, "memory_context": memory_context})
                 if isinstance(result, dict):
                     return result.get('output') or result.get('result') or str(result)
                 return str(result)
             except Exception as e:
-                logging.error(f"Agent error: {e}")
-                return f"I encountered an error: {str(e)}"
+                # Open circuit or a dead tunnel (connection errors): the small model still answers
+                if not isinstance(e, BackendUnavailable):
+                    logging.error(f"Agent error: {e}")
+                fallback = self._small_fallback(message, memory_context, decision, e)
+                return fallback if fallback is not None else f"I encountered an error: {str(e)}"
         elif self.llm:
             # Simple mode
             try:
-                from langchain_core.messages import HumanMessage, SystemMessage
-                messages = [
-                    SystemMessage(content="You are Jarvis, a helpful AI assistant. Answer concisely in 1-2 sentences."),
-                    HumanMessage(content=message)
-                ]
-                result = self.llm.invoke(messages)
-                return result.content if hasattr(result, 'content') else str(result)
+                return self._chat(self.llm, message, memory_context)
             except Exception as e:
-                return f"Error: {str(e)}"
+                # Dead tunnel: the small local model still answers
+                fallback = self._small_fallback(message, memory_context, decision, e)
+                return fallback if fallback is not None else f"Error: {str(e)}"
         else:
             return "I am currently offline or unable to access my brain."
+
+    def process_message(self, message: str) -> str:
+        if not message:
+            return ""
+
+        # Reminders with a recognizable time are parsed locally - no LLM round-trip
+        if REMINDERS_AVAILABLE and "remind me" in message.lower():
+            request = parse_reminder_request(message)
+            if request:
+                return schedule_reminder(*request)
+
+        # Start memory retrieval alongside the intent check
+        context_future = None
+        if CONTEXT_AVAILABLE and (self.agent_executor or self.llm or self.small_llm):
+            context_future = self._retrieval_pool.submit(build_memory_context, message)
+            
+        # Basic greetings
+        if self._is_greeting(message):
+            if context_future:
+                context_future.cancel()
+            return "Yes sir, how can I help you?"
+
+        decision = self.router.route(message)
+        memory_context = self._collect_context(context_future)
+        return self._answer(message, memory_context, decision)
+
+    def stream_message(self, message: str):
+        """
+        Like process_message, but yields the reply in chunks as the model
+        generates it (plain chat turns), so speech can start on the first
+        sentence. Agent turns and local shortcuts yield the complete reply once.
+        """
+        if not message:
+            return
+        local_shortcut = self._is_greeting(message) or (REMINDERS_AVAILABLE and "remind me" in message.lower())
+        if local_shortcut or not (self.llm or self.small_llm):
+            yield self.process_message(message)
+            return
+
+        context_future = None
+        if CONTEXT_AVAILABLE:
+            context_future = self._retrieval_pool.submit(build_memory_context, message)
+        decision = self.router.route(message)
+        memory_context = self._collect_context(context_future)
+        chat_llm = self._chat_llm(decision)
+        if chat_llm is None:
+            yield self._answer(message, memory_context, decision)
+            return
+        streamed = False
+        try:
+            for chunk in chat_llm.stream(chat_messages(message, memory_context)):
+                text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                if text:
+                    streamed = True
+                    yield text
+        except Exception as e:
+            if streamed:
+                yield f"Error: {str(e)}"
+                return
+            if chat_llm is not self.small_llm:
+                fallback = self._small_fallback(message, memory_context, decision, e)
+                yield fallback if fallback is not None else f"Error: {str(e)}"
+                return
+            # The small model failed before answering: the remote model takes the turn
+            logging.warning(f"[Warning] Small model failed, using the remote model: {e}")
+            self.router.small_failed()
+            yield self._answer(message, memory_context, decision._replace(tier=LARGE))
@@ -0,0 +1,267 @@
+"""
+Backend health for Jarvis
+A background thread probes a remote backend's /health endpoint on an
+interval, so callers read the last known status instead of paying a
+blocking request before every call. While the backend is down it is probed
+more often, so recovery is noticed quickly; callers that see a request fail
+report it and trigger an immediate re-probe.
+
+Each monitor has a circuit breaker that clients (the Ollama proxy adapter,
+remote vision) consult before sending work:
+
+  closed    - requests go through
+  open      - the probe failed or CIRCUIT_FAILURE_THRESHOLD requests failed
+              in a row: requests fail at once instead of waiting for a
+              60-120s timeout
+  half-open - CIRCUIT_RESET_SECONDS later one trial request is let through;
+              its outcome (or the next successful probe) closes or re-opens
+              the circuit
+
+Monitors are shared per URL (get_monitor), so every client of the same
+backend sees the same state and only one probe thread runs.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+
+HEALTH_INTERVAL_SECONDS = float(os.getenv("HEALTH_INTERVAL_SECONDS", "15"))
+HEALTH_OFFLINE_INTERVAL_SECONDS = 5
+HEALTH_TIMEOUT_SECONDS = 2
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+LATENCY_WINDOW = 50   # Samples kept for percentiles
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class BackendUnavailable(Exception):
+    """Raised instead of sending work to a backend whose circuit is open"""
+
+
+def health_url(ollama_host: str):
+    """/health URL for a proxied (ngrok / Flask) backend, or None if there is nothing to probe"""
+    if not ollama_host or ("ngrok" not in ollama_host and "/proxy_ollama" not in ollama_host):
+        return None
+    return ollama_host.replace("/proxy_ollama", "/health")
+
+
+def backend_down(response) -> bool:
+    """
+    True if an HTTP answer means the backend itself is not serving: a 5xx, a 404
+    (stale tunnel or wrong URL) or ngrok answering for a stopped tunnel
+    """
+    return (response.status_code >= 500 or response.status_code == 404
+            or "ngrok-error-code" in response.headers)
+
+
+class LatencyWindow:
+    """The last few latency samples of a backend, for percentiles"""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float):
+        """p-th percentile (0-100, nearest rank) in seconds, or None without samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, min(len(samples), math.ceil(p / 100 * len(samples))))
+        return samples[rank - 1]
+
+    def summary(self) -> str:
+        if not self._samples:
+            return "no samples"
+        return f"p50 {self.percentile(50):.2f}s, p95 {self.percentile(95):.2f}s ({len(self)} samples)"
+
+
+class CircuitBreaker:
+    """closed / open / half-open gate in front of one backend"""
+
+    def __init__(self, name: str = "backend", failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """May a request be sent now? Moves open -> half-open once the reset timeout passed"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # One trial request; another one is allowed if it never reports back
+            if self.state == OPEN:
+                logging.info(f"{self.name}: circuit half-open, trying one request")
+            self.state = HALF_OPEN
+            self._opened_at = time.monotonic()
+            return True
+
+    def retry_in(self) -> float:
+        """Seconds until a trial request will be allowed (0 if closed)"""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logging.info(f"[OK] {self.name}: circuit closed")
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def trip(self):
+        """Open immediately (the health probe says the backend is down)"""
+        with self._lock:
+            self._open()
+
+    def _open(self):
+        if self.state != OPEN:
+            logging.warning(f"[Warning] {self.name}: circuit open, failing fast for {self.reset_timeout:.0f}s")
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+
+
+class BackendMonitor:
+    """Last known up/down state of one HTTP backend, kept fresh by a probe thread"""
+
+    def __init__(self, url: str, interval: float = HEALTH_INTERVAL_SECONDS,
+                 offline_interval: float = HEALTH_OFFLINE_INTERVAL_SECONDS,
+                 timeout: float = HEALTH_TIMEOUT_SECONDS, name: str = "backend"):
+        self.url = url
+        self.interval = interval
+        self.offline_interval = offline_interval
+        self.timeout = timeout
+        self.name = name
+        self.online = None          # None until the first probe has finished
+        self.last_checked = None
+        self.last_latency = None
+        self.probe_latency = LatencyWindow()
+        self.request_latency = LatencyWindow()
+        self.breaker = CircuitBreaker(name)
+        self._wake = threading.Event()
+        self._checked = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"jarvis-health-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def check_now(self):
+        """Re-probe without waiting for the interval"""
+        self._wake.set()
+
+    def wait_checked(self, timeout: float) -> bool:
+        """Wait for the first probe result"""
+        return self._checked.wait(timeout)
+
+    @property
+    def available(self) -> bool:
+        """Worth sending work to, as far as we know (no side effects, unlike allow())"""
+        if self.breaker.state == OPEN and self.breaker.retry_in() > 0:
+            return False
+        return self.online is not False
+
+    def allow(self) -> bool:
+        """Circuit breaker check before sending a request"""
+        return self.breaker.allow()
+
+    def report_failure(self):
+        """A real request failed: assume down until the next probe says otherwise"""
+        self.breaker.record_failure()
+        self._set(False)
+        self.check_now()
+
+    def report_success(self, latency: float = None):
+        if latency is not None:
+            self.request_latency.add(latency)
+        self.breaker.record_success()
+        self._set(True)
+
+    def latency_summary(self) -> str:
+        return f"{self.name}: probe {self.probe_latency.summary()}; requests {self.request_latency.summary()}"
+
+    def probe(self) -> bool:
+        started = time.perf_counter()
+        try:
+            response = requests.head(self.url, timeout=self.timeout,
+                                     headers={"ngrok-skip-browser-warning": "true"})
+            # Only 2xx/3xx is up: a 404 means the health route is not served there, and
+            # ngrok answers for a stopped tunnel itself, with an error code header
+            ok = 200 <= response.status_code < 400 and "ngrok-error-code" not in response.headers
+        except requests.RequestException:
+            ok = False
+        self.last_latency = time.perf_counter() - started
+        self.last_checked = time.time()
+        if ok:
+            self.probe_latency.add(self.last_latency)
+        return ok
+
+    def _set(self, online: bool):
+        if online != self.online:
+            if online:
+                logging.info(f"[OK] {self.name} is online")
+            else:
+                logging.warning(f"[Warning] {self.name} is offline")
+        self.online = online
+
+    def _run(self):
+        while not self._stopped:
+            online = self.probe()
+            if online:
+                self.breaker.record_success()
+            else:
+                self.breaker.trip()
+            self._set(online)
+            self._checked.set()
+            self._wake.wait(self.interval if self.online else self.offline_interval)
+            self._wake.clear()
+
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+
+def get_monitor(url: str, name: str = "backend"):
+    """Shared, started monitor for a /health URL (None if url is empty)"""
+    if not url:
+        return None
+    with _monitors_lock:
+        monitor = _monitors.get(url)
+        if monitor is None:
+            monitor = _monitors[url] = BackendMonitor(url, name=name).start()
+        return monitor
@@ -1,21 +1,45 @@
+"""
+Speech input for Jarvis
+Audio comes from one long-lived capture thread (main/capture.py) instead of
+opening the microphone and calibrating for every utterance:
+
+  Azure   - one continuous recognizer fed through a PushAudioInputStream;
+            partial results are shown while the user is still talking; it
+            is stopped when voice mode goes back to waiting for the wake word
+  Google / Faster Whisper - utterances are cut from the frame stream by the
+            VAD (main/vad.py) and handed over in memory (AudioData / numpy
+            array), no temp files; the engines race on each utterance and
+            the first confident transcript wins (main/stt_race.py)
+
+STT_PRIMARY=race adds Azure (one-shot) to the race instead of streaming;
+STT_PRIMARY=whisper makes the local Whisper service (main/whisper_service.py)
+the first engine instead of a last resort.
+"""
 import speech_recognition as sr
+import json
 import os
-import tempfile
 import logging
-import wave
+import queue
+import threading
+import time
+from main.capture import get_capture, SAMPLE_RATE, SAMPLE_WIDTH
+from main.vad import Segmenter, VAD_PREROLL_MS, VAD_MAX_UTTERANCE_SECONDS
+from main.stt_race import SttRacer
 
 # Azure Speech SDK for STT
 try:
     import azure.cognitiveservices.speech as speechsdk
     AZURE_STT_AVAILABLE = True
-    
+
     # Initialize Azure Speech Config
     AZURE_SPEECH_KEY = os.getenv("AZURE_SPEECH_KEY")
     AZURE_REGION = os.getenv("AZURE_REGION", "southafricanorth")
-    
+
     if AZURE_SPEECH_KEY:
         azure_speech_config = speechsdk.SpeechConfig(subscription=AZURE_SPEECH_KEY, region=AZURE_REGION)
         azure_speech_config.speech_recognition_language = "en-US"
+        # Detailed results carry a confidence score (used by STT racing)
+        azure_speech_config.output_format = speechsdk.OutputFormat.Detailed
         logging.info("[OK] Azure STT initialized")
     else:
         AZURE_STT_AVAILABLE = False
@@ -24,143 +48,287 @@ except ImportError:
     AZURE_STT_AVAILABLE = False
     logging.warning("[Warning] Azure Speech SDK not available")
 
-# Fallback: Try to import Faster Whisper
-try:
-    from faster_whisper import WhisperModel
-    FASTER_WHISPER_AVAILABLE = True
-except ImportError:
-    FASTER_WHISPER_AVAILABLE = False
-    logging.warning("[Warning] faster-whisper not available")
+# Local STT (model preloaded at startup, see main/whisper_service.py)
+from main.whisper_service import get_whisper_service, pcm_to_float32, FASTER_WHISPER_AVAILABLE
+
+# azure: Azure streaming; if it is down, Google and Whisper race on each utterance
+# race: Azure, Google and Whisper race on each utterance (first confident result wins)
+# whisper: local Whisper first (offline, no per-request cost), Google as fallback
+STT_PRIMARY = os.getenv("STT_PRIMARY", "azure").lower()
+
+# Azure results older than this are dropped instead of being returned late
+MAX_RESULT_AGE_SECONDS = 10
+
+
+class AzureStreamRecognizer:
+    """One continuous Azure recognizer fed from the capture through a PushAudioInputStream"""
+
+    RETRY_SECONDS = 30
+
+    def __init__(self, capture):
+        self.capture = capture
+        self.results = queue.Queue()
+        self.on_partial = None
+        self.failed_at = None
+        self.last_partial_at = 0.0
+        self._frames = None
+        self._push = None
+        self._recognizer = None
+
+    @property
+    def running(self) -> bool:
+        return self._frames is not None
+
+    def start(self):
+        self.clear()
+        stream_format = speechsdk.audio.AudioStreamFormat(
+            samples_per_second=self.capture.rate, bits_per_sample=SAMPLE_WIDTH * 8, channels=1)
+        self._push = speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+        audio_config = speechsdk.audio.AudioConfig(stream=self._push)
+        self._recognizer = speechsdk.SpeechRecognizer(speech_config=azure_speech_config, audio_config=audio_config)
+        self._recognizer.recognizing.connect(self._on_recognizing)
+        self._recognizer.recognized.connect(self._on_recognized)
+        self._recognizer.canceled.connect(self._on_canceled)
+        self._recognizer.start_continuous_recognition_async().get()
+        self._frames = self.capture.subscribe()
+        threading.Thread(target=self._pump, args=(self._frames, self._push),
+                         name="jarvis-azure-stt", daemon=True).start()
+        logging.info("[OK] Azure streaming recognition started")
+
+    def stop(self):
+        frames, self._frames = self._frames, None
+        if frames is not None:
+            self.capture.unsubscribe(frames)
+            frames.put(None)
+        if self._recognizer:
+            self._recognizer.stop_continuous_recognition_async()
+            self._recognizer = None
+        self.clear()
+
+    def clear(self):
+        """Drop transcripts nobody asked for yet (they belong to an earlier listen)"""
+        while True:
+            try:
+                self.results.get_nowait()
+            except queue.Empty:
+                return
+
+    def _pump(self, frames, push):
+        while True:
+            frame = frames.get()
+            if frame is None:
+                break
+            push.write(frame)
+        push.close()
+
+    def _on_recognizing(self, evt):
+        self.last_partial_at = time.monotonic()
+        callback = self.on_partial
+        if callback and evt.result.text:
+            callback(evt.result.text)
+
+    def _on_recognized(self, evt):
+        if not self.running:
+            return  # Late result from a stream that was already stopped
+        if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech and evt.result.text.strip():
+            self.results.put((time.monotonic(), evt.result.text.strip()))
+
+    def _on_canceled(self, evt):
+        details = evt.cancellation_details
+        if details.reason == speechsdk.CancellationReason.Error:
+            logging.warning(f"[Warning] Azure STT stream stopped: {details.error_details}")
+            self.failed_at = time.monotonic()
+            self.stop()
+
+    def should_retry(self) -> bool:
+        return self.failed_at is None or time.monotonic() - self.failed_at > self.RETRY_SECONDS
+
+    def next_result(self, timeout: float):
+        """Next final transcript; waits past timeout while the user is still mid-sentence"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                heard_at, text = self.results.get(timeout=0.1)
+                if time.monotonic() - heard_at <= MAX_RESULT_AGE_SECONDS:
+                    return text
+                continue
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            speaking = now - self.last_partial_at < 1.0
+            if not self.running or (now > deadline and not speaking) or now > deadline + VAD_MAX_UTTERANCE_SECONDS:
+                return None
+
+
+class AzureOnceEngine:
+    """Azure one-shot recognition of a finished utterance (for racing)"""
+
+    name = "azure"
+    expected_latency = 0.8
+
+    def recognize(self, pcm: bytes, cancel):
+        stream_format = speechsdk.audio.AudioStreamFormat(
+            samples_per_second=SAMPLE_RATE, bits_per_sample=SAMPLE_WIDTH * 8, channels=1)
+        push = speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+        push.write(pcm)
+        push.close()
+        recognizer = speechsdk.SpeechRecognizer(speech_config=azure_speech_config,
+                                                audio_config=speechsdk.audio.AudioConfig(stream=push))
+        result = recognizer.recognize_once_async().get()
+        if result.reason == speechsdk.ResultReason.RecognizedSpeech:
+            try:
+                confidence = json.loads(result.json)["NBest"][0]["Confidence"]
+            except (KeyError, IndexError, TypeError, ValueError):
+                confidence = 0.9
+            return result.text, confidence
+        if result.reason == speechsdk.ResultReason.NoMatch:
+            return None
+        raise RuntimeError(f"Azure STT canceled: {result.cancellation_details.error_details}")
 
-# Initialize Faster Whisper model (lazy loading)
-_whisper_model = None
 
-def get_whisper_model():
-    """Lazy load the Whisper model"""
-    global _whisper_model
-    if _whisper_model is None and FASTER_WHISPER_AVAILABLE:
+class GoogleEngine:
+    """Google Web Speech via speech_recognition"""
+
+    name = "google"
+    expected_latency = 1.2
+    # Google leaves out the score on some answers
+    DEFAULT_CONFIDENCE = 0.8
+
+    def recognize(self, pcm: bytes, cancel):
+        audio = sr.AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH)
+        response = _recognizer.recognize_google(audio, language="en-US", show_all=True)
+        alternatives = response.get("alternative") if isinstance(response, dict) else None
+        if not alternatives:
+            return None
+        return alternatives[0]["transcript"], alternatives[0].get("confidence", self.DEFAULT_CONFIDENCE)
+
+
+class WhisperEngine:
+    """Local Faster Whisper (stops decoding once another engine has won)"""
+
+    name = "whisper"
+    expected_latency = 1.5
+
+    def recognize(self, pcm: bytes, cancel):
+        text, confidence = get_whisper_service().transcribe_detailed(pcm_to_float32(pcm), cancel=cancel)
+        return (text, confidence) if text else None
+
+
+_recognizer = sr.Recognizer()
+_segmenter = None
+_azure_stream = None
+_listen_lock = threading.Lock()
+_engines = [GoogleEngine()]
+if AZURE_STT_AVAILABLE:
+    _engines.append(AzureOnceEngine())
+if FASTER_WHISPER_AVAILABLE:
+    _engines.append(WhisperEngine())
+stt_racer = SttRacer(_engines)
+
+
+def _print_partial(text: str):
+    print("\r[MIC] " + text[-70:] + " " * 5, end='', flush=True)
+
+
+def transcribe_local(pcm: bytes, use_local_stt: bool = True):
+    """
+    Transcribe an in-memory utterance by racing the STT engines (see main/stt_race.py).
+    Azure joins the race only with STT_PRIMARY=race (otherwise it has its own stream).
+    """
+    names = {"google"}
+    if use_local_stt:
+        names.add("whisper")
+    if STT_PRIMARY == "race":
+        names.add("azure")
+    if STT_PRIMARY == "whisper" and use_local_stt and FASTER_WHISPER_AVAILABLE:
+        # Local first; the network is only used if Whisper hears nothing or fails
         try:
-            _whisper_model = WhisperModel("base", device="cpu", compute_type="int8")
-            logging.info("[OK] Faster Whisper model loaded")
+            result = stt_racer.race(pcm, names={"whisper"})
+            if result:
+                return result.text
         except Exception as e:
-            logging.error(f"[ERROR] Failed to load Faster Whisper: {e}")
-    return _whisper_model
+            logging.warning(f"[Warning] Faster Whisper failed, trying Google: {e}")
+        names = {"google"}
+
+    result = stt_racer.race(pcm, names=names)
+    if not result:
+        raise sr.UnknownValueError()
+    return result.text
 
-def listen_for_speech(timeout=5, use_local_stt=True):
+
+def stop_streaming():
+    """
+    End the Azure stream, e.g. when conversation mode ends, so no more audio goes to
+    the cloud until the wake word starts a new conversation (which starts a fresh stream)
+    """
+    stream = _azure_stream
+    if stream is not None and stream.running:
+        stream.stop()
+        logging.info("Azure streaming recognition stopped")
+
+
+def listen_for_speech(timeout=5, use_local_stt=True, on_partial=None):
     """
     Listen for speech and transcribe using Azure STT (best for accents!).
-    Falls back to Google, then Faster Whisper if Azure unavailable.
-    
+    If the Azure stream is unavailable, Google and Faster Whisper race on the
+    utterance. STT_PRIMARY=race races all three; STT_PRIMARY=whisper tries
+    Faster Whisper first, then Google.
+
     Args:
         timeout: Maximum seconds to wait for speech
         use_local_stt: If True, can use local Faster Whisper as last resort
-    
+        on_partial: Called with partial transcripts while the user is talking
+            (default: shown on the console line)
+
     Returns:
         str: Transcribed text or None if no speech detected
     """
-    recognizer = sr.Recognizer()
-    # Lower energy threshold for better sensitivity
-    recognizer.energy_threshold = 300  # Lower = more sensitive
-    recognizer.dynamic_energy_threshold = True
-    recognizer.pause_threshold = 0.8  # Shorter pause = faster response
-    
-    try:
-        with sr.Microphone() as source:
-            print("[MIC] Listening...", end='', flush=True)
-            # Shorter ambient noise adjustment for faster startup
-            recognizer.adjust_for_ambient_noise(source, duration=0.3)
-            # Listen with more lenient settings
-            audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=15)
-            print("\r" + " " * 20 + "\r", end='', flush=True)
-            
-            # Priority 1: Azure Speech-to-Text (Best for accents!)
-            if AZURE_STT_AVAILABLE:
-                try:
-                    # Save audio to temporary WAV file for Azure
-                    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-                        wav_path = f.name
-                        wav_file = wave.open(wav_path, 'wb')
-                        wav_file.setnchannels(1)
-                        wav_file.setsampwidth(audio.sample_width)
-                        wav_file.setframerate(audio.sample_rate)
-                        wav_file.writeframes(audio.get_wav_data())
-                        wav_file.close()
-                    
-                    # Use Azure Speech SDK
-                    audio_config = speechsdk.audio.AudioConfig(filename=wav_path)
-                    speech_recognizer = speechsdk.SpeechRecognizer(
-                        speech_config=azure_speech_config,
-                        audio_config=audio_config
-                    )
-                    
-                    result = speech_recognizer.recognize_once()
-                    
-                    # Cleanup temp file
+    global _segmenter, _azure_stream
+    with _listen_lock:
+        try:
+            capture = get_capture()
+            capture.start()
+
+            # Priority 1: Azure streaming recognition (Best for accents!)
+            if AZURE_STT_AVAILABLE and STT_PRIMARY == "azure":
+                if _azure_stream is None:
+                    _azure_stream = AzureStreamRecognizer(capture)
+                if not _azure_stream.running and _azure_stream.should_retry():
                     try:
-                        os.remove(wav_path)
-                    except:
-                        pass
-                    
-                    if result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                        return result.text.strip()
-                    elif result.reason == speechsdk.ResultReason.NoMatch:
-                        logging.warning("[Warning] Azure: No speech recognized")
-                    else:
-                        logging.warning(f"[Warning] Azure STT failed: {result.reason}")
-                        
-                except Exception as azure_error:
-                    logging.warning(f"[Warning] Azure STT error, falling back: {azure_error}")
-            
-            # Priority 2: Google Speech API (Good fallback)
-            try:
-                text = recognizer.recognize_google(audio, language="en-US")
-                logging.info("🔄 Using Google STT (Azure unavailable)")
-                return text.strip()
-            except Exception as google_error:
-                logging.warning(f"[Warning] Google STT failed: {google_error}")
-                
-                # Priority 3: Faster Whisper (Last resort)
-                if use_local_stt and FASTER_WHISPER_AVAILABLE:
+                        _azure_stream.start()
+                    except Exception as azure_error:
+                        logging.warning(f"[Warning] Azure STT error, falling back: {azure_error}")
+                        _azure_stream.failed_at = time.monotonic()
+                if _azure_stream.running:
+                    _azure_stream.on_partial = on_partial or _print_partial
                     try:
-                        model = get_whisper_model()
-                        if model:
-                            # Save audio to temporary WAV file
-                            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-                                wav_path = f.name
-                                wav_file = wave.open(wav_path, 'wb')
-                                wav_file.setnchannels(1)
-                                wav_file.setsampwidth(audio.sample_width)
-                                wav_file.setframerate(audio.sample_rate)
-                                wav_file.writeframes(audio.get_wav_data())
-                                wav_file.close()
-                            
-                            # Transcribe with Faster Whisper
-                            segments, info = model.transcribe(wav_path, language="en", beam_size=5)
-                            text = " ".join([segment.text for segment in segments]).strip()
-                            
-                            # Cleanup temp file
-                            try:
-                                os.remove(wav_path)
-                            except:
-                                pass
-                            
-                            if text:
-                                logging.info("🔄 Using Faster Whisper (Azure & Google unavailable)")
-                                return text
-                    except Exception as e:
-                        logging.error(f"[ERROR] All STT methods failed: {e}")
-                
-                raise google_error
-            
-    except sr.WaitTimeoutError:
-        print("\r" + " " * 20 + "\r", end='', flush=True)
-        return None
-    except sr.UnknownValueError:
-        print("❓ Could not understand audio")
-        return None
-    except sr.RequestError as e:
-        print(f"[ERROR] Speech recognition error: {e}")
-        return None
-    except Exception as e:
-        print(f"[ERROR] Microphone error: {e}")
-        return None
+                        text = _azure_stream.next_result(timeout)
+                    finally:
+                        _azure_stream.on_partial = None
+                        print("\r" + " " * 80 + "\r", end='', flush=True)
+                    if text or _azure_stream.running:
+                        return text
+
+            # VAD endpointing, then race the engines on the utterance
+            if _segmenter is None:
+                _segmenter = Segmenter(frame_ms=capture.frame_ms)
+            frames = capture.subscribe(history_ms=VAD_PREROLL_MS)
+            try:
+                print("[MIC] Listening...", end='', flush=True)
+                utterance = _segmenter.next_utterance(frames, timeout)
+            finally:
+                capture.unsubscribe(frames)
+                print("\r" + " " * 20 + "\r", end='', flush=True)
+            if not utterance:
+                return None
+            return transcribe_local(utterance.pcm, use_local_stt)
+
+        except sr.UnknownValueError:
+            print("❓ Could not understand audio")
+            return None
+        except sr.RequestError as e:
+            print(f"[ERROR] Speech recognition error: {e}")
+            return None
+        except Exception as e:
+            print(f"[ERROR] Microphone error: {e}")
+            return None
@@ -4,6 +4,9 @@ from dotenv import load_dotenv
 from langchain_ollama import ChatOllama
 from ollama import Client as OllamaClient
 
+from main.health import get_monitor, health_url
+from main.model_router import ModelRouter
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -11,8 +14,22 @@ OLLAMA_MODEL = os.getenv("OLLAMA_MODEL")  # Optional; do not require
 # Support both OLLAMA_URL and OLLAMA_HOST for endpoint
 OLLAMA_HOST = os.getenv("OLLAMA_URL") or os.getenv("OLLAMA_HOST") or "http://localhost:11434"
 PROXY_OLLAMA = "/proxy_ollama" in OLLAMA_HOST
+# Several backends with failover / load balancing (see main/llm_router.py)
+OLLAMA_BACKENDS = os.getenv("OLLAMA_BACKENDS", "").strip()
+# Optional small local model for easy turns (see main/model_router.py)
+SMALL_MODEL = os.getenv("SMALL_MODEL")
+SMALL_MODEL_HOST = os.getenv("SMALL_MODEL_HOST", "http://localhost:11434")
+
+# Headers to bypass the ngrok warning page
+OLLAMA_CLIENT_CONFIG = {
+    "headers": {
+        "ngrok-skip-browser-warning": "true",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    }
+}
 
 llm = None
+small_llm = None
 ollama_client = None
 
 # Import custom adapter for proxy_ollama
@@ -23,8 +40,48 @@ except ImportError:
     ADAPTER_AVAILABLE = False
     logging.warning("[Warning] OllamaProxyAdapter not available")
 
+try:
+    from main.llm_router import LLMRouter
+    ROUTER_AVAILABLE = True
+except ImportError:
+    ROUTER_AVAILABLE = False
+
+
+def _backend_llm(url: str, model_name: str):
+    """Chat model for one OLLAMA_BACKENDS entry (the router does the health accounting)"""
+    if "/proxy_ollama" in url:
+        if not ADAPTER_AVAILABLE:
+            raise RuntimeError("OllamaProxyAdapter not available")
+        return OllamaProxyAdapter(proxy_url=url, model=model_name, temperature=0.0, circuit_breaker=False)
+    return ChatOllama(
+        model=model_name,
+        temperature=0.0,
+        base_url=url,
+        client_kwargs=OLLAMA_CLIENT_CONFIG,
+        sync_client_kwargs=OLLAMA_CLIENT_CONFIG,
+        async_client_kwargs=OLLAMA_CLIENT_CONFIG
+    )
+
+
+def llm_monitor():
+    """Health of the main LLM: the router itself, or the shared monitor of OLLAMA_HOST"""
+    if ROUTER_AVAILABLE and isinstance(llm, LLMRouter):
+        return llm
+    return get_monitor(health_url(OLLAMA_HOST), name="Colab backend")
+
+
+def model_router() -> ModelRouter:
+    """Per-turn router between small_llm and llm (call after init_llm)"""
+    return ModelRouter(
+        small_model=SMALL_MODEL if small_llm else None,
+        small_monitor=get_monitor(SMALL_MODEL_HOST, name="Small model") if small_llm else None,
+        large_monitor=llm_monitor(),
+        large_enabled=llm is not None,
+    )
+
+
 def init_llm():
-    global llm, ollama_client
+    global llm, small_llm, ollama_client
     
     # ChatOllama requires standard Ollama API endpoints (/api/chat, /api/generate, etc.)
     # Your Colab has TWO ngrok tunnels:
@@ -34,7 +91,14 @@ def init_llm():
     # For ChatOllama, we should use the direct Ollama tunnel
     # Check if user provided the direct Ollama URL or the Flask proxy URL
     
-    if PROXY_OLLAMA:
+    if OLLAMA_BACKENDS and ROUTER_AVAILABLE:
+        try:
+            llm = LLMRouter.from_spec(OLLAMA_BACKENDS, _backend_llm, OLLAMA_MODEL or "phi")
+            logging.info(f"✅ [OK] LLM router initialized: {', '.join(b.name for b in llm.backends)}")
+        except Exception as e:
+            llm = None
+            logging.error(f"❌ [ERROR] Failed to initialize LLM router: {e}")
+    elif PROXY_OLLAMA:
         # User provided Flask proxy URL - use custom adapter
         logging.info("🔧 Detected /proxy_ollama endpoint, using custom adapter")
         
@@ -65,22 +129,14 @@ def init_llm():
         try:
             model_name = OLLAMA_MODEL or "phi"
             
-            # Configure client with ngrok bypass headers
-            client_config = {
-                "headers": {
-                    "ngrok-skip-browser-warning": "true",
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-                }
-            }
-            
             # Add headers to bypass ngrok warning page
             llm = ChatOllama(
                 model=model_name,
                 temperature=0.0,
                 base_url=OLLAMA_HOST,
-                client_kwargs=client_config,
-                sync_client_kwargs=client_config,
-                async_client_kwargs=client_config
+                client_kwargs=OLLAMA_CLIENT_CONFIG,
+                sync_client_kwargs=OLLAMA_CLIENT_CONFIG,
+                async_client_kwargs=OLLAMA_CLIENT_CONFIG
             )
             
             logging.info(f"[OK] LLM initialized ({model_name}) at {OLLAMA_HOST}")
@@ -88,6 +144,14 @@ def init_llm():
             llm = None
             logging.error(f"[ERROR] Failed to initialize ChatOllama: {e}")
     
+    if SMALL_MODEL:
+        try:
+            small_llm = _backend_llm(SMALL_MODEL_HOST, SMALL_MODEL)
+            logging.info(f"[OK] Small model initialized ({SMALL_MODEL}) at {SMALL_MODEL_HOST}")
+        except Exception as e:
+            small_llm = None
+            logging.warning(f"[Warning] Could not initialize small model: {e}")
+    
     # Initialize Ollama HTTP client
     try:
         default_ollama_headers = {
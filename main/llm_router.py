@@ -0,0 +1,277 @@
+"""
+Multi-backend LLM routing for Jarvis
+OLLAMA_BACKENDS lists several Ollama endpoints serving the chat model - the
+Colab /proxy_ollama tunnel, a direct Ollama tunnel, Ollama on localhost or
+more GPU hosts - as url|weight|model (weight and model optional):
+
+  OLLAMA_BACKENDS=https://abc.ngrok-free.app/proxy_ollama|3,http://localhost:11434|1|llama3.2:3b
+
+Each request goes to the least-loaded healthy backend (requests in flight
+per unit of weight, then median latency). A failed request is retried on
+the next backend: chat calls have no side effects, tools run outside the
+model. With LLM_HEDGE=true a request still running after its backend's p95
+latency is sent to the next backend as well and the first answer wins.
+
+Health and latency come from the shared monitors in main/health.py, so a
+dead tunnel is skipped at once and used again as soon as its probe recovers.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field, PrivateAttr
+
+from main.health import BackendUnavailable, get_monitor, health_url
+
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "1"))   # Extra attempts on other backends
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+
+HEDGE_MIN_SAMPLES = 10   # Latencies needed before a backend's p95 is trusted
+
+
+def parse_backends(spec: str, default_model: str):
+    """'url|weight|model,...' -> [(url, weight, model)]"""
+    backends = []
+    for entry in spec.split(","):
+        parts = [p.strip() for p in entry.strip().split("|")]
+        if not parts[0]:
+            continue
+        weight = float(parts[1]) if len(parts) > 1 and parts[1] else 1.0
+        model = parts[2] if len(parts) > 2 and parts[2] else default_model
+        backends.append((parts[0].rstrip("/"), max(weight, 0.01), model))
+    return backends
+
+
+def _streams(llm) -> bool:
+    return type(llm)._stream is not BaseChatModel._stream
+
+
+class LLMBackend:
+    """One chat model endpoint with its weight, health monitor and load"""
+
+    def __init__(self, name: str, url: str, model: str, weight: float, llm):
+        self.name = name
+        self.url = url
+        self.model = model
+        self.weight = weight
+        self.llm = llm
+        # Ollama answers HEAD / itself; the Flask proxy has /health
+        self.monitor = get_monitor(health_url(url) or url, name=f"LLM backend {name}")
+        self.inflight = 0
+
+    @property
+    def load(self) -> float:
+        return (self.inflight + 1) / self.weight
+
+    def hedge_after(self):
+        """Seconds after which a request counts as slow (p95), or None until measured"""
+        latencies = self.monitor.request_latency
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return latencies.percentile(95)
+
+
+class LLMRouter(BaseChatModel):
+    """
+    Chat model spreading requests over several Ollama backends with failover.
+    Drop-in for ChatOllama / OllamaProxyAdapter (invoke, stream, bind_tools).
+    """
+
+    backends: List[Any] = Field(default_factory=list)
+    retries: int = Field(default=LLM_RETRIES)
+    hedge: bool = Field(default=LLM_HEDGE)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    class Config:
+        """Pydantic config."""
+        arbitrary_types_allowed = True
+
+    @classmethod
+    def from_spec(cls, spec: str, make_llm, default_model: str, **kwargs):
+        """Router over the OLLAMA_BACKENDS entries; make_llm(url, model) builds each chat model"""
+        backends = []
+        for url, weight, model in parse_backends(spec, default_model):
+            name = urlparse(url).netloc or url
+            if any(b.name == name for b in backends):
+                name = f"{name}#{len(backends) + 1}"
+            try:
+                backends.append(LLMBackend(name, url, model, weight, make_llm(url, model)))
+            except Exception as e:
+                logging.warning(f"[Warning] Skipping LLM backend {url}: {e}")
+        if not backends:
+            raise ValueError("OLLAMA_BACKENDS has no usable backend")
+        return cls(backends=backends, **kwargs)
+
+    @property
+    def available(self) -> bool:
+        return any(b.monitor.available for b in self.backends)
+
+    def check_now(self):
+        for backend in self.backends:
+            backend.monitor.check_now()
+
+    def summary(self) -> str:
+        return "; ".join(
+            f"{b.name} ({b.model}, weight {b.weight:g}): "
+            f"{'up' if b.monitor.available else 'down'}, {b.monitor.request_latency.summary()}"
+            for b in self.backends
+        )
+
+    def _pick(self, exclude) -> Optional[LLMBackend]:
+        """Least-loaded healthy backend not tried yet; counts the request as in flight"""
+        with self._lock:
+            candidates = [b for b in self.backends if b.name not in exclude and b.monitor.available]
+            candidates.sort(key=lambda b: (b.load, b.monitor.request_latency.percentile(50) or 0.0))
+            for backend in candidates:
+                if backend.monitor.allow():
+                    backend.inflight += 1
+                    return backend
+        return None
+
+    def _release(self, backend: LLMBackend):
+        with self._lock:
+            backend.inflight -= 1
+
+    def _send(self, backend: LLMBackend, call):
+        """Run call(llm) on a picked backend and record the outcome"""
+        started = time.perf_counter()
+        try:
+            result = call(backend.llm)
+        except Exception:
+            backend.monitor.report_failure()
+            raise
+        else:
+            backend.monitor.report_success(time.perf_counter() - started)
+            return result
+        finally:
+            self._release(backend)
+
+    def _hedged(self, backend: LLMBackend, call, tried: set):
+        """_send, plus a second backend if the first is slower than its p95"""
+        deadline = backend.hedge_after() if self.hedge else None
+        if deadline is None:
+            return self._send(backend, call)
+
+        results = queue.Queue()
+
+        def run(b):
+            try:
+                results.put((b, self._send(b, call), None))
+            except Exception as e:
+                results.put((b, None, e))
+
+        threading.Thread(target=run, args=(backend,), name="jarvis-llm", daemon=True).start()
+        pending = 1
+        try:
+            winner, result, error = results.get(timeout=deadline)
+        except queue.Empty:
+            hedge = self._pick(tried)
+            if hedge is not None:
+                tried.add(hedge.name)
+                logging.info(f"LLM: {backend.name} slower than p95 ({deadline:.1f}s), also asking {hedge.name}")
+                threading.Thread(target=run, args=(hedge,), name="jarvis-llm-hedge", daemon=True).start()
+                pending += 1
+            # The loser finishes in the background (it cannot be cancelled mid-request)
+            winner, result, error = results.get()
+        pending -= 1
+        if error is not None and pending:
+            winner, result, error = results.get()
+        if error is not None:
+            raise error
+        if winner is not backend:
+            logging.info(f"LLM: hedged request won on {winner.name}")
+        return result
+
+    def _route(self, call):
+        tried = set()
+        last_error = None
+        for _ in range(1 + max(0, self.retries)):
+            backend = self._pick(tried)
+            if backend is None:
+                break
+            tried.add(backend.name)
+            try:
+                return self._hedged(backend, call, tried)
+            except Exception as e:
+                last_error = e
+                logging.warning(f"[Warning] LLM backend {backend.name} failed: {e}")
+        if last_error is not None:
+            raise last_error
+        raise BackendUnavailable("No LLM backend is available")
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Generate on the best backend, failing over to the others."""
+        return self._route(lambda llm: llm._generate(messages, stop=stop, **kwargs))
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """Stream from the best backend; fails over only until the first chunk arrived."""
+        tried = set()
+        last_error = None
+        for _ in range(1 + max(0, self.retries)):
+            backend = self._pick(tried)
+            if backend is None:
+                break
+            tried.add(backend.name)
+            started = time.perf_counter()
+            streamed = False
+            try:
+                if _streams(backend.llm):
+                    for chunk in backend.llm._stream(messages, stop=stop, **kwargs):
+                        streamed = True
+                        yield chunk
+                else:
+                    message = backend.llm._generate(messages, stop=stop, **kwargs).generations[0].message
+                    streamed = True
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=message.content))
+                backend.monitor.report_success(time.perf_counter() - started)
+                return
+            except Exception as e:
+                backend.monitor.report_failure()
+                if streamed:
+                    raise  # Half an answer was already delivered
+                last_error = e
+                logging.warning(f"[Warning] LLM backend {backend.name} failed: {e}")
+            finally:
+                self._release(backend)
+        if last_error is not None:
+            raise last_error
+        raise BackendUnavailable("No LLM backend is available")
+
+    @property
+    def _llm_type(self) -> str:
+        """Return type of llm."""
+        return "ollama-router"
+
+    def bind_tools(self, tools, **kwargs):
+        """Bind tools for every backend (passed through as Ollama tool definitions)."""
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted, **kwargs)
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        """Get identifying parameters."""
+        return {
+            "backends": [(b.url, b.model, b.weight) for b in self.backends],
+            "hedge": self.hedge,
+        }
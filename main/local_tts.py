@@ -0,0 +1,318 @@
+"""
+Persistent local TTS for Jarvis
+Instead of starting PowerShell and loading System.Speech for every phrase,
+one long-lived engine is kept warm and fed from a queue by a worker thread:
+
+  powershell - a resident PowerShell process speaking a line protocol on stdin
+               (SAY <text> / WAV <path><TAB><text> / STOP / QUIT; it answers
+               READY once and DONE per phrase)
+  pyttsx3    - in-process SAPI5 / NSSpeechSynthesizer / espeak driver
+  espeak     - espeak-ng / espeak command line (Linux fallback)
+
+Engines are tried in LOCAL_TTS_ENGINES order; if one fails the next is used.
+cancel() drops queued phrases and cuts off the one being spoken (barge-in).
+"""
+import base64
+import logging
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import threading
+
+PYTTSX3_AVAILABLE = False
+try:
+    import pyttsx3
+    PYTTSX3_AVAILABLE = True
+except ImportError:
+    pass
+
+DEFAULT_ENGINES = "powershell,pyttsx3,espeak" if platform.system() == "Windows" else "pyttsx3,espeak"
+LOCAL_TTS_ENGINES = [e.strip() for e in os.getenv("LOCAL_TTS_ENGINES", DEFAULT_ENGINES).split(",") if e.strip()]
+LOCAL_TTS_RATE = int(os.getenv("LOCAL_TTS_RATE", "0"))  # SAPI scale, -10..10
+LOCAL_TTS_TIMEOUT = float(os.getenv("LOCAL_TTS_TIMEOUT", "15"))
+
+POWERSHELL_SERVER = r"""
+[Console]::InputEncoding = [System.Text.Encoding]::UTF8
+Add-Type -AssemblyName System.Speech
+$speak = New-Object System.Speech.Synthesis.SpeechSynthesizer
+$speak.Rate = __RATE__
+$speak.Volume = 100
+$speak.SetOutputToDefaultAudioDevice()
+[Console]::Out.WriteLine("READY"); [Console]::Out.Flush()
+$reader = [Console]::In
+$read = $reader.ReadLineAsync()
+$prompt = $null
+while ($true) {
+    if ($prompt -ne $null -and $prompt.IsCompleted) {
+        $prompt = $null
+        [Console]::Out.WriteLine("DONE"); [Console]::Out.Flush()
+    }
+    if (-not $read.Wait(15)) { continue }
+    $line = $read.Result
+    if ($line -eq $null -or $line -eq "QUIT") { break }
+    if ($line.StartsWith("SAY ")) {
+        if ($prompt -ne $null) { $speak.SpeakAsyncCancelAll() }
+        $prompt = $speak.SpeakAsync($line.Substring(4))
+    } elseif ($line.StartsWith("WAV ")) {
+        $parts = $line.Substring(4).Split("`t", 2)
+        $speak.SetOutputToWaveFile($parts[0])
+        $speak.Speak($parts[1])
+        $speak.SetOutputToDefaultAudioDevice()
+        [Console]::Out.WriteLine("DONE"); [Console]::Out.Flush()
+    } elseif ($line -eq "STOP") {
+        $speak.SpeakAsyncCancelAll()
+    }
+    $read = $reader.ReadLineAsync()
+}
+"""
+
+
+class PowerShellEngine:
+    """Resident PowerShell process with System.Speech loaded once"""
+
+    name = "powershell"
+
+    def __init__(self):
+        if platform.system() != "Windows":
+            raise RuntimeError("PowerShell TTS is Windows-only")
+        script = POWERSHELL_SERVER.replace("__RATE__", str(LOCAL_TTS_RATE))
+        # The script goes on the command line so stdin is free for the protocol
+        encoded = base64.b64encode(script.encode("utf-16-le")).decode("ascii")
+        self._proc = subprocess.Popen(
+            ["powershell", "-NoProfile", "-NoLogo", "-EncodedCommand", encoded],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", bufsize=1,
+            creationflags=subprocess.CREATE_NO_WINDOW
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read_stdout, name="jarvis-tts-ps", daemon=True).start()
+        if self._wait_for("READY", LOCAL_TTS_TIMEOUT) is not True:
+            self.close()
+            raise RuntimeError("PowerShell TTS did not start")
+
+    def _read_stdout(self):
+        for line in self._proc.stdout:
+            self._lines.put(line.strip())
+        self._lines.put(None)
+
+    def _wait_for(self, token: str, timeout: float):
+        while True:
+            try:
+                line = self._lines.get(timeout=timeout)
+            except queue.Empty:
+                return False
+            if line is None:
+                return None
+            if line == token:
+                return True
+
+    def _send(self, line: str):
+        self._proc.stdin.write(line + "\n")
+        self._proc.stdin.flush()
+
+    def speak(self, text: str):
+        if self._proc.poll() is not None:
+            raise RuntimeError("PowerShell TTS process exited")
+        self._send("SAY " + " ".join(text.split()))
+        result = self._wait_for("DONE", LOCAL_TTS_TIMEOUT)
+        if result is False:
+            # Cut it off and consume its DONE so it cannot complete the next phrase early
+            self.stop()
+            result = self._wait_for("DONE", 2)
+        if result is None:
+            raise RuntimeError("PowerShell TTS process exited")
+
+    def save(self, text: str, path: str):
+        self._send(f"WAV {path}\t" + " ".join(text.split()))
+        if self._wait_for("DONE", LOCAL_TTS_TIMEOUT) is not True:
+            raise RuntimeError("PowerShell TTS did not finish writing")
+
+    def stop(self):
+        try:
+            self._send("STOP")
+        except Exception:
+            pass
+
+    def close(self):
+        try:
+            self._send("QUIT")
+            self._proc.wait(timeout=2)
+        except Exception:
+            self._proc.kill()
+
+
+class Pyttsx3Engine:
+    """In-process pyttsx3 engine (must only be driven from the worker thread)"""
+
+    name = "pyttsx3"
+
+    def __init__(self):
+        if not PYTTSX3_AVAILABLE:
+            raise RuntimeError("pyttsx3 not installed")
+        self._engine = pyttsx3.init()
+        rate = self._engine.getProperty("rate")
+        # SAPI-style -10..10 mapped onto words per minute
+        self._engine.setProperty("rate", int(rate * (1 + LOCAL_TTS_RATE / 20)))
+        self._stop = threading.Event()
+        self._engine.connect("started-word", self._on_word)
+
+    def _on_word(self, *args):
+        if self._stop.is_set():
+            self._engine.stop()
+
+    def speak(self, text: str):
+        self._stop.clear()
+        self._engine.say(text)
+        self._engine.runAndWait()
+
+    def save(self, text: str, path: str):
+        self._stop.clear()
+        self._engine.save_to_file(text, path)
+        self._engine.runAndWait()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        pass
+
+
+class EspeakEngine:
+    """espeak-ng / espeak command line; the process is killed on stop()"""
+
+    name = "espeak"
+
+    def __init__(self):
+        self._binary = shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self._binary:
+            raise RuntimeError("espeak-ng not installed")
+        self._proc = None
+
+    def speak(self, text: str):
+        speed = str(175 + LOCAL_TTS_RATE * 10)
+        self._proc = subprocess.Popen([self._binary, "-s", speed, "--", text],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            self._proc.wait(timeout=LOCAL_TTS_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+        finally:
+            self._proc = None
+
+    def save(self, text: str, path: str):
+        speed = str(175 + LOCAL_TTS_RATE * 10)
+        subprocess.run([self._binary, "-s", speed, "-w", path, "--", text],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=LOCAL_TTS_TIMEOUT)
+
+    def stop(self):
+        proc = self._proc
+        if proc and proc.poll() is None:
+            proc.kill()
+
+    def close(self):
+        self.stop()
+
+
+ENGINES = {"powershell": PowerShellEngine, "pyttsx3": Pyttsx3Engine, "espeak": EspeakEngine}
+
+
+class LocalSpeaker:
+    """Queue-fed worker around the first local engine that starts"""
+
+    def __init__(self, engine_names=None):
+        self.engine_names = list(engine_names or LOCAL_TTS_ENGINES)
+        self._queue = queue.Queue()
+        self._engine = None
+        self._failed = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="jarvis-local-tts", daemon=True)
+        self._thread.start()
+
+    @property
+    def engine_name(self):
+        return self._engine.name if self._engine else None
+
+    def _open_engine(self):
+        """Start the first engine that works (on the worker thread)"""
+        for name in self.engine_names:
+            if name in self._failed or name not in ENGINES:
+                continue
+            try:
+                self._engine = ENGINES[name]()
+                logging.info(f"✅ Local TTS engine ready ({name})")
+                return True
+            except Exception as e:
+                logging.warning(f"⚠️ Local TTS engine {name} unavailable: {e}")
+                self._failed.add(name)
+        return False
+
+    def _run(self):
+        self._open_engine()
+        self._ready.set()
+        while True:
+            text, generation, done, path = self._queue.get()
+            try:
+                if generation is not None and generation != self._generation:
+                    continue  # cancelled while queued
+                while self._engine or self._open_engine():
+                    try:
+                        if path:
+                            self._engine.save(text, path)
+                        else:
+                            self._engine.speak(text)
+                        break
+                    except Exception as e:
+                        logging.error(f"❌ Local TTS ({self._engine.name}) failed: {e}")
+                        self._failed.add(self._engine.name)
+                        try:
+                            self._engine.close()
+                        except Exception:
+                            pass
+                        self._engine = None
+                else:
+                    logging.error("❌ No local TTS engine available")
+            finally:
+                done.set()
+
+    def say(self, text: str, block: bool = True, timeout: float = LOCAL_TTS_TIMEOUT):
+        """Queue a phrase; with block=True wait until it has been spoken (or cancelled)"""
+        done = threading.Event()
+        with self._lock:
+            self._queue.put((text, self._generation, done, None))
+        if block:
+            done.wait(timeout)
+        return done
+
+    def synthesize(self, text: str, path: str, timeout: float = LOCAL_TTS_TIMEOUT) -> bool:
+        """Render text to a WAV file instead of the speaker (not affected by cancel)"""
+        done = threading.Event()
+        self._queue.put((text, None, done, path))
+        return done.wait(timeout) and os.path.exists(path) and os.path.getsize(path) > 44
+
+    def cancel(self):
+        """Drop queued phrases and interrupt the current one"""
+        with self._lock:
+            self._generation += 1
+        engine = self._engine
+        if engine:
+            engine.stop()
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+
+
+_speaker = None
+_speaker_lock = threading.Lock()
+
+
+def get_local_speaker() -> LocalSpeaker:
+    """Shared speaker, started on first use (the engine loads on its own thread)"""
+    global _speaker
+    with _speaker_lock:
+        if _speaker is None:
+            _speaker = LocalSpeaker()
+        return _speaker
@@ -8,8 +8,10 @@ from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate
 from main.llm import init_llm, llm, ollama_client, OLLAMA_MODEL
 from main.vision import VISION_AVAILABLE, vision
-from main.tts import speak_local, speak_text
+from main.tts import speak_local, speak_text, speak_chat
+from main.context import chat_messages
 from main.utils import choose_best_sentence, is_refusal
+from main.model_router import SMALL
 
 # Import tools
 from tools.time import get_time
@@ -39,7 +41,7 @@ except Exception as e:
 # Journal system
 JOURNAL_AVAILABLE = False
 try:
-    from tools.journal import log_project_day, get_project_day, get_day_accomplishments, get_today_summary, get_project_summary
+    from tools.journal import log_project_day, get_project_day, get_day_accomplishments, get_today_summary, get_project_summary, search_journal, iter_project_summary, store as journal_store
     JOURNAL_AVAILABLE = True
 except ImportError as e:
     logging.warning(f"⚠️ Journal tools not available: {e}")
@@ -72,7 +74,8 @@ except ImportError:
 
 # Reminders & Timers
 try:
-    from tools.reminders import set_reminder, set_timer, quick_timer
+    from tools.reminders import set_reminder, set_timer, quick_timer, list_reminders, cancel_reminder, set_reminder_at, schedule_reminder
+    from tools.time_parser import parse_reminder_request
     REMINDERS_AVAILABLE = True
 except ImportError:
     REMINDERS_AVAILABLE = False
@@ -104,7 +107,7 @@ except ImportError:
 
 # Calendar
 try:
-    from tools.calendar_tool import add_calendar_event, check_schedule, list_upcoming_events, delete_calendar_event
+    from tools.calendar_tool import add_calendar_event, check_schedule, list_upcoming_events, delete_calendar_event, add_recurring_event, move_event_occurrence, delete_recurring_event, import_ics, export_ics
     CALENDAR_AVAILABLE = True
 except ImportError:
     CALENDAR_AVAILABLE = False
@@ -159,7 +162,9 @@ def main_text():
     init_llm()
     
     # Re-import llm after initialization to get the updated global variable
-    from main.llm import llm
+    from main.llm import llm, small_llm, model_router
+    # Easy turns skip the tunnel: answered by the small local model (SMALL_MODEL)
+    router = model_router()
     logging.info(f"🔧 LLM after init: {llm}")
     logging.info(f"🔧 LLM type: {type(llm)}")
     
@@ -190,7 +195,7 @@ def main_text():
     
     # Add journal tools if available
     if JOURNAL_AVAILABLE:
-        tools.extend([log_project_day, get_project_day, get_day_accomplishments, get_today_summary, get_project_summary])
+        tools.extend([log_project_day, get_project_day, get_day_accomplishments, get_today_summary, get_project_summary, search_journal])
         logging.info("✅ Journal tools loaded")
     else:
         logging.info("ℹ️ Journal tools not available")
@@ -219,7 +224,7 @@ def main_text():
     
     # Add reminder tools
     if REMINDERS_AVAILABLE:
-        tools.extend([set_reminder, set_timer, quick_timer])
+        tools.extend([set_reminder, set_timer, quick_timer, list_reminders, cancel_reminder, set_reminder_at])
         logging.info("✅ Reminder tools loaded")
     
     # Add YouTube tools
@@ -239,7 +244,7 @@ def main_text():
     
     # Add calendar tools
     if CALENDAR_AVAILABLE:
-        tools.extend([add_calendar_event, check_schedule, list_upcoming_events, delete_calendar_event])
+        tools.extend([add_calendar_event, check_schedule, list_upcoming_events, delete_calendar_event, add_recurring_event, move_event_occurrence, delete_recurring_event, import_ics, export_ics])
         logging.info("✅ Calendar tools loaded")
     
     # Add music control tools
@@ -372,8 +377,21 @@ Important: Keep responses conversational and natural."""),
                     pass
                 break
 
-            # Activation greeting (optional) - respond and continue
             lower_input = user_input.lower()
+
+            # Reminders with a recognizable time are parsed locally - no LLM round-trip
+            if REMINDERS_AVAILABLE and "remind me" in lower_input:
+                request = parse_reminder_request(user_input)
+                if request:
+                    response = schedule_reminder(*request)
+                    print(f"🤖 Jarvis: {response}")
+                    try:
+                        speak_local(response.split(" (#")[0])
+                    except Exception:
+                        pass
+                    continue
+
+            # Activation greeting (optional) - respond and continue
             if any(word in lower_input for word in ['hello', 'hi', 'hey', 'jarvis']):
                 response = "Yes sir, how can I help you?"
                 print(f"🤖 Jarvis: {response}")
@@ -383,6 +401,15 @@ Important: Keep responses conversational and natural."""),
                     pass
                 continue
 
+            # Easy turns go to the small local model, streamed; if it fails before
+            # answering, the remote model below takes the turn
+            decision = router.route(user_input)
+            if decision.tier == SMALL:
+                if speak_chat(small_llm, chat_messages(user_input), local=True):
+                    continue
+                logging.info("Small model failed, using the remote model")
+                router.small_failed()
+
             # Process query with agent if available
             if agent_executor:
                 try:
@@ -402,20 +429,19 @@ Important: Keep responses conversational and natural."""),
                     logging.error(f"Agent error: {e}")
                     import traceback
                     logging.error(traceback.format_exc())
+                    # Dead tunnel: the small local model still answers (unless it just failed)
+                    if small_llm and decision.tier != SMALL and speak_chat(small_llm, chat_messages(user_input), local=True):
+                        continue
                     response = "I encountered an error processing that request."
             else:
-                # Simple mode - direct LLM call (fast, for phi)
-                try:
-                    from langchain_core.messages import HumanMessage, SystemMessage
-                    messages = [
-                        SystemMessage(content="You are Jarvis, a helpful AI assistant. Answer concisely in 1-2 sentences."),
-                        HumanMessage(content=user_input)
-                    ]
-                    result = llm.invoke(messages)
-                    response = result.content if hasattr(result, 'content') else str(result)
-                except Exception as e:
-                    logging.error(f"LLM error: {e}")
-                    response = "I encountered an error processing that request."
+                # Simple mode - stream the LLM answer (fast, for phi); speech starts
+                # with the first sentence while the rest is still being generated
+                messages = chat_messages(user_input)
+                if speak_chat(llm, messages, local=True):
+                    continue
+                if small_llm and decision.tier != SMALL and speak_chat(small_llm, messages, local=True):
+                    continue
+                response = "I encountered an error processing that request."
             
             # Display and speak response
             if response:
@@ -483,6 +509,29 @@ Important: Keep responses conversational and natural."""),
                             continue
                         except Exception as e:
                             logging.error(f"Journal error: {e}")
+                    
+                    elif "project summary" in lower_input or "timeline" in lower_input:
+                        try:
+                            # Stream line by line instead of building the whole timeline first
+                            rollup = "week" if "week" in lower_input else "day"
+                            print("🤖 Jarvis: 🚀 AI Learning Journey:")
+                            for _, line in iter_project_summary(rollup=rollup):
+                                print(f"   {line}", flush=True)
+                            speak_local("Here is the project timeline")
+                            continue
+                        except Exception as e:
+                            logging.error(f"Journal error: {e}")
+                    
+                    elif lower_input.startswith("when did"):
+                        # Only journal hits are answered here; anything else falls through
+                        try:
+                            if journal_store.search(user_input, limit=1):
+                                response = search_journal.invoke({"query": user_input})
+                                print(f"🤖 Jarvis: {response}")
+                                speak_text(response.split("\n")[0])
+                                continue
+                        except Exception as e:
+                            logging.error(f"Journal error: {e}")
                 
                 # Time queries (offline)
                 if "time" in lower_input:
@@ -545,6 +594,7 @@ Important: Keep responses conversational and natural."""),
                 elif "help" in lower_input or "commands" in lower_input:
                     help_text = """Offline commands available:
 • "time" or "time in [city]" - Get current time
+• "remind me to [task] [at 3pm friday / every weekday at 9 / in 10 minutes]" - Reminders
 • "screenshot" - Capture screen
 • "read screen" or "read text" - OCR from latest screenshot
 • "matrix" - Matrix mode effect
@@ -557,6 +607,8 @@ Important: Keep responses conversational and natural."""),
                     if JOURNAL_AVAILABLE:
                         help_text += "\n• \"what day are we on\" - Project day"
                         help_text += "\n• \"what did we do today\" - Today's summary"
+                        help_text += "\n• \"when did we [add something]\" - Search the journal"
+                        help_text += "\n• \"project summary\" (or \"weekly timeline\") - Full timeline"
                     
                     help_text += "\n• Start Colab for full LLM features"
                     
@@ -2,14 +2,21 @@ import sys
 import time
 import os
 import logging
+import queue
+import threading
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain_core.prompts import ChatPromptTemplate
 import main.llm as llm_module
-from main.llm import init_llm, OLLAMA_MODEL
-from main.vision import VISION_AVAILABLE, vision
-from main.tts import speak_local, speak_text
-from main.utils import choose_best_sentence, is_refusal
-from main.input import listen_for_speech
+from main.llm import init_llm, OLLAMA_MODEL, PROXY_OLLAMA
+from main.vision import VISION_AVAILABLE, vision, vision_available
+from main.tts import speak_local, speak_text, speak_stream, speak_chat, stop_speaking, is_echo, is_speaking
+from main.input import listen_for_speech, stop_streaming
+from main.wakeword import WakeWordDetector
+from main.barge_in import BargeInMonitor, enable_echo_suppression, ECHO_SUPPRESSION
+from main.health import BackendUnavailable
+from main.context import chat_messages
+from main.model_router import SMALL
+from main.whisper_service import preload_whisper
 
 
 from tools.time import get_time
@@ -36,12 +43,21 @@ except ImportError:
 
 # Journal system
 try:
-    from tools.journal import log_project_day, get_project_day, get_day_accomplishments, get_today_summary, get_project_summary
+    from tools.journal import log_project_day, get_project_day, get_day_accomplishments, get_today_summary, get_project_summary, search_journal, store as journal_store
     JOURNAL_AVAILABLE = True
 except ImportError:
     JOURNAL_AVAILABLE = False
     logging.warning("[Warning] Journal tools not available")
 
+# Reminders (parsed locally, no LLM needed)
+try:
+    from tools.reminders import schedule_reminder
+    from tools.time_parser import parse_reminder_request
+    REMINDERS_AVAILABLE = True
+except ImportError:
+    REMINDERS_AVAILABLE = False
+    logging.warning("[Warning] Reminder tools not available")
+
 # Conditionally import vision tools
 if VISION_AVAILABLE:
     from tools.vision import analyze_screen, analyze_camera, analyze_image
@@ -53,9 +69,214 @@ logging.basicConfig(
 )
 
 
+# Stages hand work on through small queues; a stage that falls behind drops the oldest item
+UTTERANCE_QUEUE_SIZE = 4
+JOB_QUEUE_SIZE = 2
+CONVERSATION_TIMEOUT_SECONDS = 30
+WAKE = object()  # Listen stage -> router: the wake word was heard
+
+
+def _put_latest(q: queue.Queue, item):
+    """Queue item; if the queue is full, the oldest entry is dropped to make room"""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                dropped = q.get_nowait()
+                logging.warning(f"[Warning] Dropping stale request: {dropped}")
+            except queue.Empty:
+                pass
+
+
+class VoiceSession:
+    """Conversation state shared by the pipeline stages"""
+
+    def __init__(self):
+        self.conversation_mode = False
+        self.last_interaction_time = None
+        self.thinking = threading.Event()
+        self.stopped = threading.Event()
+
+    def activate(self):
+        self.conversation_mode = True
+        self.touch()
+
+    def touch(self):
+        self.last_interaction_time = time.time()
+
+    def idle_expired(self) -> bool:
+        """Silent for a while and not busy answering"""
+        return (self.conversation_mode and self.last_interaction_time is not None
+                and time.time() - self.last_interaction_time > CONVERSATION_TIMEOUT_SECONDS
+                and not self.thinking.is_set() and not is_speaking())
+
+
+def _listen_stage(session: VoiceSession, utterances: queue.Queue, wake_word):
+    """Capture + STT. Keeps running while the agent thinks and while Jarvis speaks."""
+    listening = None
+    while not session.stopped.is_set():
+        try:
+            # Wait for the wake word locally before sending any audio to STT
+            if not session.conversation_mode and wake_word:
+                listening = None
+                if wake_word.wait(timeout=1):
+                    session.activate()
+                    _put_latest(utterances, WAKE)
+                continue
+            
+            if listening != session.conversation_mode:
+                listening = session.conversation_mode
+                print("[MIC] Listening..." if listening else "[MIC] (Listening for activation...)")
+            user_input = listen_for_speech(timeout=10 if session.conversation_mode else 5)
+            if user_input:
+                _put_latest(utterances, user_input)
+            elif session.idle_expired():
+                print("💤 Conversation mode deactivated (timeout)")
+                session.conversation_mode = False
+                if wake_word:
+                    # Back to on-device listening: nothing is streamed until the wake word
+                    stop_streaming()
+                    wake_word.reset()
+        except Exception as e:
+            logging.error(f"Listen error: {e}")
+            time.sleep(1)
+
+
+def _local_command(user_input: str, lower_input: str):
+    """(printed, spoken) answer for commands handled without the LLM, or None"""
+    # Direct journal queries (project tracking) - Works offline!
+    if JOURNAL_AVAILABLE:
+        # Check for "what day are we on" variations (very flexible)
+        if 'day' in lower_input and any(word in lower_input for word in ['are', 'is', 'we on', 'today']):
+            # But exclude "what did" queries
+            if 'did' not in lower_input and 'do' not in lower_input:
+                print("[Calendar] Checking project day...")
+                try:
+                    result = get_project_day.invoke({})
+                    return result, result
+                except Exception as e:
+                    logging.error(f"Error getting project day: {e}")
+        
+        # "What did we/you do today" variations (very flexible)
+        if ('did' in lower_input and 'today' in lower_input) or 'do today' in lower_input or 'you today' in lower_input:
+            print("[Journal] Checking today's accomplishments...")
+            try:
+                result = get_today_summary.invoke({})
+                return result, result
+            except Exception as e:
+                logging.error(f"Error getting today summary: {e}")
+        
+        # "When did we add X?" - answered from the journal index; other "when did"
+        # questions ("when did World War II end") go on to the agent
+        if lower_input.startswith('when did'):
+            try:
+                if journal_store.search(user_input, limit=1):
+                    print("[Journal] Searching journal...")
+                    result = search_journal.invoke({"query": user_input, "limit": 1})
+                    return result, result.split("\n")[0]
+            except Exception as e:
+                logging.error(f"Error searching journal: {e}")
+    
+    # Direct reminders - Works offline!
+    if REMINDERS_AVAILABLE and 'remind me' in lower_input:
+        request = parse_reminder_request(user_input)
+        if request:
+            print("[Reminder] Scheduling reminder...")
+            result = schedule_reminder(*request)
+            return result, result.split(" (#")[0]
+    
+    # Direct time queries - Works offline!
+    time_keywords = ['what time', 'current time', 'time in', 'time is it']
+    if any(keyword in lower_input for keyword in time_keywords):
+        print("[Time] Checking time...")
+        try:
+            city = "local"
+            if " in " in lower_input:
+                city = lower_input.split(" in ")[-1].strip("?.,!").title()
+            result = get_time.invoke({"city": city})
+            return result, result
+        except Exception as e:
+            logging.error(f"Time query error: {e}")
+    return None
+
+
+def _agent_stage(session: VoiceSession, jobs: queue.Queue, agent_executor, monitor, router):
+    """Slow remote work (agent, camera) and small-model chat off the listening path; answers go to TTS"""
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        kind, user_input = job
+        session.thinking.set()
+        try:
+            if kind == "vision":
+                print("[Camera] Capturing from camera...")
+                try:
+                    result = analyze_camera.invoke({"question": user_input})
+                    print(f"[Jarvis] Jarvis: {result}")
+                    speak_text(result)
+                except Exception as e:
+                    logging.error(f"Vision error: {e}")
+                    print(f"[Jarvis] Jarvis: Camera error: {e}")
+                    speak_text("I couldn't access the camera.")
+                continue
+            
+            # Easy turn: the small local model answers, streamed into speech
+            if kind == "chat":
+                if speak_chat(llm_module.small_llm, chat_messages(user_input), prefix="[Jarvis] Jarvis: "):
+                    continue
+                logging.info("Small model failed, using the remote model")
+                router.small_failed()
+            
+            # Process query with agent (requires Colab)
+            try:
+                logging.info(f"Processing: {user_input}")
+                result = agent_executor.invoke({"input": user_input})
+                response = result.get("output", "I'm not sure how to help with that.")
+                if monitor:
+                    monitor.report_success()
+                if session.stopped.is_set():
+                    break
+                
+                print(f"[Jarvis] Jarvis: {response}")
+                # Speak the whole answer in the background; each sentence is synthesized
+                # while the previous one plays and the stage moves on to the next request
+                speak_stream([response], block=False)
+                
+            except Exception as e:
+                # Don't log full HTML errors
+                error_msg = str(e)
+                if isinstance(e, BackendUnavailable):
+                    response = "Backend offline. Use local commands."
+                    logging.info(error_msg)
+                elif "ngrok" in error_msg or "404" in error_msg:
+                    response = "Backend offline. Use local commands."
+                    logging.error("Backend connection failed")
+                    if monitor:
+                        monitor.report_failure()
+                else:
+                    response = "I encountered an error."
+                    logging.error(f"Agent error: {error_msg[:100]}")
+                
+                # The small local model still answers (unless it just failed on this turn)
+                if kind != "chat" and llm_module.small_llm and \
+                        speak_chat(llm_module.small_llm, chat_messages(user_input), prefix="[Jarvis] Jarvis: "):
+                    continue
+                print(f"[Jarvis] Jarvis: {response}")
+                speak_text(response)
+        finally:
+            session.thinking.clear()
+            session.touch()
+
+
 def main():
     """Voice-based interaction loop"""
     
+    # Load the local STT model while everything else starts up
+    preload_whisper()
+    
     # Initialize LLM
     init_llm()
     
@@ -172,116 +393,104 @@ Question: {input}
         sys.exit(1)
     
 
-    conversation_mode = False
-    last_interaction_time = None
+    # On-device wake word: nothing goes to STT until it is heard
+    wake_word = WakeWordDetector.load()
+    if wake_word:
+        try:
+            wake_word.start()
+        except Exception as e:
+            logging.warning(f"[Warning] Wake word unavailable, using STT activation: {e}")
+            wake_word = None
+    
+    # Full duplex: keep listening while speaking so the user can interrupt
+    if ECHO_SUPPRESSION:
+        enable_echo_suppression()
+    barge_in = BargeInMonitor(is_speaking, stop_speaking, wake_word=wake_word)
+    try:
+        barge_in.start()
+    except Exception as e:
+        logging.warning(f"[Warning] Barge-in unavailable: {e}")
+    
+    # Backend status is probed in the background instead of before every request
+    # (the same monitor guards the LLM adapter's circuit breaker)
+    monitor = llm_module.llm_monitor()
+    # Easy turns skip the tunnel: answered by the small local model (SMALL_MODEL)
+    router = llm_module.model_router()
+    # The proxy adapter and the router report their own requests
+    agent_monitor = None if PROXY_OLLAMA or monitor is llm_module.llm else monitor
     
     print("\n" + "="*60)
     print(" JARVIS - Voice Input Mode")
     print("="*60)
     print("[Speaking] Testing local TTS...")
     speak_local("System ready")
-    print("[Info] Say 'hello' or 'jarvis' to activate conversation mode")
+    if wake_word:
+        print("[Info] Say your wake word to activate conversation mode")
+    else:
+        print("[Info] Say 'hello' or 'jarvis' to activate conversation mode")
+        print("[Info] Run scripts/enroll_wakeword.py for on-device wake word detection")
     print("[Info] Press Ctrl+C to exit")
     print("[Info] In conversation mode, just speak your commands")
     print("="*60 + "\n")
     
-    # Main interaction loop
+    # Pipeline: listen stage (capture + STT) -> router (this thread) -> agent stage -> TTS
+    session = VoiceSession()
+    utterances = queue.Queue(maxsize=UTTERANCE_QUEUE_SIZE)
+    jobs = queue.Queue(maxsize=JOB_QUEUE_SIZE)
+    threading.Thread(target=_listen_stage, args=(session, utterances, wake_word),
+                     name="jarvis-listen", daemon=True).start()
+    threading.Thread(target=_agent_stage, args=(session, jobs, agent_executor, agent_monitor, router),
+                     name="jarvis-agent", daemon=True).start()
+    
     try:
         while True:
             try:
-                # Listen for speech
-                if conversation_mode:
-                    print("[MIC] Listening...")
-                    user_input = listen_for_speech(timeout=10)
-                else:
-                    print("[MIC] (Listening for activation...)")
-                    user_input = listen_for_speech(timeout=5)
+                try:
+                    user_input = utterances.get(timeout=0.5)
+                except queue.Empty:
+                    continue
                 
-                if not user_input or user_input == "":
-                    # Auto-deactivate after 30 seconds of silence
-                    if conversation_mode and last_interaction_time:
-                        if time.time() - last_interaction_time > 30:
-                            print("💤 Conversation mode deactivated (timeout)")
-                            conversation_mode = False
+                if user_input is WAKE:
+                    response = "Yes sir, how can I help you?"
+                    print(f"[Jarvis] Jarvis: {response}")
+                    speak_local(response)
+                    continue
+                
+                # Speech is not blocking the loop, so the mic can pick up Jarvis itself
+                # (unless the user just interrupted - then it is them talking over it)
+                if is_echo(user_input) and not barge_in.triggered_within(5):
+                    logging.info(f"Ignoring own speech picked up by the mic: {user_input}")
                     continue
                 
                 print(f"[You] You said: {user_input}")
                 
                 # Check for exit commands
                 if any(word in user_input.lower() for word in ['exit', 'quit', 'goodbye', 'shut down']):
-                    print(" Goodbye!")
-                    speak_local("Goodbye sir")
                     break
                 
                 # Check for activation
                 lower_input = user_input.lower()
-                if not conversation_mode and any(word in lower_input for word in ['hello', 'hi', 'hey', 'jarvis']):
-                    conversation_mode = True
-                    last_interaction_time = time.time()
+                if not session.conversation_mode and any(word in lower_input for word in ['hello', 'hi', 'hey', 'jarvis']):
+                    session.activate()
                     response = "Yes sir, how can I help you?"
                     print(f"[Jarvis] Jarvis: {response}")
                     speak_local(response)  # Use local TTS for quick greeting
                     continue
                 
                 # If not in conversation mode, just listen
-                if not conversation_mode:
+                if not session.conversation_mode:
                     continue
                 
                 # Update last interaction time
-                last_interaction_time = time.time()
-                
-                # Direct journal queries (project tracking) - Works offline!
-                if JOURNAL_AVAILABLE:
-                    # Check for "what day are we on" variations (very flexible)
-                    if 'day' in lower_input and any(word in lower_input for word in ['are', 'is', 'we on', 'today']):
-                        # But exclude "what did" queries
-                        if 'did' not in lower_input and 'do' not in lower_input:
-                            print("[Calendar] Checking project day...")
-                            try:
-                                result = get_project_day.invoke({})
-                                print(f"[Jarvis] Jarvis: {result}")
-                                speak_text(result)
-                                continue
-                            except Exception as e:
-                                logging.error(f"Error getting project day: {e}")
-                    
-                    # Check for "what did we/you do today" variations (very flexible)
-                    if 'did' in lower_input and 'today' in lower_input:
-                        print("[Journal] Checking today's accomplishments...")
-                        try:
-                            result = get_today_summary.invoke({})
-                            print(f"[Jarvis] Jarvis: {result}")
-                            speak_text(result)
-                            continue
-                        except Exception as e:
-                            logging.error(f"Error getting today summary: {e}")
-                    
-                    # Also catch "do today" variations
-                    if 'do today' in lower_input or 'you today' in lower_input:
-                        print("[Journal] Checking today's accomplishments...")
-                        try:
-                            result = get_today_summary.invoke({})
-                            print(f"[Jarvis] Jarvis: {result}")
-                            speak_text(result)
-                            continue
-                        except Exception as e:
-                            logging.error(f"Error getting today summary: {e}")
+                session.touch()
                 
-                # Direct time queries - Works offline!
-                time_keywords = ['what time', 'current time', 'time in', 'time is it']
-                if any(keyword in lower_input for keyword in time_keywords):
-                    print("[Time] Checking time...")
-                    try:
-                        city = "local"
-                        if " in " in lower_input:
-                            city = lower_input.split(" in ")[-1].strip("?.,!").title()
-                        
-                        result = get_time.invoke({"city": city})
-                        print(f"[Jarvis] Jarvis: {result}")
-                        speak_text(result)
-                        continue
-                    except Exception as e:
-                        logging.error(f"Time query error: {e}")
+                # Direct answers (journal, reminders, time) - Work offline!
+                local = _local_command(user_input, lower_input)
+                if local:
+                    result, spoken = local
+                    print(f"[Jarvis] Jarvis: {result}")
+                    speak_text(spoken)
+                    continue
                 
                 # Direct vision processing (bypass agent - BLIP-2 only!)
                 vision_keywords = [
@@ -289,74 +498,44 @@ Question: {input}
                     'look at me', 'analyze camera', 'use camera', 'take a look',
                     'what is this', 'describe what you see', 'what am i showing'
                 ]
-                
                 if VISION_AVAILABLE and any(keyword in lower_input for keyword in vision_keywords):
-                    print("[Camera] Capturing from camera...")
-                    try:
-                        result = analyze_camera.invoke({"question": user_input})
-                        print(f"[Jarvis] Jarvis: {result}")
-                        speak_text(result)
-                        continue
-                    except Exception as e:
-                        logging.error(f"Vision error: {e}")
-                        print(f"[Jarvis] Jarvis: Camera error: {e}")
-                        speak_text("I couldn't access the camera.")
+                    if not vision_available():
+                        response = "Vision backend is offline."
+                        print(f"[Jarvis] Jarvis: {response}")
+                        speak_text(response)
                         continue
+                    _put_latest(jobs, ("vision", user_input))
+                    continue
                 
-                # Process query with agent (requires Colab)
-                # Skip agent if it contains offline error indicators
-                try:
-                    logging.info(f"Processing: {user_input}")
-                    
-                    # Quick check if backend is likely offline
-                    import requests
-                    ollama_host = os.getenv("OLLAMA_HOST", "")
-                    if ollama_host and "ngrok" in ollama_host:
-                        try:
-                            # Quick HEAD request with 2 second timeout
-                            test_url = ollama_host.replace("/proxy_ollama", "/health")
-                            requests.head(test_url, timeout=2, headers={"ngrok-skip-browser-warning": "true"})
-                        except:
-                            # Backend is offline, give quick response
-                            response = "Backend is offline. Only local features available."
-                            print(f"[Jarvis] Jarvis: {response}")
-                            speak_text(response)
-                            continue
-                    
-                    result = agent_executor.invoke({"input": user_input})
-                    response = result.get("output", "I'm not sure how to help with that.")
-                    
-                    # Choose best sentence for TTS
-                    tts_response = choose_best_sentence(response)
-                    
-                    print(f"[Jarvis] Jarvis: {response}")
-                    speak_text(tts_response)  # Use Azure TTS for full responses
-                    
-                except Exception as e:
-                    # Don't log full HTML errors
-                    error_msg = str(e)
-                    if "ngrok" in error_msg or "404" in error_msg:
-                        response = "Backend offline. Use local commands."
-                        logging.error("Backend connection failed")
-                    else:
-                        response = "I encountered an error."
-                        logging.error(f"Agent error: {error_msg[:100]}")
-                    
+                # Easy turns go to the small local model (also while the remote one is down)
+                if router.route(user_input).tier == SMALL:
+                    _put_latest(jobs, ("chat", user_input))
+                    continue
+                
+                # Agent (requires Colab) - skip straight to a reply if the backend is known to be down
+                if monitor and not monitor.available:
+                    response = "Backend is offline. Only local features available."
                     print(f"[Jarvis] Jarvis: {response}")
                     speak_text(response)
-                    
-            except KeyboardInterrupt:
-                print("\n\n Goodbye!")
-                speak_local("Goodbye sir")
-                break
+                    monitor.check_now()
+                    continue
+                _put_latest(jobs, ("agent", user_input))
+                
             except Exception as e:
                 logging.error(f"Error in main loop: {e}")
                 print(f"[ERROR] Error: {e}")
                 continue
-                
     except KeyboardInterrupt:
-        print("\n\n Goodbye!")
-        speak_local("Goodbye sir")
+        print()
+    finally:
+        session.stopped.set()
+        _put_latest(jobs, None)
+        if monitor and monitor is not llm_module.llm:
+            monitor.stop()
+    
+    print(" Goodbye!")
+    stop_speaking()
+    speak_local("Goodbye sir")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+"""
+Per-request model routing for Jarvis
+Each turn gets a cheap complexity score (no model call):
+
+  length        long requests usually need more reasoning
+  tool need     words that map to a Jarvis tool (search, weather, calendar, ...)
+  reasoning     explain / compare / step by step / write code ...
+  depth         many turns in a short time = an ongoing, harder conversation
+                (tracked by the router itself: turns within CONVERSATION_WINDOW_SECONDS)
+
+Turns scoring below MODEL_ROUTER_THRESHOLD go to the small local model
+(SMALL_MODEL on Ollama at SMALL_MODEL_HOST, plain chat, no tunnel); the rest
+go to the large remote model and its tool agent. If one side is down the
+other one answers. Every decision is logged. Text, voice and API mode
+(main_text, main_voice, JarvisEngine) all route through a ModelRouter.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque, namedtuple
+
+MODEL_ROUTER_THRESHOLD = float(os.getenv("MODEL_ROUTER_THRESHOLD", "0.5"))
+# Turns this close together count as one conversation
+CONVERSATION_WINDOW_SECONDS = 300
+
+SMALL = "small"
+LARGE = "large"
+
+RouteDecision = namedtuple("RouteDecision", ["tier", "score", "reasons"])
+
+# Words that mean one of the tools has to run
+TOOL_HINTS = {
+    "time", "date", "search", "google", "lookup", "weather", "forecast", "temperature",
+    "email", "mail", "inbox", "calendar", "schedule", "meeting", "event", "appointment",
+    "remind", "reminder", "timer", "alarm", "file", "folder", "directory",
+    "open", "launch", "screenshot", "screen", "play", "music", "song", "spotify", "youtube",
+    "volume", "lock", "shutdown", "restart", "clipboard", "paste", "translate", "calculate",
+    "python", "script", "plot", "chart", "graph", "pdf", "document", "journal", "remember",
+    "recall", "scan", "network", "news", "price",
+}
+# Phrases that ask for multi-step reasoning or long output
+REASONING_HINTS = (
+    "explain", "why", "compare", "difference between", "analyze", "analyse", "step by step",
+    "plan", "write a", "write me", "code", "debug", "summarize", "summarise", "pros and cons",
+    "in detail", "essay", "prove",
+)
+LONG_WORDS = 30
+MEDIUM_WORDS = 15
+DEEP_CONVERSATION_TURNS = 3
+# Small models that cannot drive tool calling; with them the agent is skipped
+NO_TOOL_MODELS = ("phi",)
+
+
+def model_supports_tools(model_name: str) -> bool:
+    return not any(name in (model_name or "").lower() for name in NO_TOOL_MODELS)
+
+
+def score_complexity(message: str, depth: int = 0):
+    """(score 0-1, reasons) for one request; depth = earlier turns in this conversation"""
+    text = message.lower()
+    words = re.findall(r"[a-z0-9']+", text)
+    score = 0.0
+    reasons = []
+
+    if len(words) > LONG_WORDS:
+        score += 0.3
+        reasons.append(f"{len(words)} words")
+    elif len(words) > MEDIUM_WORDS:
+        score += 0.15
+        reasons.append(f"{len(words)} words")
+
+    tools = sorted({w for w in words if w in TOOL_HINTS or w.rstrip("s") in TOOL_HINTS})
+    if tools:
+        score += 0.6
+        reasons.append("tools: " + ", ".join(tools[:3]))
+
+    reasoning = [hint for hint in REASONING_HINTS if re.search(rf"\b{hint}\b", text)]
+    if reasoning:
+        score += 0.3
+        reasons.append("reasoning: " + ", ".join(reasoning[:2]))
+
+    if text.count("?") > 1 or re.search(r"\b(and then|and also|after that)\b", text):
+        score += 0.1
+        reasons.append("multi-part")
+
+    if depth > DEEP_CONVERSATION_TURNS:
+        score += min(0.2, 0.05 * (depth - DEEP_CONVERSATION_TURNS))
+        reasons.append(f"turn {depth + 1}")
+
+    return min(score, 1.0), reasons
+
+
+class ModelRouter:
+    """Chooses the small local or the large remote model for each request"""
+
+    def __init__(self, small_model: str = None, small_monitor=None, large_monitor=None,
+                 large_enabled: bool = True, threshold: float = MODEL_ROUTER_THRESHOLD):
+        self.small_model = small_model
+        self.small_monitor = small_monitor
+        self.large_monitor = large_monitor
+        self.large_enabled = large_enabled
+        self.threshold = threshold
+        self.counts = {SMALL: 0, LARGE: 0}
+        self._turns = deque()
+        self._lock = threading.Lock()
+
+    def small_ready(self) -> bool:
+        return bool(self.small_model) and (self.small_monitor is None or self.small_monitor.available)
+
+    def large_ready(self) -> bool:
+        return self.large_enabled and (self.large_monitor is None or self.large_monitor.available)
+
+    def _depth(self) -> int:
+        """Earlier turns in the current conversation (counts this one as a turn)"""
+        now = time.monotonic()
+        with self._lock:
+            self._turns.append(now)
+            while now - self._turns[0] > CONVERSATION_WINDOW_SECONDS:
+                self._turns.popleft()
+            return len(self._turns) - 1
+
+    def route(self, message: str, depth: int = None) -> RouteDecision:
+        """Tier for this turn; depth defaults to the router's own conversation tracking"""
+        if depth is None:
+            depth = self._depth()
+        score, reasons = score_complexity(message, depth)
+        tier = LARGE if score >= self.threshold else SMALL
+        if tier == SMALL and not self.small_ready():
+            tier = LARGE
+            reasons.append("no small model" if not self.small_model else "small model offline")
+        elif tier == LARGE and not self.large_ready() and self.small_ready():
+            tier = SMALL
+            reasons.append("remote offline")
+
+        with self._lock:
+            self.counts[tier] += 1
+        logging.info(f"Model route: {tier} (score {score:.2f}; {', '.join(reasons) or 'short chat'})")
+        return RouteDecision(tier, score, reasons)
+
+    def small_failed(self):
+        """The small model errored: route to the large one until its probe recovers"""
+        if self.small_monitor is not None:
+            self.small_monitor.report_failure()
+
+    def summary(self) -> str:
+        with self._lock:
+            total = sum(self.counts.values()) or 1
+            return (f"{self.counts[SMALL]} small / {self.counts[LARGE]} large turns "
+                    f"({self.counts[SMALL] / total:.0%} local)")
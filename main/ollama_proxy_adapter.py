@@ -3,6 +3,7 @@ Adapter to make Flask /proxy_ollama work with LangChain ChatOllama
 """
 import requests
 import json
+import time
 from typing import Any, List, Optional, Dict
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage
@@ -10,6 +11,8 @@ from langchain_core.outputs import ChatGeneration, ChatResult
 from langchain_core.callbacks import CallbackManagerForLLMRun
 from pydantic import Field
 
+from main.health import BackendUnavailable, backend_down, get_monitor, health_url
+
 
 class OllamaProxyAdapter(BaseChatModel):
     """
@@ -20,6 +23,8 @@ class OllamaProxyAdapter(BaseChatModel):
     proxy_url: str = Field(...)
     model: str = Field(default="phi")
     temperature: float = Field(default=0.0)
+    # Consult/update the shared backend monitor (off when LLMRouter does it)
+    circuit_breaker: bool = Field(default=True)
     
     class Config:
         """Pydantic config."""
@@ -60,7 +65,15 @@ class OllamaProxyAdapter(BaseChatModel):
             "Content-Type": "application/json"
         }
         
+        # Fail fast while the backend is known to be down instead of waiting for the timeout
+        monitor = get_monitor(health_url(self.proxy_url), name="Colab backend") if self.circuit_breaker else None
+        if monitor and not monitor.allow():
+            raise BackendUnavailable(
+                f"Ollama proxy is offline (retrying in {monitor.breaker.retry_in():.0f}s)"
+            )
+        
         try:
+            started = time.perf_counter()
             # Increase timeout for vision operations which take longer
             response = requests.post(
                 self.proxy_url,
@@ -69,6 +82,13 @@ class OllamaProxyAdapter(BaseChatModel):
                 timeout=120  # 2 minutes for vision operations
             )
             
+            if monitor:
+                # 5xx, 404 or ngrok's own error page: the backend is down; anything else means it answered
+                if backend_down(response):
+                    monitor.report_failure()
+                else:
+                    monitor.report_success(time.perf_counter() - started)
+            
             if response.status_code != 200:
                 raise Exception(f"Proxy returned {response.status_code}: {response.text}")
             
@@ -82,6 +102,10 @@ class OllamaProxyAdapter(BaseChatModel):
             
             return ChatResult(generations=[generation])
             
+        except requests.RequestException as e:
+            if monitor:
+                monitor.report_failure()
+            raise Exception(f"Error calling Ollama proxy: {e}")
         except Exception as e:
             raise Exception(f"Error calling Ollama proxy: {e}")
     
@@ -106,7 +130,8 @@ class OllamaProxyAdapter(BaseChatModel):
         return self.__class__(
             proxy_url=self.proxy_url,
             model=self.model,
-            temperature=self.temperature
+            temperature=self.temperature,
+            circuit_breaker=self.circuit_breaker
         )
     
     @property
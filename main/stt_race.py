@@ -0,0 +1,171 @@
+"""
+Speech-to-text racing for Jarvis
+The same utterance is sent to every configured engine at once; the first
+transcript at or above STT_MIN_CONFIDENCE wins and the others are cancelled
+(Whisper stops decoding, late cloud answers are ignored). Recognition takes
+as long as the fastest good engine instead of the sum of timeouts.
+
+Per-engine latency and acceptance rate are tracked and used to order the
+engines (start order and tie-breaks) and to bench an engine that keeps
+failing (e.g. no network) for a while, so it stops costing a request.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from main.utils import CancelToken
+
+STT_MIN_CONFIDENCE = float(os.getenv("STT_MIN_CONFIDENCE", "0.6"))
+STT_RACE_TIMEOUT = float(os.getenv("STT_RACE_TIMEOUT", "8"))
+
+BENCH_AFTER_ERRORS = 3
+BENCH_SECONDS = 30
+
+SttResult = namedtuple("SttResult", ["text", "confidence", "engine", "latency"])
+
+
+class EngineStats:
+    """Latency (EWMA) and outcomes of one STT engine"""
+
+    def __init__(self, name: str, expected_latency: float = 1.0, alpha: float = 0.3):
+        self.name = name
+        self.alpha = alpha
+        self.latency = expected_latency
+        self.attempts = 0
+        self.accepted = 0
+        self.errors = 0
+        self.wins = 0
+        self.consecutive_errors = 0
+        self.benched_until = 0.0
+
+    @property
+    def accept_rate(self) -> float:
+        # Laplace smoothing: a new engine starts out trusted
+        return (self.accepted + 1) / (self.attempts + 1)
+
+    @property
+    def score(self) -> float:
+        """Expected seconds to a usable transcript (lower is better)"""
+        return self.latency / max(self.accept_rate, 0.1)
+
+    @property
+    def benched(self) -> bool:
+        return time.monotonic() < self.benched_until
+
+    def record(self, latency: float, accepted: bool = False, error: bool = False):
+        self.attempts += 1
+        if error:
+            self.errors += 1
+            self.consecutive_errors += 1
+            if self.consecutive_errors >= BENCH_AFTER_ERRORS:
+                self.benched_until = time.monotonic() + BENCH_SECONDS
+                logging.warning(f"[Warning] STT engine '{self.name}' failing, skipped for {BENCH_SECONDS}s")
+            return
+        self.consecutive_errors = 0
+        self.latency = (1 - self.alpha) * self.latency + self.alpha * latency
+        if accepted:
+            self.accepted += 1
+
+
+class SttRacer:
+    """
+    Runs STT engines concurrently on one utterance.
+
+    An engine has a name, an expected_latency (seconds, used until measured) and
+    recognize(pcm, cancel) returning (text, confidence 0-1), or None when it heard
+    no speech; it raises on errors. Long-running engines should stop early once
+    cancel.cancelled is set.
+    """
+
+    def __init__(self, engines, min_confidence: float = STT_MIN_CONFIDENCE, timeout: float = STT_RACE_TIMEOUT):
+        self.engines = list(engines)
+        self.min_confidence = min_confidence
+        self.timeout = timeout
+        self.stats = {e.name: EngineStats(e.name, getattr(e, "expected_latency", 1.0)) for e in self.engines}
+        self._lock = threading.Lock()
+
+    def order(self, names=None):
+        """Usable engines, most promising first"""
+        with self._lock:
+            engines = [e for e in self.engines
+                       if (names is None or e.name in names) and not self.stats[e.name].benched]
+            return sorted(engines, key=lambda e: self.stats[e.name].score)
+
+    def _run(self, engine, pcm, cancel, results):
+        started = time.perf_counter()
+        try:
+            result = engine.recognize(pcm, cancel)
+            latency = time.perf_counter() - started
+            accepted = bool(result) and result[1] >= self.min_confidence
+            with self._lock:
+                if not cancel.cancelled or accepted:
+                    self.stats[engine.name].record(latency, accepted=accepted)
+            results.put((engine, result, None, latency))
+        except Exception as e:
+            latency = time.perf_counter() - started
+            with self._lock:
+                self.stats[engine.name].record(latency, error=True)
+            results.put((engine, None, e, latency))
+
+    def race(self, pcm: bytes, names=None):
+        """
+        Best transcript of pcm: the first at or above min_confidence, else the most
+        confident one. None if no engine heard speech; raises the last error if
+        every engine failed.
+        """
+        engines = self.order(names)
+        if not engines:
+            return None
+        rank = {e.name: i for i, e in enumerate(engines)}
+        cancel = CancelToken()
+        results = queue.Queue()
+        for engine in engines:
+            threading.Thread(target=self._run, args=(engine, pcm, cancel, results),
+                             name=f"jarvis-stt-{engine.name}", daemon=True).start()
+
+        deadline = time.monotonic() + self.timeout
+        fallback = None
+        last_error = None
+        errors = 0
+        try:
+            for _ in engines:
+                try:
+                    engine, result, error, latency = results.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    logging.warning(f"[Warning] STT race timed out after {self.timeout}s")
+                    break
+                if error is not None:
+                    logging.warning(f"[Warning] {engine.name} STT failed: {error}")
+                    last_error = error
+                    errors += 1
+                    continue
+                if not result or not result[0].strip():
+                    continue
+                text, confidence = result[0].strip(), result[1]
+                candidate = SttResult(text, confidence, engine.name, latency)
+                if confidence >= self.min_confidence:
+                    with self._lock:
+                        self.stats[engine.name].wins += 1
+                    logging.info(f"STT: {engine.name} won in {latency:.2f}s (confidence {confidence:.2f})")
+                    return candidate
+                if fallback is None or (confidence, -rank[engine.name]) > (fallback.confidence, -rank[fallback.engine]):
+                    fallback = candidate
+        finally:
+            cancel.cancel()
+
+        if fallback:
+            logging.info(f"STT: low-confidence result from {fallback.engine} ({fallback.confidence:.2f})")
+            return fallback
+        if last_error is not None and errors == len(engines):
+            raise last_error
+        return None
+
+    def summary(self) -> str:
+        with self._lock:
+            return ", ".join(
+                f"{s.name}: {s.latency:.2f}s, {s.wins} wins, {s.accept_rate:.0%} usable"
+                for s in sorted(self.stats.values(), key=lambda s: s.score)
+            )
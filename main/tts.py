@@ -1,28 +1,52 @@
 import os
+import re
+import time
 import logging
-import subprocess
+import queue
+import tempfile
+import threading
+from collections import deque
 import azure.cognitiveservices.speech as speechsdk
+from main.audio import get_player, pcm_to_wav
+from main.local_tts import get_local_speaker, LOCAL_TTS_RATE
+from main.tts_backends import AzureBackend, OfflineBackend, JARVIS_TTS_BACKEND
+from main.tts_cache import TTSCache
+from main.utils import SentenceSplitter, CancelToken
 
 AZURE_SPEECH_KEY = os.getenv("AZURE_SPEECH_KEY", "YOUR_KEY")
 AZURE_REGION = os.getenv("AZURE_REGION", "southafricanorth")
 AZURE_VOICE = os.getenv("AZURE_VOICE", "en-US-JennyNeural")
+# Queued sentences up to this many characters go out as one SSML request
+SSML_BATCH_CHARS = int(os.getenv("SSML_BATCH_CHARS", "250"))
+
+# Synthesis backend (in-memory audio, played by main/audio.py); None means local TTS only
+backend = None
+# Speaker-bound synthesizer, only used when there is no in-process audio output
+speech_synthesizer = None
 
 # Initialize Azure Speech if key is configured
-azure_available = AZURE_SPEECH_KEY and AZURE_SPEECH_KEY != "YOUR_KEY"
-if azure_available:
+azure_available = AZURE_SPEECH_KEY and AZURE_SPEECH_KEY != "YOUR_KEY" and JARVIS_TTS_BACKEND in ("", "azure")
+if JARVIS_TTS_BACKEND == "offline":
+    backend = OfflineBackend()
+    logging.info("ℹ️ Offline TTS backend (silent stand-in)")
+elif azure_available:
     try:
-        speech_config = speechsdk.SpeechConfig(subscription=AZURE_SPEECH_KEY, region=AZURE_REGION)
-        speech_config.speech_synthesis_voice_name = AZURE_VOICE
-        speech_synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config)
-        logging.info(f"✅ Azure TTS initialized ({AZURE_VOICE})")
+        backend = AzureBackend(speechsdk, AZURE_SPEECH_KEY, AZURE_REGION, AZURE_VOICE)
+        if not get_player().available:
+            speech_config = speechsdk.SpeechConfig(subscription=AZURE_SPEECH_KEY, region=AZURE_REGION)
+            speech_config.speech_synthesis_voice_name = AZURE_VOICE
+            speech_synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config)
+        logging.info(f"✅ Azure TTS initialized ({AZURE_VOICE}, {backend.output_format})")
     except Exception as e:
         logging.warning(f"⚠️ Azure TTS initialization failed: {e}")
         azure_available = False
-        speech_synthesizer = None
+        backend = None
 else:
-    speech_synthesizer = None
     logging.info("ℹ️ Azure TTS not configured, will use local fallback")
 
+# Start the local engine now so the first acknowledgment does not pay its startup
+get_local_speaker()
+
 # Quick acknowledgments that use local TTS
 QUICK_RESPONSES = {
     "yes sir",
@@ -35,71 +59,359 @@ QUICK_RESPONSES = {
     "understood sir",
 }
 
+# Pre-synthesized audio for fixed and frequently repeated phrases
+try:
+    tts_cache = TTSCache()
+except Exception as e:
+    logging.warning(f"⚠️ TTS cache unavailable: {e}")
+    tts_cache = None
+
+def _cache_voice():
+    """
+    (voice, rate) that cached audio is keyed by - whichever backend renders it; None
+    disables caching. rate holds the speaking rate and output format, so changing
+    either renders the phrases again instead of replaying stale audio.
+    """
+    if backend is None:
+        return "local", f"{LOCAL_TTS_RATE}|wav"
+    if backend.name == "offline":
+        return None
+    # Azure speaks at the voice's default rate (no prosody in the SSML)
+    return backend.voice, f"default|{backend.output_format}"
+
+def synthesize_to_cache(text: str) -> bool:
+    """Render text to WAV (backend into memory, else the local engine) and store it"""
+    key = _cache_voice()
+    if not tts_cache or key is None:
+        return False
+    voice, rate = key
+    try:
+        if backend is not None:
+            clip = backend.synthesize([text])
+            if not clip:
+                return False
+            wav_bytes = pcm_to_wav(clip.pcm, clip.rate, clip.width, clip.channels)
+        else:
+            fd, path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            try:
+                if not get_local_speaker().synthesize(text, path):
+                    return False
+                with open(path, "rb") as f:
+                    wav_bytes = f.read()
+            finally:
+                os.remove(path)
+        if not wav_bytes.startswith(b"RIFF"):
+            return False  # e.g. AIFF from pyttsx3 on macOS; not playable from the cache
+        tts_cache.put(voice, text, wav_bytes, rate)
+        return True
+    except Exception as e:
+        logging.error(f"❌ TTS cache synthesis error: {e}")
+        return False
+
+def cache_in_background(phrases):
+    """Synthesize uncached phrases on a daemon thread"""
+    if not tts_cache or not _cache_voice() or not get_player().available:
+        return
+
+    def warm():
+        voice, rate = _cache_voice()
+        for phrase in phrases:
+            if not tts_cache.get(voice, phrase, rate):
+                synthesize_to_cache(phrase)
+
+    threading.Thread(target=warm, name="jarvis-tts-cache", daemon=True).start()
+
+def is_cached(text: str) -> bool:
+    key = _cache_voice()
+    return bool(tts_cache and key and get_player().available and tts_cache.get(key[0], text, key[1]))
+
+def play_cached(text: str, block: bool = True):
+    """Play text from the cache; returns the queued Clip, or None if it is not cached"""
+    key = _cache_voice()
+    if not tts_cache or not key or not get_player().available:
+        return None
+    voice, rate = key
+    path = tts_cache.get(voice, text, rate)
+    if not path:
+        return None
+    try:
+        print(f"🔊 Speaking (cached): {text}")
+        return get_player().play_file(path, block)
+    except Exception as e:
+        logging.error(f"❌ Cached TTS playback error: {e}")
+        tts_cache.discard(TTSCache.key(voice, text, rate))
+        return None
+
+def _note_spoken(text: str):
+    """Cache text in the background once it has been spoken often enough"""
+    if tts_cache and tts_cache.note(text):
+        cache_in_background([text])
+
+# Warm the cache with the fixed acknowledgments
+if os.getenv("TTS_CACHE_WARMUP", "true").lower() == "true":
+    cache_in_background(sorted(QUICK_RESPONSES))
+
 def speak_local(text: str):
     """
-    Local PowerShell TTS for quick acknowledgments.
-    Fast, synchronous, used for greetings and confirmations.
+    Local TTS for quick acknowledgments.
+    Uses the persistent local engine (see main/local_tts.py), so there is no
+    process start per phrase. Waits until the phrase has been spoken.
     """
     try:
+        if play_cached(text):
+            return
         logging.info(f"🗣️ Local TTS (quick): {text}")
         print(f"🔊 Speaking: {text}")
-        
-        # Escape quotes in text
-        safe_text = text.replace('"', '`"')
-        
-        ps_command = f'''
-Add-Type -AssemblyName System.Speech
-$speak = New-Object System.Speech.Synthesis.SpeechSynthesizer
-$speak.Rate = 0
-$speak.Volume = 100
-$speak.Speak("{safe_text}")
-'''
-        # Run synchronously for quick responses (wait for completion)
-        subprocess.run(
-            ["powershell", "-Command", ps_command],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
-            timeout=5
-        )
+        get_local_speaker().say(text)
         logging.info("✅ Local TTS complete")
     except Exception as e:
         logging.error(f"❌ Local TTS error: {e}")
+    finally:
+        # The mic stays open while this plays; remember it for is_echo()
+        with _streams_lock:
+            _recent_speech.append((time.monotonic(), text))
+
+# Responses still being spoken, in order; each waits for the one before it
+_active_streams = set()
+_last_stream = None
+_streams_lock = threading.Lock()
+# (finished_at, text) of recent responses, for telling our own voice from the user's
+_recent_speech = deque(maxlen=8)
+ECHO_TAIL_SECONDS = 1.5
+
+def _halt_audio():
+    get_local_speaker().cancel()
+    get_player().stop()
+    if speech_synthesizer:
+        try:
+            speech_synthesizer.stop_speaking_async()
+        except Exception as e:
+            logging.debug(f"Azure stop error: {e}")
+
+def stop_speaking():
+    """Interrupt current speech and drop everything queued (barge-in)"""
+    with _streams_lock:
+        streams = list(_active_streams)
+    for stream in streams:
+        stream.cancel.cancel()
+    _halt_audio()
+
+def is_speaking() -> bool:
+    with _streams_lock:
+        if _active_streams:
+            return True
+    return get_player().is_playing
+
+def is_echo(transcript: str) -> bool:
+    """True if transcript is mostly words Jarvis is saying (or just said) - the mic hearing the speakers"""
+    words = re.findall(r"[a-z0-9']+", transcript.lower())
+    if not words:
+        return False
+    now = time.monotonic()
+    with _streams_lock:
+        texts = [stream.text for stream in _active_streams]
+        texts += [text for finished, text in _recent_speech if now - finished < ECHO_TAIL_SECONDS]
+    spoken = set(re.findall(r"[a-z0-9']+", " ".join(texts).lower()))
+    return sum(word in spoken for word in words) / len(words) >= 0.6
 
-def speak_text(text: str):
+def speak_text(text: str, block: bool = False):
     """
-    Azure TTS for full responses. High quality, natural voice.
-    Falls back to local TTS if Azure is not configured.
+    Speak a full response with the best available voice (Azure, else local).
+    Returns as soon as the text is queued; synthesis and playback run on
+    background threads. block=True waits until it has been spoken.
     """
     # Check if this is a quick acknowledgment
     if text.lower().strip() in QUICK_RESPONSES:
         logging.info("Using local TTS for quick acknowledgment")
         speak_local(text)
-        return
-    
-    # Try Azure first for full responses
-    if azure_available and speech_synthesizer:
-        try:
-            logging.info(f"🗣️ Azure TTS: {text[:50]}...")
-            print(f"🔊 Speaking (Azure): {text}")
-            
-            # Use synchronous call for Azure TTS
-            result = speech_synthesizer.speak_text(text)
-            
-            if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-                logging.info("✅ Azure TTS complete")
-            elif result.reason == speechsdk.ResultReason.Canceled:
-                cancellation = result.cancellation_details
-                logging.error(f"❌ Azure TTS canceled: {cancellation.reason}")
-                if cancellation.reason == speechsdk.CancellationReason.Error:
-                    logging.error(f"Error details: {cancellation.error_details}")
-                # Fallback to local
-                speak_local(text)
-        except Exception as e:
-            logging.error(f"❌ Azure TTS error: {e}")
-            # Fallback to local
-            speak_local(text)
+        return None
+
+    stream = SpeechStream()
+    if is_cached(text):
+        stream.add(text)  # played whole from the cache
     else:
-        # Use local TTS as fallback
-        logging.info("Using local TTS (Azure not configured)")
-        speak_local(text)
+        _note_spoken(text)
+        splitter = SentenceSplitter()
+        for sentence in splitter.feed(text):
+            stream.add(sentence)
+        stream.add(splitter.flush())
+    stream.close(wait=block)
+    return stream
+
+
+class SpeechStream:
+    """
+    Speaks sentences in order as they are added. One worker synthesizes
+    sentence N+1 while sentence N is playing, so speech starts with the first
+    sentence instead of after the whole answer; sentences that queue up
+    meanwhile are synthesized together as one SSML request. Streams play one
+    after another. Cancelling the token stops playback and drops everything
+    not yet spoken.
+    """
+
+    def __init__(self, cancel: CancelToken = None, local: bool = False):
+        global _last_stream
+        self.cancel = cancel or CancelToken()
+        self.local = local or backend is None
+        self._sentences = queue.Queue()
+        self._text = []
+        self._closed = False
+        self._started = False
+        with _streams_lock:
+            self._previous = _last_stream
+            _last_stream = self
+            _active_streams.add(self)
+        self._thread = threading.Thread(target=self._run, name="jarvis-tts-stream", daemon=True)
+        self.cancel.on_cancel(self._on_cancel)
+        self._thread.start()
+
+    @property
+    def text(self) -> str:
+        return " ".join(self._text)
+
+    def add(self, sentence: str):
+        if sentence and not self.cancel.cancelled:
+            self._text.append(sentence)
+            self._sentences.put(sentence)
+
+    def close(self, wait: bool = True):
+        """No more sentences; with wait=True block until the last one has been spoken"""
+        self._sentences.put(None)
+        if wait:
+            self._thread.join()
+
+    def _on_cancel(self):
+        # Only silence the output if it is ours; an earlier response may still be playing
+        if self._started:
+            _halt_audio()
+
+    def _next_batch(self, limit: int):
+        """Next sentence plus whatever else is already queued, up to limit characters"""
+        if self._closed:
+            return None
+        first = self._sentences.get()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first)
+        while size < limit:
+            try:
+                sentence = self._sentences.get_nowait()
+            except queue.Empty:
+                break
+            if sentence is None:
+                self._closed = True
+                break
+            batch.append(sentence)
+            size += len(sentence)
+        return batch
+
+    def _start(self, batch):
+        """Begin speaking batch; returns a callable that waits for it to finish"""
+        text = " ".join(batch)
+        if len(batch) == 1:
+            clip = play_cached(text, block=False)
+            if clip:
+                return clip.done.wait
+        print(f"🔊 Speaking: {text}")
+        if not self.local:
+            try:
+                player = get_player()
+                if player.available or backend.name == "offline":
+                    clip = backend.synthesize(batch)
+                    if clip and not self.cancel.cancelled:
+                        return player.play(clip, block=False).done.wait
+                elif speech_synthesizer:
+                    # The SDK queues requests on the synthesizer and plays them in order
+                    return speech_synthesizer.speak_text_async(text).get
+            except Exception as e:
+                logging.error(f"❌ TTS synthesis error: {e}")
+            if self.cancel.cancelled:
+                return None
+            logging.info("Falling back to local TTS")
+        return get_local_speaker().say(text, block=False).wait
+
+    def _run(self):
+        try:
+            previous = self._previous
+            self._previous = None
+            while previous and previous._thread.is_alive() and not self.cancel.cancelled:
+                previous._thread.join(0.05)
+            self._started = True
+            waiting = None
+            # The first sentence goes out alone so speech starts as early as possible
+            limit = 0
+            while not self.cancel.cancelled:
+                batch = self._next_batch(limit)
+                if not batch:
+                    break
+                wait = self._start(batch)
+                # Batch N is now playing; hold N+1 until N-1 has finished
+                if waiting:
+                    waiting()
+                waiting = wait
+                limit = SSML_BATCH_CHARS
+            if waiting and not self.cancel.cancelled:
+                waiting()
+        finally:
+            with _streams_lock:
+                _active_streams.discard(self)
+                _recent_speech.append((time.monotonic(), self.text))
+
+
+def speak_stream(chunks, cancel: CancelToken = None, local: bool = False, block: bool = True) -> str:
+    """
+    Speak streamed text (e.g. LLM chunks) sentence by sentence while it is
+    still being generated. Returns the full text that was received; stops
+    early if cancel is triggered. block=False returns once all chunks are
+    consumed and leaves the rest of the audio playing in the background.
+    """
+    stream = SpeechStream(cancel, local)
+    splitter = SentenceSplitter()
+    received = []
+    try:
+        for chunk in chunks:
+            if stream.cancel.cancelled:
+                break
+            received.append(chunk)
+            for sentence in splitter.feed(chunk):
+                stream.add(sentence)
+        stream.add(splitter.flush())
+        stream.close(wait=block)
+    except BaseException:
+        stream.cancel.cancel()
+        stream.close(wait=False)
+        raise
+    return "".join(received)
+
+def speak_chat(llm, messages, prefix: str = "🤖 Jarvis: ", local: bool = False) -> bool:
+    """
+    Print and speak a chat model's answer sentence by sentence while it is generated.
+    Returns False if the model failed before saying anything (the caller can
+    hand the turn to another model), True once an answer was delivered.
+    """
+    started = False
+
+    def chunks():
+        nonlocal started
+        for chunk in llm.stream(messages):
+            text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+            if text:
+                if not started:
+                    print(prefix, end="", flush=True)
+                    started = True
+                print(text, end="", flush=True)
+                yield text
+
+    try:
+        speak_stream(chunks(), local=local, block=False)
+        print()
+        return True
+    except Exception as e:
+        if not started:
+            logging.warning(f"⚠️ Chat model failed before answering: {e}")
+            return False
+        print()
+        logging.error(f"❌ Chat error: {e}")
+        return True
@@ -0,0 +1,96 @@
+"""
+Speech synthesis backends for Jarvis
+A backend turns one or more text segments into a Clip (in-memory PCM) and
+never touches the speaker; main/audio.py plays the result on its own thread.
+
+  azure   - Azure Speech with audio_config=None. Audio is requested in
+            AZURE_TTS_FORMAT (compressed Ogg/Opus by default when PyAV can
+            decode it) and several segments go out as one SSML request.
+  offline - silent stand-in that takes as long to "speak" as real speech
+            would; records every request (tests, headless runs).
+
+JARVIS_TTS_BACKEND picks one (default: azure when configured).
+"""
+import logging
+import os
+import re
+import time
+from xml.sax.saxutils import escape
+
+from main.audio import Clip, decode_compressed, AV_AVAILABLE
+
+JARVIS_TTS_BACKEND = os.getenv("JARVIS_TTS_BACKEND", "").lower()
+AZURE_TTS_FORMAT = os.getenv("AZURE_TTS_FORMAT") or ("Ogg24Khz16BitMonoOpus" if AV_AVAILABLE else "Riff24Khz16BitMonoPcm")
+SSML_BREAK_MS = int(os.getenv("SSML_BREAK_MS", "150"))
+
+
+def to_ssml(segments, voice: str, break_ms: int = SSML_BREAK_MS) -> str:
+    """One SSML document speaking all segments with a short pause between them"""
+    lang = "-".join(voice.split("-")[:2]) or "en-US"
+    body = f'<break time="{break_ms}ms"/>'.join(escape(s) for s in segments)
+    return (f'<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="{lang}">'
+            f'<voice name="{escape(voice)}">{body}</voice></speak>')
+
+
+class AzureBackend:
+    """Azure synthesis into memory in a configurable (compressed) format"""
+
+    name = "azure"
+
+    def __init__(self, speechsdk, key: str, region: str, voice: str, output_format: str = AZURE_TTS_FORMAT):
+        self.voice = voice
+        self._sdk = speechsdk
+        compressed = not output_format.startswith(("Riff", "Raw"))
+        if compressed and not AV_AVAILABLE:
+            logging.warning(f"⚠️ {output_format} needs PyAV to decode, using Riff24Khz16BitMonoPcm")
+            output_format = "Riff24Khz16BitMonoPcm"
+        self.output_format = output_format
+        match = re.search(r"(\d+)Khz", output_format)
+        self.rate = int(match.group(1)) * 1000 if match else 24000
+        speech_config = speechsdk.SpeechConfig(subscription=key, region=region)
+        speech_config.speech_synthesis_voice_name = voice
+        speech_config.set_speech_synthesis_output_format(
+            getattr(speechsdk.SpeechSynthesisOutputFormat, output_format)
+        )
+        # audio_config=None: audio stays in result.audio_data instead of going to the speaker
+        self._synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+
+    def _to_clip(self, data: bytes) -> Clip:
+        if self.output_format.startswith("Riff"):
+            return Clip.from_wav(data)
+        if self.output_format.startswith("Raw"):
+            return Clip(data, self.rate)
+        return decode_compressed(data, self.rate)
+
+    def synthesize(self, segments) -> Clip:
+        """Clip for the segments (one request), or None on failure"""
+        if len(segments) == 1:
+            future = self._synthesizer.speak_text_async(segments[0])
+        else:
+            future = self._synthesizer.speak_ssml_async(to_ssml(segments, self.voice))
+        result = future.get()
+        if result.reason != self._sdk.ResultReason.SynthesizingAudioCompleted:
+            details = getattr(result, "cancellation_details", None)
+            logging.error(f"❌ Azure synthesis failed: {result.reason} {getattr(details, 'error_details', '')}")
+            return None
+        return self._to_clip(result.audio_data)
+
+
+class OfflineBackend:
+    """Silent stand-in: clips last as long as the text would take to say"""
+
+    name = "offline"
+    voice = "offline"
+
+    def __init__(self, chars_per_second: float = 15.0, latency: float = 0.0, rate: int = 16000):
+        self.chars_per_second = chars_per_second
+        self.latency = latency
+        self.rate = rate
+        self.requests = []
+
+    def synthesize(self, segments) -> Clip:
+        self.requests.append(list(segments))
+        if self.latency:
+            time.sleep(self.latency)
+        seconds = sum(len(s) for s in segments) / self.chars_per_second
+        return Clip(b"\0\0" * int(seconds * self.rate), self.rate)
@@ -0,0 +1,111 @@
+"""
+On-disk cache of synthesized speech for Jarvis
+Fixed phrases ("yes sir", "goodbye sir", ...) and any text spoken more than
+TTS_CACHE_PROMOTE_AFTER times are synthesized once and stored as WAV under
+~/.jarvis/tts_cache, keyed by (voice, rate, text). Replays are read from disk
+and played directly, so they neither wait for synthesis nor use Azure quota.
+The directory is kept under TTS_CACHE_MB by evicting least recently played
+files (file mtimes carry the LRU order across restarts).
+"""
+import hashlib
+import os
+import threading
+from collections import Counter, OrderedDict
+
+from tools.storage import atomic_writer
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".jarvis", "tts_cache"))
+TTS_CACHE_MB = float(os.getenv("TTS_CACHE_MB", "50"))
+TTS_CACHE_PROMOTE_AFTER = int(os.getenv("TTS_CACHE_PROMOTE_AFTER", "3"))
+MAX_TRACKED_TEXTS = 10000
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+class TTSCache:
+    """LRU-bounded directory of WAV files keyed by (voice, rate, text)"""
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = int(TTS_CACHE_MB * 1024 * 1024),
+                 promote_after: int = TTS_CACHE_PROMOTE_AFTER):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.promote_after = promote_after
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # key -> size, least recently used first
+        self._total = 0
+        self._seen = Counter()
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".wav") and not name.startswith("."):
+                st = os.stat(os.path.join(self.directory, name))
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._lru[key] = size
+            self._total += size
+
+    @staticmethod
+    def key(voice: str, text: str, rate: str = "") -> str:
+        return hashlib.sha1(f"{voice}|{rate}|{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".wav")
+
+    def get(self, voice: str, text: str, rate: str = ""):
+        """Path of the cached WAV, or None; a hit marks it most recently used"""
+        key = self.key(voice, text, rate)
+        with self._lock:
+            if key not in self._lru:
+                return None
+            self._lru.move_to_end(key)
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.discard(key)
+            return None
+        return path
+
+    def put(self, voice: str, text: str, wav_bytes: bytes, rate: str = "") -> str:
+        """Store synthesized audio and evict old entries beyond the size limit"""
+        key = self.key(voice, text, rate)
+        path = self.path(key)
+        with atomic_writer(path, binary=True) as f:
+            f.write(wav_bytes)
+        with self._lock:
+            self._total += len(wav_bytes) - self._lru.pop(key, 0)
+            self._lru[key] = len(wav_bytes)
+            while self._total > self.max_bytes and len(self._lru) > 1:
+                old_key, size = self._lru.popitem(last=False)
+                self._total -= size
+                try:
+                    os.remove(self.path(old_key))
+                except OSError:
+                    pass
+        return path
+
+    def discard(self, key: str):
+        with self._lock:
+            self._total -= self._lru.pop(key, 0)
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def note(self, text: str) -> bool:
+        """Count a use of text; True exactly when it becomes frequent enough to cache"""
+        text = normalize_text(text)
+        with self._lock:
+            self._seen[text] += 1
+            if len(self._seen) > MAX_TRACKED_TEXTS:
+                self._seen = Counter(dict(self._seen.most_common(MAX_TRACKED_TEXTS // 2)))
+            return self._seen[text] == self.promote_after
+
+    def __len__(self):
+        with self._lock:
+            return len(self._lru)
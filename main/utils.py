@@ -1,4 +1,6 @@
+import logging
 import re
+import threading
 
 def choose_best_sentence(text: str, candidates: list[str] | None = None) -> str:
     interjections = {"certainly", "sure", "okay", "ok", "right away", "one moment", "of course", "got it", "alright", "yes"}
@@ -52,3 +54,89 @@ def is_refusal(s: str) -> bool:
         "i don't have",
     ]
     return any(p in low for p in patterns)
+
+
+# Words whose trailing period does not end a sentence
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "st", "vs", "etc", "e.g", "i.e", "jr", "sr", "prof", "no", "approx", "fig"}
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*(?=\s)|\n+')
+
+
+class SentenceSplitter:
+    """
+    Incremental sentence segmentation for streamed LLM output.
+    feed() returns the sentences completed by a chunk; a sentence only ends at
+    punctuation followed by whitespace (or a newline), so "3." / "Dr." at the
+    end of a chunk wait for the next one. Fragments shorter than min_chars
+    (list numbers, "Sure.") are joined to the following sentence.
+    """
+
+    def __init__(self, min_chars: int = 10):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def _is_boundary(self, match) -> bool:
+        if match.group().startswith("\n"):
+            return True
+        if match.group() != ".":
+            return True
+        words = self.buffer[:match.start()].split()
+        last = words[-1].lower() if words else ""
+        # Abbreviations and initials ("J. R. R. Tolkien")
+        return last not in ABBREVIATIONS and not (len(last) == 1 and last.isalpha())
+
+    def feed(self, chunk: str) -> list[str]:
+        self.buffer += chunk or ""
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            if not self._is_boundary(match):
+                continue
+            sentence = self.buffer[start:match.end()].strip()
+            if len(sentence) < self.min_chars and not match.group().startswith("\n"):
+                continue
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> str:
+        """Whatever is left once the stream has ended"""
+        rest, self.buffer = self.buffer.strip(), ""
+        return rest
+
+
+class CancelToken:
+    """Set once to abandon a response; registered callbacks run on cancel (e.g. stop audio)"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f"Cancel callback error: {e}")
+
+    def on_cancel(self, callback):
+        """Run callback on cancel (immediately if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._event.wait(timeout)
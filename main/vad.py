@@ -0,0 +1,201 @@
+"""
+Voice activity detection for Jarvis
+Frame-by-frame speech / non-speech decisions over the continuous capture
+stream, turned into utterances by a Segmenter:
+
+  webrtc - webrtcvad (pip install webrtcvad) at VAD_AGGRESSIVENESS 0-3
+  energy - RMS against the noise floor (no extra dependency)
+
+The noise floor is learned from non-speech frames and saved to
+~/.jarvis/noise_profile.json, so there is no calibration pause before each
+utterance. Each utterance keeps VAD_PREROLL_MS of audio from before speech
+was detected (the first syllable) and ends after VAD_HANGOVER_MS of silence.
+"""
+import json
+import logging
+import os
+import queue
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+from main.capture import frame_rms, SAMPLE_RATE, FRAME_MS
+from tools.storage import atomic_write_json
+
+WEBRTCVAD_AVAILABLE = False
+try:
+    import webrtcvad
+    WEBRTCVAD_AVAILABLE = True
+except ImportError:
+    pass
+
+VAD_ENGINE = os.getenv("VAD_ENGINE", "auto").lower()  # auto | webrtc | energy
+VAD_AGGRESSIVENESS = int(os.getenv("VAD_AGGRESSIVENESS", "2"))
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "300"))
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "600"))
+VAD_START_MS = int(os.getenv("VAD_START_MS", "90"))  # Voiced audio needed to open an utterance
+VAD_MAX_UTTERANCE_SECONDS = float(os.getenv("VAD_MAX_UTTERANCE_SECONDS", "15"))
+NOISE_PROFILE_FILE = os.path.join(os.path.expanduser("~"), ".jarvis", "noise_profile.json")
+
+SPEECH_RATIO = 3.0  # Energy VAD: speech is this many times louder than the noise floor
+MIN_SPEECH_RMS = 300
+SAVE_INTERVAL_SECONDS = 30
+
+Utterance = namedtuple("Utterance", ["pcm", "start_ms", "end_ms"])
+
+
+class NoiseProfile:
+    """Running noise floor (RMS), persisted so startup needs no calibration"""
+
+    def __init__(self, path: str = NOISE_PROFILE_FILE, alpha: float = 0.05):
+        self.path = path
+        self.alpha = alpha
+        self.floor = None
+        self._saved_floor = None
+        self._saved_at = 0.0
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.floor = float(json.load(f)["floor"])
+                self._saved_floor = self.floor
+            except Exception as e:
+                logging.warning(f"[Warning] Ignoring noise profile {path}: {e}")
+
+    def threshold(self, ratio: float = SPEECH_RATIO) -> float:
+        return max((self.floor or 0.0) * ratio, MIN_SPEECH_RMS)
+
+    def update(self, rms: float):
+        """Fold in a non-speech frame"""
+        self.floor = rms if self.floor is None else (1 - self.alpha) * self.floor + self.alpha * rms
+        if self.path and time.monotonic() - self._saved_at > SAVE_INTERVAL_SECONDS:
+            if self._saved_floor is None or abs(self.floor - self._saved_floor) > 0.1 * self._saved_floor:
+                self.save()
+
+    def save(self):
+        if not self.path or self.floor is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            atomic_write_json(self.path, {"floor": round(self.floor, 2), "updated": datetime.now().isoformat()})
+            self._saved_floor = self.floor
+            self._saved_at = time.monotonic()
+        except OSError as e:
+            logging.warning(f"[Warning] Could not save noise profile: {e}")
+
+
+class EnergyVAD:
+    """Speech = frame energy well above the noise floor"""
+
+    name = "energy"
+
+    def __init__(self, profile: NoiseProfile):
+        self.profile = profile
+
+    def is_speech(self, frame: bytes, rms: float) -> bool:
+        return rms > self.profile.threshold()
+
+
+class WebRtcVAD:
+    """webrtcvad decisions, ignoring frames barely above the noise floor"""
+
+    name = "webrtc"
+
+    def __init__(self, profile: NoiseProfile, aggressiveness: int = VAD_AGGRESSIVENESS, rate: int = SAMPLE_RATE):
+        self.profile = profile
+        self.rate = rate
+        self._vad = webrtcvad.Vad(aggressiveness)
+
+    def is_speech(self, frame: bytes, rms: float) -> bool:
+        return rms > self.profile.threshold(1.5) and self._vad.is_speech(frame, self.rate)
+
+
+def make_vad(profile: NoiseProfile, engine: str = VAD_ENGINE, rate: int = SAMPLE_RATE):
+    if engine in ("auto", "webrtc") and WEBRTCVAD_AVAILABLE:
+        return WebRtcVAD(profile, rate=rate)
+    if engine == "webrtc":
+        logging.warning("[Warning] webrtcvad not installed, using energy VAD")
+    return EnergyVAD(profile)
+
+
+class Segmenter:
+    """Turns per-frame VAD decisions into utterances (pre-roll + hangover)"""
+
+    def __init__(self, vad=None, profile: NoiseProfile = None, frame_ms: int = FRAME_MS,
+                 preroll_ms: int = VAD_PREROLL_MS, hangover_ms: int = VAD_HANGOVER_MS,
+                 start_ms: int = VAD_START_MS, max_seconds: float = VAD_MAX_UTTERANCE_SECONDS):
+        self.profile = profile or NoiseProfile()
+        self.vad = vad or make_vad(self.profile)
+        self.frame_ms = frame_ms
+        self.preroll_frames = max(1, preroll_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.max_frames = int(max_seconds * 1000 // frame_ms)
+        self.frame_index = 0
+        self.reset()
+
+    @property
+    def in_speech(self) -> bool:
+        return self._speech is not None
+
+    def reset(self):
+        self._preroll = deque(maxlen=self.preroll_frames)
+        self._speech = None
+        self._start = 0
+        self._voiced = 0
+        self._silent = 0
+
+    def push(self, frame: bytes):
+        """Feed one frame; returns an Utterance when one has just ended"""
+        index = self.frame_index
+        self.frame_index += 1
+        rms = frame_rms(frame)
+        if self.profile.floor is None:
+            self.profile.update(rms)
+        speech = self.vad.is_speech(frame, rms)
+
+        if self._speech is None:
+            self._preroll.append(frame)
+            if speech:
+                self._voiced += 1
+            else:
+                self._voiced = 0
+                self.profile.update(rms)
+            if self._voiced >= self.start_frames:
+                self._speech = list(self._preroll)
+                self._start = index + 1 - len(self._preroll)
+                self._silent = 0
+            return None
+
+        self._speech.append(frame)
+        self._silent = 0 if speech else self._silent + 1
+        if self._silent >= self.hangover_frames or len(self._speech) >= self.max_frames:
+            utterance = Utterance(b"".join(self._speech), self._start * self.frame_ms,
+                                  (index + 1) * self.frame_ms)
+            self.reset()
+            return utterance
+        return None
+
+    def flush(self):
+        """End of input: the utterance in progress, if any"""
+        if self._speech is None:
+            return None
+        utterance = Utterance(b"".join(self._speech), self._start * self.frame_ms,
+                              self.frame_index * self.frame_ms)
+        self.reset()
+        return utterance
+
+    def next_utterance(self, frames: queue.Queue, timeout: float):
+        """Utterance from a live frame queue, or None if no speech starts within timeout"""
+        self.reset()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                frame = frames.get(timeout=0.1)
+            except queue.Empty:
+                frame = None
+            if frame is not None:
+                utterance = self.push(frame)
+                if utterance:
+                    return utterance
+            if not self.in_speech and time.monotonic() > deadline:
+                return None
@@ -1,32 +1,28 @@
 import os
 import logging
-import requests
 from dotenv import load_dotenv
 
 load_dotenv()
 VISION_URL = os.getenv('VISION_URL')
+# Vision tools are registered whenever a server is configured; whether it is up
+# right now is tracked in the background (vision_available())
 VISION_AVAILABLE = False
 vision = None
 
 if VISION_URL:
-    logging.info(f"🖼️ Detected VISION_URL: {VISION_URL} — checking /health...")
+    logging.info(f"🖼️ Detected VISION_URL: {VISION_URL} — initializing RemoteVision")
     try:
-        health_resp = requests.get(VISION_URL.rstrip('/') + '/health', timeout=5)
-        if health_resp.status_code == 200:
-            logging.info("🟢 Vision /health reachable — initializing RemoteVision")
-            try:
-                from vision_remote import RemoteVision
-                vision = RemoteVision()
-                VISION_AVAILABLE = getattr(vision, 'available', True)
-            except Exception as e:
-                logging.warning(f"⚠️ Could not initialize RemoteVision: {e}")
-                vision = None
-                VISION_AVAILABLE = False
-        else:
-            logging.warning(f"⚠️ Vision /health returned {health_resp.status_code}; will not initialize vision")
-            VISION_AVAILABLE = False
+        from vision_remote import RemoteVision
+        vision = RemoteVision()
+        VISION_AVAILABLE = True
     except Exception as e:
-        logging.warning(f"⚠️ Could not reach Vision URL ({VISION_URL}): {e}")
+        logging.warning(f"⚠️ Could not initialize RemoteVision: {e}")
+        vision = None
         VISION_AVAILABLE = False
 else:
     logging.info("ℹ️ No VISION_URL set; vision features disabled")
+
+
+def vision_available() -> bool:
+    """Vision configured and its server not known to be down"""
+    return vision is not None and vision.available
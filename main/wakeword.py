@@ -0,0 +1,288 @@
+"""
+On-device wake word for Jarvis
+A small keyword spotter that runs on the capture stream while Jarvis is idle,
+so nothing is sent to Azure / Google / Whisper until the wake word is heard.
+
+The user records the wake word a few times (python scripts/enroll_wakeword.py).
+Each recording is stored as a sequence of MFCC frames; live audio is turned
+into MFCCs 10 ms at a time and matched against every template with
+subsequence DTW, updated incrementally per frame. The word fires as soon as
+its last syllable matches, instead of after an STT round trip.
+
+Needs numpy (installed with faster-whisper / opencv). Without numpy or an
+enrollment, main_voice falls back to listening for "hello" / "jarvis" via STT.
+"""
+import logging
+import os
+import queue
+import time
+
+from main.capture import get_capture, frame_rms, SAMPLE_RATE
+from main.vad import NoiseProfile, Segmenter
+from tools.storage import atomic_writer
+
+NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    logging.warning("[Warning] numpy not available, wake word disabled")
+
+WAKEWORD_FILE = os.path.expanduser(os.getenv("WAKEWORD_FILE", os.path.join("~", ".jarvis", "wakeword.npz")))
+WAKEWORD_THRESHOLD = os.getenv("WAKEWORD_THRESHOLD")  # Overrides the threshold learned at enrollment
+WAKEWORD_REFRACTORY_SECONDS = 1.5
+
+WIN_SAMPLES = 400   # 25 ms analysis window
+HOP_SAMPLES = 160   # 10 ms hop
+N_FFT = 512
+N_MELS = 26
+N_MFCC = 13
+
+
+def _mel_filterbank(rate: int = SAMPLE_RATE):
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    mels = np.linspace(hz_to_mel(60), hz_to_mel(rate / 2), N_MELS + 2)
+    bins = np.floor((N_FFT + 1) * mel_to_hz(mels) / rate).astype(int)
+    bank = np.zeros((N_MELS, N_FFT // 2 + 1))
+    for m in range(1, N_MELS + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        for k in range(left, center):
+            bank[m - 1, k] = (k - left) / max(center - left, 1)
+        for k in range(center, right):
+            bank[m - 1, k] = (right - k) / max(right - center, 1)
+    return bank
+
+
+class MFCC:
+    """Streaming MFCCs (25 ms window, 10 ms hop)
+
+    c0 (loudness) is dropped so the distance ignores how loud the word is.
+    Templates and live audio come from the same microphone, so no cepstral
+    mean normalization is applied.
+    """
+
+    def __init__(self, rate: int = SAMPLE_RATE):
+        self.window = np.hamming(WIN_SAMPLES)
+        self.bank = _mel_filterbank(rate)
+        n = np.arange(N_MELS)
+        self.dct = np.cos(np.pi / N_MELS * (n + 0.5)[None, :] * np.arange(N_MFCC)[:, None])
+        self.reset()
+
+    def reset(self):
+        self._samples = np.zeros(0)
+
+    def _frames(self, samples):
+        """(MFCC rows, RMS per row) for every complete window in samples"""
+        count = 1 + (len(samples) - WIN_SAMPLES) // HOP_SAMPLES
+        if count <= 0:
+            return np.zeros((0, N_MFCC - 1)), np.zeros(0)
+        idx = np.arange(WIN_SAMPLES)[None, :] + HOP_SAMPLES * np.arange(count)[:, None]
+        windows = samples[idx]
+        spectrum = np.abs(np.fft.rfft(windows * self.window, N_FFT)) ** 2
+        mel = np.log(spectrum @ self.bank.T + 1e-8)
+        return (mel @ self.dct.T)[:, 1:], np.sqrt((windows ** 2).mean(axis=1))
+
+    def feed(self, pcm: bytes):
+        """MFCC rows for the hops completed by this chunk of 16-bit PCM"""
+        self._samples = np.concatenate([self._samples, np.frombuffer(pcm, dtype=np.int16) / 32768.0])
+        feats, _ = self._frames(self._samples)
+        self._samples = self._samples[len(feats) * HOP_SAMPLES:]
+        return feats
+
+    def of(self, pcm: bytes):
+        """MFCCs of a recorded word, without the quiet frames at either end"""
+        feats, energy = self._frames(np.frombuffer(pcm, dtype=np.int16) / 32768.0)
+        voiced = np.where(energy > 0.1 * energy.max())[0] if len(energy) else []
+        if len(voiced) == 0:
+            return feats
+        return feats[voiced[0]:voiced[-1] + 1]
+
+
+class _TemplateMatcher:
+    """Subsequence DTW of one template against the live MFCC stream, one column per frame
+
+    Every step consumes one stream frame and moves 0, 1 or 2 template frames
+    (local slope 0..2), so a column depends only on the previous one and is
+    computed with a few numpy operations.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.reset()
+
+    def reset(self):
+        n = len(self.template)
+        self.cost = np.full(n, np.inf)
+        self.length = np.ones(n)
+
+    def step(self, row) -> float:
+        """Advance by one stream frame; normalized cost of the best match ending here"""
+        dist = np.linalg.norm(self.template - row, axis=1)
+        inf = np.array([np.inf, np.inf])
+        one = np.array([1.0, 1.0])
+        costs = np.stack([self.cost, np.concatenate([inf[:1], self.cost[:-1]]), np.concatenate([inf, self.cost[:-2]])])
+        lengths = np.stack([self.length, np.concatenate([one[:1], self.length[:-1]]), np.concatenate([one, self.length[:-2]])])
+        best = np.argmin(costs / lengths, axis=0)
+        columns = np.arange(len(dist))
+        cost = dist + costs[best, columns]
+        length = lengths[best, columns] + 1
+        # The template may start at any stream frame (open beginning)
+        cost[0], length[0] = dist[0], 1
+        self.cost, self.length = cost, length
+        return cost[-1] / length[-1]
+
+
+class WakeWordDetector:
+    """Listens to the capture stream and reports when an enrolled wake word is spoken"""
+
+    def __init__(self, templates, threshold: float, capture=None, profile: NoiseProfile = None):
+        self.templates = templates
+        self.threshold = threshold
+        self.capture = capture or get_capture()
+        self.profile = profile or NoiseProfile()
+        self.max_silent_frames = max(len(t) for t in templates) // 3 + 10  # In 30 ms capture frames
+        self._mfcc = MFCC(self.capture.rate)
+        self._matchers = [_TemplateMatcher(t) for t in templates]
+        self._frames = None
+        self._silent = self.max_silent_frames
+        self._frame_index = 0
+        self._fired_at = None
+        self.refractory_frames = int(WAKEWORD_REFRACTORY_SECONDS * 1000 // self.capture.frame_ms)
+        self.last_score = None
+
+    @classmethod
+    def load(cls, path: str = WAKEWORD_FILE, **kwargs):
+        """Detector from an enrollment file, or None if there is none"""
+        if not NUMPY_AVAILABLE or not os.path.exists(path):
+            return None
+        try:
+            data = np.load(path)
+            templates = [data[k] for k in sorted(data.files) if k.startswith("template_")]
+            threshold = float(WAKEWORD_THRESHOLD) if WAKEWORD_THRESHOLD else float(data["threshold"])
+        except Exception as e:
+            logging.warning(f"[Warning] Could not load wake word from {path}: {e}")
+            return None
+        if not templates:
+            return None
+        logging.info(f"[OK] Wake word loaded ({len(templates)} templates, threshold {threshold:.2f})")
+        return cls(templates, threshold, **kwargs)
+
+    def start(self):
+        self.capture.start()
+        if self._frames is None:
+            self._frames = self.capture.subscribe()
+
+    def stop(self):
+        if self._frames is not None:
+            self.capture.unsubscribe(self._frames)
+            self._frames = None
+
+    def reset(self):
+        """Forget buffered audio (e.g. after a conversation, while the queue kept filling)"""
+        if self._frames is not None:
+            while True:
+                try:
+                    self._frames.get_nowait()
+                except queue.Empty:
+                    break
+        self._mfcc.reset()
+        for matcher in self._matchers:
+            matcher.reset()
+        self._silent = self.max_silent_frames
+
+    def push(self, frame: bytes) -> bool:
+        """Feed one capture frame; True when the wake word has just ended"""
+        self._frame_index += 1
+        rms = frame_rms(frame)
+        if rms > self.profile.threshold(1.5):
+            self._silent = 0
+        else:
+            self._silent += 1
+            if self.profile.floor is None or rms < self.profile.threshold():
+                self.profile.update(rms)
+        if self._silent > self.max_silent_frames:
+            # Nothing said for longer than the word: skip the maths entirely
+            if self._silent == self.max_silent_frames + 1:
+                self._mfcc.reset()
+                for matcher in self._matchers:
+                    matcher.reset()
+            return False
+
+        fired = False
+        for row in self._mfcc.feed(frame):
+            scores = [matcher.step(row) for matcher in self._matchers]
+            self.last_score = min(scores)
+            recently_fired = self._fired_at is not None and self._frame_index - self._fired_at < self.refractory_frames
+            if self.last_score < self.threshold and not recently_fired:
+                self._fired_at = self._frame_index
+                fired = True
+        if fired:
+            for matcher in self._matchers:
+                matcher.reset()
+        return fired
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the wake word is heard (True) or timeout passes (False)"""
+        self.start()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                frame = self._frames.get(timeout=min(remaining, 0.1))
+            except queue.Empty:
+                continue
+            if self.push(frame):
+                return True
+
+
+def match_score(template, feats) -> float:
+    """Best score of template anywhere in feats, as the live detector would see it"""
+    matcher = _TemplateMatcher(template)
+    return min(matcher.step(row) for row in feats)
+
+
+def threshold_from_templates(templates) -> float:
+    """Accept live audio somewhat further from the templates than they are from each other"""
+    scores = [match_score(a, b) for a in templates for b in templates if a is not b]
+    return 1.5 * max(scores) if scores else 8.0
+
+
+def enroll(count: int = 3, path: str = WAKEWORD_FILE, capture=None, timeout: float = 8.0) -> bool:
+    """Record the wake word count times from the microphone and save the templates"""
+    if not NUMPY_AVAILABLE:
+        print("[ERROR] numpy is required for the wake word")
+        return False
+    capture = capture or get_capture()
+    capture.start()
+    segmenter = Segmenter(frame_ms=capture.frame_ms, hangover_ms=300, max_seconds=2.5)
+    mfcc = MFCC(capture.rate)
+    templates = []
+    while len(templates) < count:
+        print(f"[MIC] Say the wake word ({len(templates) + 1}/{count})...")
+        frames = capture.subscribe()
+        try:
+            utterance = segmenter.next_utterance(frames, timeout)
+        finally:
+            capture.unsubscribe(frames)
+        if not utterance:
+            print("   Didn't hear anything, try again")
+            continue
+        feats = mfcc.of(utterance.pcm)
+        if not 20 <= len(feats) <= 200:
+            print("   That was too short or too long for a wake word, try again")
+            continue
+        templates.append(feats)
+
+    threshold = threshold_from_templates(templates)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_writer(path, binary=True) as f:
+        np.savez(f, threshold=threshold, **{f"template_{i}": t for i, t in enumerate(templates)})
+    print(f"[OK] Wake word saved to {path} (threshold {threshold:.2f})")
+    return True
@@ -0,0 +1,180 @@
+"""
+Local speech-to-text service (Faster Whisper) for Jarvis
+The model is loaded once in a background thread at startup, so the first
+local transcription does not stall for seconds. Audio is passed in memory as
+a float32 numpy array. Each request picks greedy or beam search from the
+measured speed of this machine and the latency budget:
+
+  WHISPER_MODEL=base             tiny | base | small | medium | large-v3 | ...
+  WHISPER_COMPUTE_TYPE=int8      int8 | int8_float32 | float32 | float16 (GPU)
+  WHISPER_CPU_THREADS=0          0 = CTranslate2 default
+  WHISPER_NUM_WORKERS=1          parallel transcriptions (one per thread)
+  WHISPER_LATENCY_BUDGET=1.5     seconds allowed per utterance before falling back to greedy
+
+Compare configurations on your machine with scripts/bench_whisper.py.
+"""
+import logging
+import math
+import os
+import threading
+import time
+
+FASTER_WHISPER_AVAILABLE = False
+try:
+    from faster_whisper import WhisperModel
+    import numpy as np
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    logging.warning("[Warning] faster-whisper not available")
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "1"))
+WHISPER_LATENCY_BUDGET = float(os.getenv("WHISPER_LATENCY_BUDGET", "1.5"))
+WHISPER_VAD_FILTER = os.getenv("WHISPER_VAD_FILTER", "true").lower() == "true"
+
+BEAM_SIZE = 5
+LOAD_TIMEOUT_SECONDS = 60
+
+
+def pcm_to_float32(pcm: bytes):
+    """16-bit PCM bytes -> float32 samples in [-1, 1], as Whisper expects"""
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+class WhisperService:
+    """One resident Faster Whisper model with latency-aware decoding"""
+
+    def __init__(self, model_size: str = WHISPER_MODEL, device: str = WHISPER_DEVICE,
+                 compute_type: str = WHISPER_COMPUTE_TYPE, cpu_threads: int = WHISPER_CPU_THREADS,
+                 num_workers: int = WHISPER_NUM_WORKERS, latency_budget: float = WHISPER_LATENCY_BUDGET,
+                 vad_filter: bool = WHISPER_VAD_FILTER):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.latency_budget = latency_budget
+        self.vad_filter = vad_filter
+        self.model = None
+        self.error = None
+        self._loaded = threading.Event()
+        self._load_lock = threading.Lock()
+        self._loading = False
+        # Seconds of decoding per second of audio, per beam size (EWMA)
+        self._rtf = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.model is not None
+
+    def preload(self):
+        """Start loading the model in the background (no-op if already loading)"""
+        with self._load_lock:
+            if self._loading or self._loaded.is_set():
+                return
+            self._loading = True
+        threading.Thread(target=self._load, name="jarvis-whisper-load", daemon=True).start()
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            self.model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type,
+                                      cpu_threads=self.cpu_threads, num_workers=self.num_workers)
+            logging.info(f"[OK] Faster Whisper '{self.model_size}' loaded in {time.perf_counter() - started:.1f}s "
+                         f"({self.compute_type}, {self.cpu_threads or 'auto'} threads, {self.num_workers} workers)")
+        except Exception as e:
+            self.error = e
+            logging.error(f"[ERROR] Failed to load Faster Whisper: {e}")
+        finally:
+            self._loaded.set()
+
+    def wait_ready(self, timeout: float = LOAD_TIMEOUT_SECONDS) -> bool:
+        self.preload()
+        self._loaded.wait(timeout)
+        return self.ready
+
+    def rtf(self, beam_size: int):
+        return self._rtf.get(beam_size)
+
+    def choose_beam_size(self, audio_seconds: float, budget: float = None) -> int:
+        """Beam search if this machine is known to finish it within budget, else greedy"""
+        budget = self.latency_budget if budget is None else budget
+        beam_rtf = self._rtf.get(BEAM_SIZE)
+        if beam_rtf is None:
+            greedy_rtf = self._rtf.get(1)
+            if greedy_rtf is None:
+                return 1
+            # Beam search costs roughly twice greedy on CPU until measured
+            beam_rtf = 2 * greedy_rtf
+        return BEAM_SIZE if audio_seconds * beam_rtf <= budget else 1
+
+    def transcribe(self, audio, budget: float = None, beam_size: int = None) -> str:
+        """
+        Transcribe float32 samples at 16 kHz (or 16-bit PCM bytes).
+        Waits for the model if it is still loading.
+        """
+        return self.transcribe_detailed(audio, budget, beam_size)[0]
+
+    def transcribe_detailed(self, audio, budget: float = None, beam_size: int = None, cancel=None):
+        """
+        (text, confidence 0-1) for the audio. Stops between segments once
+        cancel.cancelled is set and returns what was decoded so far.
+        """
+        if not self.wait_ready():
+            raise RuntimeError(f"Whisper model not available: {self.error}")
+        if isinstance(audio, (bytes, bytearray)):
+            audio = pcm_to_float32(audio)
+        audio_seconds = len(audio) / 16000
+        if beam_size is None:
+            beam_size = self.choose_beam_size(audio_seconds, budget)
+
+        started = time.perf_counter()
+        segments, _ = self.model.transcribe(
+            audio, language="en", beam_size=beam_size, vad_filter=self.vad_filter,
+            condition_on_previous_text=False, without_timestamps=True,
+        )
+        texts, logprobs, no_speech = [], [], []
+        for segment in segments:  # Decoding happens while iterating
+            texts.append(segment.text)
+            logprobs.append(segment.avg_logprob)
+            no_speech.append(segment.no_speech_prob)
+            if cancel is not None and cancel.cancelled:
+                break
+        elapsed = time.perf_counter() - started
+        text = " ".join(texts).strip()
+        confidence = 0.0
+        if logprobs:
+            confidence = math.exp(sum(logprobs) / len(logprobs)) * (1 - sum(no_speech) / len(no_speech))
+
+        if audio_seconds > 0.5 and not (cancel is not None and cancel.cancelled):
+            rtf = elapsed / audio_seconds
+            previous = self._rtf.get(beam_size)
+            self._rtf[beam_size] = rtf if previous is None else 0.7 * previous + 0.3 * rtf
+        logging.info(f"Whisper: {audio_seconds:.1f}s audio in {elapsed:.2f}s (beam {beam_size})")
+        return text, confidence
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_whisper_service():
+    """Shared Whisper service, or None if faster-whisper is not installed"""
+    global _service
+    if not FASTER_WHISPER_AVAILABLE:
+        return None
+    with _service_lock:
+        if _service is None:
+            _service = WhisperService()
+        return _service
+
+
+def preload_whisper():
+    """Load the model in the background so it is warm by the first utterance"""
+    service = get_whisper_service()
+    if service:
+        service.preload()
+    return service
@@ -0,0 +1,85 @@
+"""Real-time factor of Faster Whisper configurations on this machine.
+
+Usage:
+  python scripts/bench_whisper.py speech.wav [--models tiny,base,small]
+                                  [--compute int8,float32] [--threads 0,4]
+                                  [--beams 1,5] [--runs 3]
+
+For every combination it loads the model, transcribes the file (after one
+warm-up run) and prints load time, mean latency and the real-time factor
+(processing seconds per second of audio; below 1.0 is faster than real time).
+Use the result to pick WHISPER_MODEL, WHISPER_COMPUTE_TYPE,
+WHISPER_CPU_THREADS and WHISPER_LATENCY_BUDGET in .env.
+
+Any audio format PyAV can decode works; a few seconds of normal speech
+recorded on your own microphone gives the most useful numbers.
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from faster_whisper import decode_audio
+except ImportError:
+    print("faster-whisper is required. Install with: pip install faster-whisper")
+    sys.exit(1)
+
+from main.whisper_service import WhisperService  # noqa: E402
+
+
+def csv(value, cast=str):
+    return [cast(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Faster Whisper configurations")
+    parser.add_argument("audio", help="speech recording (wav, mp3, ...)")
+    parser.add_argument("--models", type=csv, default=["tiny", "base", "small"])
+    parser.add_argument("--compute", type=csv, default=["int8"])
+    parser.add_argument("--threads", type=lambda v: csv(v, int), default=[0])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--beams", type=lambda v: csv(v, int), default=[1, 5])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--no-vad", action="store_true", help="disable the VAD filter")
+    args = parser.parse_args()
+
+    audio = decode_audio(args.audio, sampling_rate=16000)
+    seconds = len(audio) / 16000
+    print(f"{args.audio}: {seconds:.1f}s of audio\n")
+    print(f"{'model':<10} {'compute':<13} {'threads':>7} {'beam':>4} {'load s':>7} {'latency s':>9} {'RTF':>6}  text")
+
+    results = []
+    for model, compute, threads in itertools.product(args.models, args.compute, args.threads):
+        service = WhisperService(model, compute_type=compute, cpu_threads=threads,
+                                 num_workers=args.workers, vad_filter=not args.no_vad)
+        started = time.perf_counter()
+        if not service.wait_ready(timeout=600):
+            print(f"{model:<10} {compute:<13} {threads:>7}  failed to load: {service.error}")
+            continue
+        load_seconds = time.perf_counter() - started
+        for beam in args.beams:
+            text = service.transcribe(audio, beam_size=beam)  # Warm-up
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                text = service.transcribe(audio, beam_size=beam)
+                timings.append(time.perf_counter() - started)
+            latency = sum(timings) / len(timings)
+            rtf = latency / seconds
+            results.append((rtf, model, compute, threads, beam))
+            print(f"{model:<10} {compute:<13} {threads or 'auto':>7} {beam:>4} {load_seconds:>7.1f} "
+                  f"{latency:>9.2f} {rtf:>6.2f}  {text[:40]}")
+
+    if results:
+        rtf, model, compute, threads, beam = min(results)
+        print(f"\nFastest: WHISPER_MODEL={model} WHISPER_COMPUTE_TYPE={compute} "
+              f"WHISPER_CPU_THREADS={threads} (beam {beam}, RTF {rtf:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""Record the on-device wake word for voice mode.
+
+Usage:
+  python scripts/enroll_wakeword.py [--count 3]
+
+Say your wake word (e.g. "Jarvis") once per prompt, the way you normally
+would. The recordings are saved as MFCC templates to WAKEWORD_FILE
+(default ~/.jarvis/wakeword.npz) together with a detection threshold learned
+from how similar they are. Run it again to re-record; set WAKEWORD_THRESHOLD
+to override the threshold (lower = stricter).
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main.wakeword import enroll  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record the Jarvis wake word")
+    parser.add_argument("--count", type=int, default=3, help="number of recordings")
+    args = parser.parse_args()
+    return 0 if enroll(args.count) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
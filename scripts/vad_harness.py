@@ -0,0 +1,180 @@
+"""Offline test harness for the VAD front end (main/vad.py).
+
+Usage:
+  python scripts/vad_harness.py path/to/fixtures/*.wav [--engine energy|webrtc]
+                                [--hangover 600] [--preroll 300]
+  python scripts/vad_harness.py --make-fixtures path/to/fixtures
+
+Each WAV (16-bit; mono or first channel; resampled to 16 kHz if needed) is fed
+frame by frame through a fresh Segmenter with an in-memory noise profile, and
+the detected utterances are printed with their start/end times.
+
+If a labels file sits next to a fixture (same name, .json) containing
+{"utterances": [[start_s, end_s], ...]}, the harness also checks that every
+labelled utterance was found once, that pre-roll covers its onset, and how
+long after the real end of speech the end was detected. The exit code is 1
+if any fixture fails, so it can run in CI.
+
+--make-fixtures writes synthetic labelled fixtures (noise + speech-like
+bursts) to get started; record real ones from your microphone for tuning.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import struct
+import sys
+import wave
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main.capture import SAMPLE_RATE, FRAME_MS  # noqa: E402
+from main.vad import Segmenter, NoiseProfile, make_vad, VAD_HANGOVER_MS, VAD_PREROLL_MS  # noqa: E402
+
+# A labelled utterance counts as found if a detection overlaps it and starts no later than this
+ONSET_TOLERANCE_MS = 60
+
+
+def read_pcm16k(path: str) -> bytes:
+    """16 kHz mono 16-bit PCM from a WAV file"""
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV is supported")
+        channels, rate = wav.getnchannels(), wav.getframerate()
+        samples = array("h", wav.readframes(wav.getnframes()))
+    if channels > 1:
+        samples = samples[::channels]
+    if rate != SAMPLE_RATE:
+        step = rate / SAMPLE_RATE
+        samples = array("h", (samples[int(i * step)] for i in range(int(len(samples) / step))))
+    return samples.tobytes()
+
+
+def run_fixture(path: str, engine: str, hangover_ms: int, preroll_ms: int):
+    profile = NoiseProfile(path=None)
+    segmenter = Segmenter(vad=make_vad(profile, engine), profile=profile,
+                          hangover_ms=hangover_ms, preroll_ms=preroll_ms)
+    pcm = read_pcm16k(path)
+    frame_bytes = SAMPLE_RATE * FRAME_MS // 1000 * 2
+    detected = []
+    for offset in range(0, len(pcm) - frame_bytes + 1, frame_bytes):
+        utterance = segmenter.push(pcm[offset:offset + frame_bytes])
+        if utterance:
+            detected.append((utterance.start_ms / 1000, utterance.end_ms / 1000))
+    utterance = segmenter.flush()
+    if utterance:
+        detected.append((utterance.start_ms / 1000, utterance.end_ms / 1000))
+    return detected
+
+
+def check(detected, labels):
+    """List of problems comparing detections against labelled utterances"""
+    problems = []
+    used = set()
+    for start, end in labels:
+        matches = [i for i, (d_start, d_end) in enumerate(detected) if d_start < end and d_end > start]
+        if not matches:
+            problems.append(f"missed utterance {start:.2f}-{end:.2f}s")
+            continue
+        if len(matches) > 1:
+            problems.append(f"utterance {start:.2f}-{end:.2f}s split into {len(matches)} pieces")
+        first = detected[matches[0]]
+        if first[0] * 1000 > start * 1000 + ONSET_TOLERANCE_MS:
+            problems.append(f"onset clipped at {start:.2f}s (detected from {first[0]:.2f}s)")
+        used.update(matches)
+    for i, (d_start, d_end) in enumerate(detected):
+        if i not in used:
+            problems.append(f"false detection {d_start:.2f}-{d_end:.2f}s")
+    return problems
+
+
+def end_delays(detected, labels):
+    delays = []
+    for start, end in labels:
+        for d_start, d_end in detected:
+            if d_start < end and d_end > start:
+                delays.append(d_end - end)
+                break
+    return delays
+
+
+def make_fixtures(directory: str):
+    """Synthetic fixtures: background noise with speech-like bursts at known times"""
+    os.makedirs(directory, exist_ok=True)
+    random.seed(7)
+    specs = {
+        "quiet_room": (120, [(1.0, 2.2), (4.0, 5.5)]),
+        "noisy_room": (600, [(0.8, 2.6), (3.5, 4.1)]),
+        "single_word": (200, [(1.5, 1.9)]),
+        "silence_only": (150, []),
+    }
+    for name, (noise, utterances) in specs.items():
+        seconds = 7.0
+        samples = []
+        for i in range(int(seconds * SAMPLE_RATE)):
+            t = i / SAMPLE_RATE
+            value = random.gauss(0, noise)
+            for start, end in utterances:
+                if start <= t < end:
+                    # Voiced sound: a few harmonics with a syllable-rate envelope
+                    envelope = 0.55 + 0.45 * math.sin(2 * math.pi * 4 * (t - start))
+                    pitch = 140 + 20 * math.sin(2 * math.pi * 0.7 * t)
+                    value += envelope * sum(4000 / k * math.sin(2 * math.pi * pitch * k * t) for k in (1, 2, 3))
+            samples.append(max(-32768, min(32767, int(value))))
+        path = os.path.join(directory, name + ".wav")
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(SAMPLE_RATE)
+            wav.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+        with open(os.path.join(directory, name + ".json"), "w", encoding="utf-8") as f:
+            json.dump({"utterances": utterances}, f)
+        print(f"Wrote {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run VAD fixtures offline")
+    parser.add_argument("fixtures", nargs="*", help="WAV files")
+    parser.add_argument("--engine", default="auto", choices=["auto", "webrtc", "energy"])
+    parser.add_argument("--hangover", type=int, default=VAD_HANGOVER_MS, help="ms of silence that ends speech")
+    parser.add_argument("--preroll", type=int, default=VAD_PREROLL_MS, help="ms kept before detected speech")
+    parser.add_argument("--make-fixtures", metavar="DIR", help="write synthetic labelled fixtures to DIR")
+    args = parser.parse_args()
+
+    if args.make_fixtures:
+        make_fixtures(args.make_fixtures)
+        return 0
+    if not args.fixtures:
+        parser.print_help()
+        return 2
+
+    failed = 0
+    for path in args.fixtures:
+        detected = run_fixture(path, args.engine, args.hangover, args.preroll)
+        print(f"\n{os.path.basename(path)}: {len(detected)} utterance(s)")
+        for start, end in detected:
+            print(f"  {start:6.2f}s - {end:6.2f}s")
+        labels_path = os.path.splitext(path)[0] + ".json"
+        if not os.path.exists(labels_path):
+            continue
+        with open(labels_path, "r", encoding="utf-8") as f:
+            labels = json.load(f).get("utterances", [])
+        problems = check(detected, labels)
+        delays = end_delays(detected, labels)
+        if delays:
+            print(f"  end detected {1000 * sum(delays) / len(delays):.0f} ms after speech ended (avg)")
+        for problem in problems:
+            print(f"  FAIL: {problem}")
+        if problems:
+            failed += 1
+        else:
+            print("  OK")
+
+    print(f"\n{len(args.fixtures) - failed}/{len(args.fixtures)} fixtures passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,7 @@ project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_root))
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from main.engine import JarvisEngine
 import uvicorn
@@ -51,6 +52,12 @@ async def chat(request: ChatRequest):
         logger.error(f"Error processing message: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+def chat_stream(request: ChatRequest):
+    """Reply as plain-text chunks while the model generates, so a client can speak the first sentence early"""
+    logger.info(f"Received streaming message: {request.message}")
+    return StreamingResponse(engine.stream_message(request.message), media_type="text/plain")
+
 def start_server():
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
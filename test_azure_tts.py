@@ -45,7 +45,7 @@ def main():
             print("\n🔊 Testing Azure TTS...")
             if azure_key == "YOUR_KEY":
                 print("⚠️ Warning: AZURE_SPEECH_KEY not configured!")
-            speak_text("Hello sir, this is Azure text to speech. How can I help you today?")
+            speak_text("Hello sir, this is Azure text to speech. How can I help you today?", block=True)
             print("✅ Azure TTS test complete")
         
         elif choice == "2":
@@ -57,7 +57,7 @@ def main():
             text = input("\n💬 Enter text to speak (Azure): ").strip()
             if text:
                 print(f"\n🔊 Speaking with Azure TTS: {text}")
-                speak_text(text)
+                speak_text(text, block=True)
                 print("✅ Done")
         
         elif choice == "4":
@@ -0,0 +1,323 @@
+"""
+Calendar storage engine for Jarvis
+Keeps calendar.json in an in-process cache (reloaded only when the file's
+mtime/size changes) with a sorted-by-start index for range queries and
+overlap checks, and writes the file atomically.
+
+Recurring events are stored once (with an "rrule" plus optional "exdates"
+and per-date "overrides") and expanded lazily for each queried window.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from tools.recurrence import RecurrenceRule
+from tools.storage import atomic_write_json, file_signature
+
+DATE_FORMAT = "%Y-%m-%d"
+TIME_FORMAT = "%H:%M"
+
+
+def event_start(event: dict):
+    """Start datetime of a stored event, or None if its date cannot be parsed"""
+    try:
+        date = datetime.strptime(event["date"], DATE_FORMAT)
+    except (KeyError, ValueError, TypeError):
+        return None
+    try:
+        t = datetime.strptime(event.get("time") or "00:00", TIME_FORMAT)
+        return date.replace(hour=t.hour, minute=t.minute)
+    except ValueError:
+        return date
+
+
+def event_end(event: dict, start: datetime) -> datetime:
+    return start + timedelta(minutes=int(event.get("duration_minutes") or 0))
+
+
+def is_recurring(event: dict) -> bool:
+    return bool(event.get("rrule"))
+
+
+class Series:
+    """A recurring event with its parsed rule, exceptions and overrides"""
+
+    def __init__(self, series_id: str, event: dict):
+        self.id = series_id
+        self.event = event
+        self.rule = RecurrenceRule.parse(event["rrule"])
+        self.dtstart = event_start(event)
+        self.duration = timedelta(minutes=int(event.get("duration_minutes") or 0))
+        self.exdates = set(event.get("exdates") or [])
+        self.overrides = event.get("overrides") or {}
+
+    def has_occurrence(self, date: str) -> bool:
+        """True if the rule puts an occurrence on date (YYYY-MM-DD) and it was not cancelled"""
+        if self.dtstart is None or date in self.exdates:
+            return False
+        day_start = datetime.strptime(date, "%Y-%m-%d")
+        return next(self.rule.occurrences(self.dtstart, day_start, day_start + timedelta(days=1)), None) is not None
+
+    def occurrence(self, date: str, start: datetime = None):
+        """(start, occurrence_id, event) for the occurrence originally on date"""
+        override = self.overrides.get(date, {})
+        occurrence = {k: v for k, v in self.event.items() if k not in ("exdates", "overrides")}
+        occurrence.update(date=date, time=(start or self.dtstart).strftime("%H:%M"))
+        occurrence.update(override)
+        occurrence["series_id"] = self.id
+        return event_start(occurrence), f"{self.id}@{date}", occurrence
+
+    def expand(self, after: datetime, before: datetime):
+        """Yield occurrences starting in [after, before), with exceptions and overrides applied"""
+        if self.dtstart is None:
+            return
+        for start in self.rule.occurrences(self.dtstart, after, before):
+            date = start.strftime("%Y-%m-%d")
+            if date in self.exdates:
+                continue
+            when, occurrence_id, occurrence = self.occurrence(date, start)
+            if date not in self.overrides or after <= when < before:
+                yield when, occurrence_id, occurrence
+        # Overridden occurrences moved into the window from elsewhere
+        for date in self.overrides:
+            if date in self.exdates:
+                continue
+            when, occurrence_id, occurrence = self.occurrence(date)
+            original = event_start({"date": date, "time": self.event.get("time")})
+            if when is not None and after <= when < before and not (original and after <= original < before):
+                yield when, occurrence_id, occurrence
+
+
+class CalendarStore:
+    """Cached calendar with O(log n) range lookups and conflict checks"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._signature = None
+        self._loaded = False
+        self._events = {}
+        # Parallel arrays sorted by start: start times, end times, event ids,
+        # and the running maximum of end times (for overlap queries)
+        self._starts = []
+        self._ends = []
+        self._ids = []
+        self._max_end = []
+        # Recurring series are kept out of the index and expanded per query window
+        self._series = {}
+        self._max_series_duration = timedelta(0)
+        self._expansions = OrderedDict()
+
+    # ---------- cache ----------
+
+    def _load(self):
+        events = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    events = json.load(f)
+            except Exception as e:
+                logging.error(f"Calendar load error: {e}")
+        self._events = events
+        self._rebuild_index()
+        self._signature = file_signature(self.path)
+        self._loaded = True
+
+    def _ensure_fresh(self):
+        if not self._loaded or file_signature(self.path) != self._signature:
+            self._load()
+
+    def _rebuild_index(self):
+        rows = []
+        self._series = {}
+        self._expansions.clear()
+        for event_id, event in self._events.items():
+            if is_recurring(event):
+                self._add_series(event_id, event)
+                continue
+            start = event_start(event)
+            if start is not None:
+                rows.append((start, event_end(event, start), event_id))
+        rows.sort()
+        self._starts = [r[0] for r in rows]
+        self._ends = [r[1] for r in rows]
+        self._ids = [r[2] for r in rows]
+        self._recompute_max_end(0)
+
+    def _recompute_max_end(self, from_index: int):
+        del self._max_end[from_index:]
+        running = self._max_end[-1] if self._max_end else None
+        for end in self._ends[from_index:]:
+            running = end if running is None or end > running else running
+            self._max_end.append(running)
+
+    def _add_series(self, event_id: str, event: dict):
+        try:
+            self._series[event_id] = Series(event_id, event)
+        except Exception as e:
+            logging.error(f"Skipping recurring event {event_id}: {e}")
+        self._max_series_duration = max(
+            [series.duration for series in self._series.values()], default=timedelta(0)
+        )
+        self._expansions.clear()
+
+    def _index_insert(self, event_id: str, event: dict):
+        if is_recurring(event):
+            self._add_series(event_id, event)
+            return
+        start = event_start(event)
+        if start is None:
+            return
+        i = bisect.bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, event_end(event, start))
+        self._ids.insert(i, event_id)
+        self._recompute_max_end(i)
+
+    def _index_remove(self, event_id: str):
+        if event_id in self._series:
+            del self._series[event_id]
+            self._expansions.clear()
+            return
+        start = event_start(self._events[event_id])
+        if start is None:
+            return
+        i = bisect.bisect_left(self._starts, start)
+        while i < len(self._ids) and self._ids[i] != event_id:
+            i += 1
+        if i < len(self._ids):
+            del self._starts[i], self._ends[i], self._ids[i]
+            self._recompute_max_end(i)
+
+    def _save(self):
+        atomic_write_json(self.path, self._events)
+        self._signature = file_signature(self.path)
+
+    # ---------- writes ----------
+
+    def upsert(self, event_id: str, event: dict):
+        """Add or replace one event and persist"""
+        self.upsert_many([(event_id, event)])
+
+    def upsert_many(self, items):
+        """Add or replace many events with a single file write"""
+        items = list(items)
+        with self._lock:
+            self._ensure_fresh()
+            if len(items) > 32:
+                # Bulk load: one sort beats many incremental inserts
+                self._events.update(items)
+                self._rebuild_index()
+            else:
+                for event_id, event in items:
+                    if event_id in self._events:
+                        self._index_remove(event_id)
+                    self._events[event_id] = event
+                    self._index_insert(event_id, event)
+            self._save()
+
+    def replace_all(self, events: dict):
+        """Replace the whole calendar and persist"""
+        with self._lock:
+            self._events = dict(events)
+            self._rebuild_index()
+            self._save()
+            self._loaded = True
+
+    def delete(self, event_ids) -> int:
+        """Delete events by id and persist; returns how many were removed"""
+        with self._lock:
+            self._ensure_fresh()
+            removed = 0
+            for event_id in event_ids:
+                if event_id in self._events:
+                    self._index_remove(event_id)
+                    del self._events[event_id]
+                    removed += 1
+            if removed:
+                self._save()
+            return removed
+
+    # ---------- reads ----------
+
+    def get(self, event_id: str):
+        with self._lock:
+            self._ensure_fresh()
+            return self._events.get(event_id)
+
+    def all(self) -> dict:
+        """Copy of every stored event, keyed by id"""
+        with self._lock:
+            self._ensure_fresh()
+            return dict(self._events)
+
+    def series(self) -> dict:
+        """Recurring series by id"""
+        with self._lock:
+            self._ensure_fresh()
+            return dict(self._series)
+
+    def _expand_series(self, start: datetime, end: datetime) -> list:
+        """Occurrences of all series starting in [start, end), cached per window"""
+        key = (start, end)
+        if key in self._expansions:
+            self._expansions.move_to_end(key)
+            return self._expansions[key]
+        found = []
+        for series in self._series.values():
+            found.extend(series.expand(start, end))
+        found.sort(key=lambda row: row[0])
+        self._expansions[key] = found
+        if len(self._expansions) > 64:
+            self._expansions.popitem(last=False)
+        return found
+
+    def starting_between(self, start: datetime, end: datetime) -> list:
+        """(start, event_id, event) for events starting in [start, end), sorted by start"""
+        with self._lock:
+            self._ensure_fresh()
+            lo = bisect.bisect_left(self._starts, start)
+            hi = bisect.bisect_left(self._starts, end)
+            found = [(self._starts[i], self._ids[i], self._events[self._ids[i]]) for i in range(lo, hi)]
+            if self._series:
+                found.extend(self._expand_series(start, end))
+                found.sort(key=lambda row: row[0])
+            return found
+
+    def overlapping(self, start: datetime, end: datetime) -> list:
+        """(start, event_id, event) for events overlapping [start, end), sorted by start"""
+        with self._lock:
+            self._ensure_fresh()
+            i = bisect.bisect_left(self._starts, end) - 1
+            found = []
+            # Everything before i starts earlier; stop once no earlier event can still be running
+            while i >= 0 and (self._max_end[i] > start or self._starts[i] >= start):
+                if self._ends[i] > start or self._starts[i] >= start:
+                    found.append((self._starts[i], self._ids[i], self._events[self._ids[i]]))
+                i -= 1
+            found.reverse()
+            if self._series:
+                # Occurrences that started up to one (longest) duration earlier may still be running
+                for row in self._expand_series(start - self._max_series_duration, end):
+                    if row[0] >= start or event_end(row[2], row[0]) > start:
+                        found.append(row)
+                found.sort(key=lambda row: row[0])
+            return found
+
+    def has_conflict(self, start: datetime, end: datetime) -> bool:
+        """O(log n) check for any event overlapping [start, end)"""
+        with self._lock:
+            self._ensure_fresh()
+            i = bisect.bisect_left(self._starts, end) - 1
+            if i >= 0 and (self._max_end[i] > start or self._starts[i] >= start):
+                return True
+            return bool(self._series) and bool(self.overlapping(start, end))
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_fresh()
+            return len(self._events)
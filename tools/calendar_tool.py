@@ -6,7 +6,11 @@ from langchain.tools import tool
 import os
 import logging
 from datetime import datetime, timedelta
-import json
+
+from tools.calendar_store import CalendarStore, Series, event_start
+from tools.ics import iter_vevents, to_event, write_calendar
+from tools.recurrence import RecurrenceRule
+from tools.storage import atomic_writer
 
 
 # Simple JSON-based calendar for offline use
@@ -14,29 +18,34 @@ import json
 CALENDAR_FILE = os.path.join(os.path.expanduser("~"), ".jarvis", "calendar.json")
 os.makedirs(os.path.dirname(CALENDAR_FILE), exist_ok=True)
 
+# Cached, indexed view of CALENDAR_FILE (reloaded when the file changes)
+store = CalendarStore(CALENDAR_FILE)
+
 
 def load_calendar():
     """Load calendar from file"""
-    if os.path.exists(CALENDAR_FILE):
-        try:
-            with open(CALENDAR_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+    return store.all()
 
 
 def save_calendar(calendar_data):
     """Save calendar to file"""
     try:
-        with open(CALENDAR_FILE, 'w') as f:
-            json.dump(calendar_data, f, indent=2)
+        store.replace_all(calendar_data)
         return True
     except Exception as e:
         logging.error(f"Calendar save error: {e}")
         return False
 
 
+def resolve_date(date: str) -> str:
+    """Turn today/tomorrow/YYYY-MM-DD into YYYY-MM-DD"""
+    if date.lower() == "today":
+        return datetime.now().strftime("%Y-%m-%d")
+    if date.lower() == "tomorrow":
+        return (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    return date
+
+
 @tool
 def add_calendar_event(title: str, date: str, time: str = "09:00", duration_minutes: int = 60) -> str:
     """
@@ -58,18 +67,11 @@ def add_calendar_event(title: str, date: str, time: str = "09:00", duration_minu
     """
     try:
         # Parse relative dates
-        if date.lower() == "today":
-            event_date = datetime.now().strftime("%Y-%m-%d")
-        elif date.lower() == "tomorrow":
-            event_date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-        else:
-            event_date = date
+        event_date = resolve_date(date)
         
         # Create event
-        calendar = load_calendar()
         event_id = f"{event_date}_{time}_{title}"
-        
-        calendar[event_id] = {
+        event = {
             "title": title,
             "date": event_date,
             "time": time,
@@ -77,10 +79,20 @@ def add_calendar_event(title: str, date: str, time: str = "09:00", duration_minu
             "created_at": datetime.now().isoformat()
         }
         
-        if save_calendar(calendar):
-            return f"✅ Added '{title}' to calendar on {event_date} at {time}"
-        else:
-            return "❌ Failed to add event to calendar"
+        # Check for overlaps before saving (indexed, no full scan)
+        conflicts = []
+        start = event_start(event)
+        if start is not None:
+            end = start + timedelta(minutes=duration_minutes)
+            if store.has_conflict(start, end):
+                conflicts = [e["title"] for _, other_id, e in store.overlapping(start, end) if other_id != event_id]
+        
+        store.upsert(event_id, event)
+        
+        message = f"✅ Added '{title}' to calendar on {event_date} at {time}"
+        if conflicts:
+            message += f"\n⚠️ Overlaps with: {', '.join(conflicts)}"
+        return message
             
     except Exception as e:
         logging.error(f"Calendar add error: {e}")
@@ -106,29 +118,23 @@ def check_schedule(date: str = "today") -> str:
     """
     try:
         # Parse date
-        if date.lower() == "today":
-            check_date = datetime.now().strftime("%Y-%m-%d")
-        elif date.lower() == "tomorrow":
-            check_date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-        else:
-            # Try to parse various formats
-            try:
-                dt = datetime.strptime(date, "%Y-%m-%d")
-                check_date = dt.strftime("%Y-%m-%d")
-            except:
-                check_date = date
-        
-        # Load calendar and filter events
-        calendar = load_calendar()
-        events = []
+        check_date = resolve_date(date)
+        try:
+            day_start = datetime.strptime(check_date, "%Y-%m-%d")
+        except ValueError:
+            return f"❌ I couldn't understand the date '{date}'. Use today, tomorrow, or YYYY-MM-DD"
         
-        for event_id, event in calendar.items():
-            if event["date"] == check_date:
-                events.append(f"• {event['time']} - {event['title']} ({event['duration_minutes']} min)")
+        # Range query on the start-time index
+        events = [
+            (f"• All day - {event['title']}" if event.get("all_day")
+             else f"• {event['time']} - {event['title']} ({event['duration_minutes']} min)")
+            + (" 🔁" if event.get("series_id") else "")
+            for _, _, event in store.starting_between(day_start, day_start + timedelta(days=1))
+        ]
         
         if events:
-            day_name = datetime.strptime(check_date, "%Y-%m-%d").strftime("%A, %B %d, %Y")
-            return f"📅 Schedule for {day_name}:\n" + "\n".join(sorted(events))
+            day_name = day_start.strftime("%A, %B %d, %Y")
+            return f"📅 Schedule for {day_name}:\n" + "\n".join(events)
         else:
             return f"📅 No events scheduled for {check_date}"
             
@@ -154,22 +160,18 @@ def list_upcoming_events(days: int = 7) -> str:
         List of upcoming events
     """
     try:
-        calendar = load_calendar()
-        today = datetime.now()
-        future_date = today + timedelta(days=days)
-        
-        events = []
-        for event_id, event in calendar.items():
-            event_date = datetime.strptime(event["date"], "%Y-%m-%d")
-            if today <= event_date <= future_date:
-                day_name = event_date.strftime("%A, %b %d")
-                events.append((event_date, f"• {day_name} at {event['time']} - {event['title']}"))
+        now = datetime.now()
+        future_date = now + timedelta(days=days)
         
-        # Sort by date
-        events.sort(key=lambda x: x[0])
+        # Already sorted by start time
+        events = [
+            f"• {start.strftime('%A, %b %d')} at {event['time']} - {event['title']}"
+            + (" 🔁" if event.get("series_id") else "")
+            for start, _, event in store.starting_between(now, future_date)
+        ]
         
         if events:
-            return f"📅 Upcoming events (next {days} days):\n" + "\n".join([e[1] for e in events])
+            return f"📅 Upcoming events (next {days} days):\n" + "\n".join(events)
         else:
             return f"📅 No upcoming events in the next {days} days"
             
@@ -196,28 +198,35 @@ def delete_calendar_event(title: str, date: str) -> str:
     """
     try:
         # Parse date
-        if date.lower() == "today":
-            event_date = datetime.now().strftime("%Y-%m-%d")
-        elif date.lower() == "tomorrow":
-            event_date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-        else:
-            event_date = date
-        
-        calendar = load_calendar()
-        deleted = False
+        event_date = resolve_date(date)
+        try:
+            day_start = datetime.strptime(event_date, "%Y-%m-%d")
+        except ValueError:
+            return f"❌ I couldn't understand the date '{date}'. Use today, tomorrow, or YYYY-MM-DD"
         
-        # Find and delete matching events
-        to_delete = []
-        for event_id, event in calendar.items():
-            if event["date"] == event_date and title.lower() in event["title"].lower():
-                to_delete.append(event_id)
+        # Find matching events on that day via the index
+        matches = [
+            (event_id, event)
+            for _, event_id, event in store.starting_between(day_start, day_start + timedelta(days=1))
+            if title.lower() in event["title"].lower()
+        ]
         
-        for event_id in to_delete:
-            del calendar[event_id]
-            deleted = True
+        # A recurring occurrence is cancelled by adding an exception, not by deleting the series.
+        # Exceptions and overrides are keyed by the occurrence's original date (series_id@YYYY-MM-DD),
+        # which differs from event_date when the occurrence was moved here.
+        skipped = 0
+        for occurrence_id, event in matches:
+            if event.get("series_id"):
+                original_date = occurrence_id.rsplit("@", 1)[1]
+                series = dict(store.get(event["series_id"]))
+                series["exdates"] = sorted(set(series.get("exdates", [])) | {original_date})
+                overrides = dict(series.get("overrides") or {})
+                overrides.pop(original_date, None)
+                series["overrides"] = overrides
+                store.upsert(event["series_id"], series)
+                skipped += 1
         
-        if deleted:
-            save_calendar(calendar)
+        if store.delete([event_id for event_id, event in matches if not event.get("series_id")]) or skipped:
             return f"✅ Deleted event(s) matching '{title}' on {event_date}"
         else:
             return f"❌ No events found matching '{title}' on {event_date}"
@@ -227,6 +236,226 @@ def delete_calendar_event(title: str, date: str) -> str:
         return f"❌ Failed to delete event: {str(e)}"
 
 
+def find_series(title: str):
+    """(series_id, event) of the first recurring event whose title contains title"""
+    for series_id, series in store.series().items():
+        if title.lower() in series.event["title"].lower():
+            return series_id, series.event
+    return None, None
+
+
+@tool
+def add_recurring_event(title: str, start_date: str, rule: str = "weekly", time: str = "09:00", duration_minutes: int = 60) -> str:
+    """
+    Add a repeating event to the calendar. It is stored once and expanded only when the calendar is queried.
+    
+    Args:
+        title: Event title/description
+        start_date: First occurrence, YYYY-MM-DD or relative (today, tomorrow)
+        rule: daily, weekdays, weekly, biweekly, monthly, yearly, or an RRULE such as
+              "FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=10" or "FREQ=DAILY;UNTIL=20251231"
+        time: Time in HH:MM format (default: 09:00)
+        duration_minutes: Event duration in minutes (default: 60)
+    
+    Examples:
+        - "Add a standup every weekday at 9:30" → add_recurring_event("Standup", "today", "weekdays", "09:30", 15)
+        - "Gym every Monday and Thursday at 18:00" → rule="FREQ=WEEKLY;BYDAY=MO,TH"
+    
+    Returns:
+        Confirmation message
+    """
+    try:
+        event_date = resolve_date(start_date)
+        recurrence = RecurrenceRule.parse(rule)
+        event = {
+            "title": title,
+            "date": event_date,
+            "time": time,
+            "duration_minutes": duration_minutes,
+            "rrule": recurrence.to_string(),
+            "exdates": [],
+            "overrides": {},
+            "created_at": datetime.now().isoformat()
+        }
+        if event_start(event) is None:
+            return f"❌ I couldn't understand the date '{start_date}'. Use today, tomorrow, or YYYY-MM-DD"
+        
+        store.upsert(f"{event_date}_{time}_{title}_recurring", event)
+        return f"✅ Added '{title}' {recurrence.describe()} at {time}, starting {event_date}"
+        
+    except ValueError as e:
+        return f"❌ Invalid recurrence rule: {e}"
+    except Exception as e:
+        logging.error(f"Calendar add error: {e}")
+        return f"❌ Failed to add recurring event: {str(e)}"
+
+
+@tool
+def move_event_occurrence(title: str, date: str, new_time: str, new_date: str = "") -> str:
+    """
+    Move a single occurrence of a recurring event without changing the rest of the series.
+    
+    Args:
+        title: Title of the recurring event
+        date: Date of the occurrence to move (YYYY-MM-DD or relative)
+        new_time: New time in HH:MM format
+        new_date: Optional new date (defaults to the same day)
+    
+    Examples:
+        - "Move tomorrow's standup to 10:00" → move_event_occurrence("standup", "tomorrow", "10:00")
+    
+    Returns:
+        Confirmation message
+    """
+    try:
+        series_id, series = find_series(title)
+        if not series_id:
+            return f"❌ No recurring event found matching '{title}'"
+        
+        occurrence_date = resolve_date(date)
+        target_date = resolve_date(new_date) if new_date else occurrence_date
+        if not Series(series_id, series).has_occurrence(occurrence_date):
+            return f"❌ '{series['title']}' has no occurrence on {occurrence_date}"
+        
+        series = dict(series)
+        overrides = dict(series.get("overrides") or {})
+        overrides[occurrence_date] = {"date": target_date, "time": new_time}
+        series["overrides"] = overrides
+        store.upsert(series_id, series)
+        
+        return f"✅ Moved '{series['title']}' on {occurrence_date} to {target_date} at {new_time}"
+        
+    except Exception as e:
+        logging.error(f"Calendar move error: {e}")
+        return f"❌ Failed to move occurrence: {str(e)}"
+
+
+@tool
+def delete_recurring_event(title: str) -> str:
+    """
+    Delete an entire recurring event (all occurrences).
+    To cancel just one occurrence, use delete_calendar_event with its date.
+    
+    Args:
+        title: Title of the recurring event
+    
+    Returns:
+        Confirmation message
+    """
+    try:
+        series_id, series = find_series(title)
+        if not series_id:
+            return f"❌ No recurring event found matching '{title}'"
+        store.delete([series_id])
+        return f"✅ Deleted recurring event '{series['title']}'"
+        
+    except Exception as e:
+        logging.error(f"Calendar delete error: {e}")
+        return f"❌ Failed to delete recurring event: {str(e)}"
+
+
+@tool
+def import_ics(path: str) -> str:
+    """
+    Import events from an iCalendar (.ics) file, e.g. an export from Google Calendar or Outlook.
+    Events are matched by UID, so importing the same file again updates instead of duplicating.
+    
+    Args:
+        path: Path to the .ics file
+    
+    Returns:
+        Summary of what was imported
+    """
+    try:
+        path = os.path.expanduser(path)
+        items = {}
+        sequences = {}
+        exceptions = []
+        skipped = 0
+        
+        with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+            for props in iter_vevents(f):
+                try:
+                    uid, recurrence_date, event = to_event(props)
+                except (KeyError, ValueError) as e:
+                    skipped += 1
+                    logging.warning(f"ICS import: skipping event: {e}")
+                    continue
+                if recurrence_date:
+                    exceptions.append((uid, recurrence_date, event))
+                    continue
+                # Same UID twice: keep the highest SEQUENCE (the latest on ties)
+                sequence = int(props.get("SEQUENCE", ({}, "0"))[1] or 0)
+                event_id = f"ics_{uid}"
+                if sequence >= sequences.get(event_id, -1):
+                    items[event_id] = event
+                    sequences[event_id] = sequence
+        
+        # RECURRENCE-ID events become exceptions/overrides of their series
+        for uid, day, event in exceptions:
+            event_id = f"ics_{uid}"
+            series = items.get(event_id) or store.get(event_id)
+            if not series or not series.get("rrule"):
+                skipped += 1
+                continue
+            series = items[event_id] = dict(series)
+            if event.get("cancelled"):
+                series["exdates"] = sorted(set(series.get("exdates", [])) | {day})
+            else:
+                overrides = dict(series.get("overrides") or {})
+                overrides[day] = {k: event[k] for k in ("date", "time", "duration_minutes", "title")}
+                series["overrides"] = overrides
+        
+        if not items:
+            return f"📅 No events found in {path}"
+        
+        # One write for the whole file
+        store.upsert_many(items.items())
+        
+        recurring = sum(1 for event in items.values() if event.get("rrule"))
+        message = f"✅ Imported {len(items)} events ({recurring} recurring) from {os.path.basename(path)}"
+        unsupported = [event["title"] for event in items.values() if event.get("unsupported_rrule")]
+        if unsupported:
+            message += (f"\n⚠️ {len(unsupported)} recurring events use rules Jarvis can't expand and were "
+                        f"imported as their first occurrence only: {', '.join(unsupported[:5])}")
+        if skipped:
+            message += f"\n⚠️ Skipped {skipped} unreadable events"
+        return message
+        
+    except FileNotFoundError:
+        return f"❌ File not found: {path}"
+    except Exception as e:
+        logging.error(f"ICS import error: {e}")
+        return f"❌ Failed to import calendar: {str(e)}"
+
+
+@tool
+def export_ics(path: str) -> str:
+    """
+    Export the whole calendar to an iCalendar (.ics) file that other calendar apps can import.
+    
+    Args:
+        path: Destination .ics file path
+    
+    Returns:
+        Confirmation message
+    """
+    try:
+        path = os.path.expanduser(path)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        # Streamed to a temp file, which replaces path only once complete
+        with atomic_writer(path, newline="") as f:
+            count = write_calendar(f, store.all().items())
+        
+        return f"✅ Exported {count} events to {path}"
+        
+    except Exception as e:
+        logging.error(f"ICS export error: {e}")
+        return f"❌ Failed to export calendar: {str(e)}"
+
+
 # Quick test
 if __name__ == "__main__":
     print("Testing calendar...")
@@ -0,0 +1,286 @@
+"""
+iCalendar (.ics) reading and writing for the Jarvis calendar
+The reader streams the file line by line (unfolding continuation lines as it
+goes) and yields one VEVENT at a time, so large exports never have to be
+held in memory as text. The writer folds lines at 75 octets and writes each
+event as it is produced.
+"""
+import hashlib
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+
+from tools.recurrence import RecurrenceRule
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9: TZID times are kept as wall-clock times
+    ZoneInfo = None
+
+PRODID = "-//Jarvis//Calendar//EN"
+DURATION_RE = re.compile(
+    r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+_zones = {}
+
+
+# ---------- reading ----------
+
+def unfold(lines):
+    """Join RFC 5545 continuation lines (leading space/tab) into logical lines"""
+    current = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if current is not None:
+                current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_line(line: str):
+    """Split 'NAME;PARAM=x:value' into (NAME, {PARAM: x}, value); quoted params may contain : and ;"""
+    parts, buf, quoted = [], [], False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == ";":
+            parts.append("".join(buf))
+            buf = []
+            continue
+        elif not quoted and ch == ":":
+            parts.append("".join(buf))
+            value = line[i + 1:]
+            break
+        buf.append(ch)
+    else:
+        return None
+    params = {}
+    for param in parts[1:]:
+        if "=" in param:
+            key, val = param.split("=", 1)
+            params[key.upper()] = val.strip('"')
+    return parts[0].upper(), params, value
+
+
+def unescape(text: str) -> str:
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), text)
+
+
+def iter_vevents(lines):
+    """
+    Yield each VEVENT as {NAME: (params, value)}; EXDATE is a list of (params, value).
+    Nested components such as VALARM are skipped.
+    """
+    event, nested = None, 0
+    for line in unfold(lines):
+        parsed = parse_line(line)
+        if parsed is None:
+            continue
+        name, params, value = parsed
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and event is None:
+                event = {}
+            elif event is not None:
+                nested += 1
+        elif name == "END":
+            if event is not None and nested:
+                nested -= 1
+            elif event is not None and value.upper() == "VEVENT":
+                yield event
+                event = None
+        elif event is not None and not nested:
+            if name == "EXDATE":
+                event.setdefault("EXDATE", []).append((params, value))
+            else:
+                event[name] = (params, value)
+
+
+def _zone(tzid: str):
+    if tzid not in _zones:
+        try:
+            _zones[tzid] = ZoneInfo(tzid) if ZoneInfo else None
+        except Exception:
+            _zones[tzid] = None  # e.g. Windows zone names; keep wall-clock time
+    return _zones[tzid]
+
+
+def parse_datetime(value: str, params: dict):
+    """(local naive datetime, all_day) for a DATE or DATE-TIME value"""
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value[:8], "%Y%m%d"), True
+    when = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return when.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None), False
+    zone = _zone(params["TZID"]) if "TZID" in params else None
+    if zone is not None:
+        return when.replace(tzinfo=zone).astimezone().replace(tzinfo=None), False
+    return when, False
+
+
+def parse_duration(value: str) -> timedelta:
+    match = DURATION_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"Bad DURATION '{value}'")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                      minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == "-" else delta
+
+
+def to_event(props: dict):
+    """
+    Convert a parsed VEVENT to a Jarvis event.
+
+    Returns:
+        (uid, recurrence_date, event); recurrence_date is set for a VEVENT that
+        overrides one occurrence of a series (RECURRENCE-ID)
+    """
+    params, value = props["DTSTART"]
+    start, all_day = parse_datetime(value, params)
+
+    if "DTEND" in props:
+        end, _ = parse_datetime(props["DTEND"][1], props["DTEND"][0])
+        duration = end - start
+    elif "DURATION" in props:
+        duration = parse_duration(props["DURATION"][1])
+    else:
+        duration = timedelta(days=1) if all_day else timedelta(0)
+
+    title = unescape(props.get("SUMMARY", ({}, ""))[1]).strip() or "(no title)"
+    uid = props.get("UID", ({}, ""))[1].strip()
+    if not uid:
+        # Stable synthetic UID so re-importing the same file still dedupes
+        uid = hashlib.sha1(f"{value}|{title}".encode("utf-8")).hexdigest() + "@jarvis-import"
+
+    event = {
+        "title": title,
+        "date": start.strftime("%Y-%m-%d"),
+        "time": start.strftime("%H:%M"),
+        "duration_minutes": max(0, int(duration.total_seconds() // 60)),
+        "uid": uid,
+        "created_at": datetime.now().isoformat(),
+    }
+    if all_day:
+        event["all_day"] = True
+    for name, key in (("LOCATION", "location"), ("DESCRIPTION", "description")):
+        if props.get(name, ({}, ""))[1]:
+            event[key] = unescape(props[name][1])
+
+    if "RRULE" in props:
+        try:
+            event["rrule"] = RecurrenceRule.parse(props["RRULE"][1]).to_string()
+            event["exdates"] = sorted({
+                parse_datetime(day, ex_params)[0].strftime("%Y-%m-%d")
+                for ex_params, ex_value in props.get("EXDATE", [])
+                for day in ex_value.split(",") if day
+            })
+            event["overrides"] = {}
+        except ValueError as e:
+            # Never expand a rule we cannot honor: keep the first occurrence and flag it,
+            # with the original rule kept for export
+            logging.warning(f"ICS: importing '{title}' as a single event ({e})")
+            event.pop("rrule", None)
+            event["unsupported_rrule"] = props["RRULE"][1].strip()
+
+    recurrence_date = None
+    if "RECURRENCE-ID" in props:
+        rid_params, rid_value = props["RECURRENCE-ID"]
+        recurrence_date = parse_datetime(rid_value, rid_params)[0].strftime("%Y-%m-%d")
+        if props.get("STATUS", ({}, ""))[1].upper() == "CANCELLED":
+            event["cancelled"] = True
+    return uid, recurrence_date, event
+
+
+# ---------- writing ----------
+
+def escape(text: str) -> str:
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def fold(line: str) -> str:
+    """Fold a content line at 75 octets without splitting UTF-8 characters"""
+    out, size, chunks = [], 0, []
+    for ch in line:
+        width = len(ch.encode("utf-8"))
+        if size + width > 75:
+            chunks.append("".join(out))
+            out, size = [" "], 1
+        out.append(ch)
+        size += width
+    chunks.append("".join(out))
+    return "\r\n".join(chunks) + "\r\n"
+
+
+def event_lines(event_id: str, event: dict, stamp: str):
+    """Content lines for one stored event, plus one VEVENT per overridden occurrence"""
+    uid = event.get("uid") or f"{event_id}@jarvis"
+    all_day = event.get("all_day")
+    start = datetime.strptime(f"{event['date']} {event.get('time') or '00:00'}", "%Y-%m-%d %H:%M")
+
+    def vevent(ev_start, minutes, title, extra):
+        yield "BEGIN:VEVENT"
+        yield f"UID:{uid}"
+        yield f"DTSTAMP:{stamp}"
+        if all_day:
+            yield f"DTSTART;VALUE=DATE:{ev_start.strftime('%Y%m%d')}"
+            yield f"DURATION:P{max(1, minutes // 1440)}D"
+        else:
+            yield f"DTSTART:{ev_start.strftime('%Y%m%dT%H%M%S')}"
+            yield f"DURATION:PT{minutes}M"
+        yield f"SUMMARY:{escape(title)}"
+        yield from extra
+        yield "END:VEVENT"
+
+    minutes = int(event.get("duration_minutes") or 0)
+    extra = []
+    for key, name in (("location", "LOCATION"), ("description", "DESCRIPTION")):
+        if event.get(key):
+            extra.append(f"{name}:{escape(event[key])}")
+    if event.get("unsupported_rrule"):
+        extra.append(f"RRULE:{event['unsupported_rrule']}")
+    if event.get("rrule"):
+        extra.append(f"RRULE:{event['rrule']}")
+        fmt = "%Y%m%d" if all_day else "%Y%m%dT%H%M%S"
+        prefix = "EXDATE;VALUE=DATE:" if all_day else "EXDATE:"
+        for day in event.get("exdates") or []:
+            original = datetime.strptime(day, "%Y-%m-%d").replace(hour=start.hour, minute=start.minute)
+            extra.append(prefix + original.strftime(fmt))
+    yield from vevent(start, minutes, event["title"], extra)
+
+    for day, override in (event.get("overrides") or {}).items():
+        original = datetime.strptime(day, "%Y-%m-%d").replace(hour=start.hour, minute=start.minute)
+        moved = datetime.strptime(
+            f"{override.get('date', day)} {override.get('time') or event.get('time') or '00:00'}",
+            "%Y-%m-%d %H:%M"
+        )
+        rid = (f"RECURRENCE-ID;VALUE=DATE:{original.strftime('%Y%m%d')}" if all_day
+               else f"RECURRENCE-ID:{original.strftime('%Y%m%dT%H%M%S')}")
+        yield from vevent(moved, int(override.get("duration_minutes", minutes)),
+                          override.get("title", event["title"]), [rid])
+
+
+def write_calendar(f, events) -> int:
+    """
+    Write (event_id, event) pairs to an open text file as a VCALENDAR.
+
+    Returns:
+        Number of stored events written
+    """
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    f.write(fold("BEGIN:VCALENDAR") + fold("VERSION:2.0") + fold(f"PRODID:{PRODID}") + fold("CALSCALE:GREGORIAN"))
+    count = 0
+    for event_id, event in events:
+        try:
+            f.write("".join(fold(line) for line in event_lines(event_id, event, stamp)))
+            count += 1
+        except (KeyError, ValueError) as e:
+            logging.warning(f"ICS: skipping event {event_id}: {e}")
+    f.write(fold("END:VCALENDAR"))
+    return count
@@ -2,32 +2,33 @@
 Development Journal for Jarvis - Track project progress day by day
 """
 from langchain.tools import tool
-import json
 import os
 from datetime import datetime
 import logging
 
+from tools.journal_store import JournalStore
+
 # Journal file location
 JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".jarvis")
-JOURNAL_FILE = os.path.join(JOURNAL_DIR, "development_journal.json")
+JOURNAL_FILE = os.path.join(JOURNAL_DIR, "development_journal.json")  # legacy whole-file format
+JOURNAL_LOG = os.path.join(JOURNAL_DIR, "development_journal.jsonl")
 os.makedirs(JOURNAL_DIR, exist_ok=True)
 
+# Shared store: appends on write, indexed reads, migrates JOURNAL_FILE on first use
+store = JournalStore(JOURNAL_LOG, legacy_path=JOURNAL_FILE)
+
 def load_journal():
-    """Load the development journal"""
-    if os.path.exists(JOURNAL_FILE):
-        try:
-            with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            logging.error(f"Error loading journal: {e}")
-            return {}
-    return {}
+    """Load the development journal as a {"day_N": entry} dict"""
+    try:
+        return {f"day_{entry['day']}": entry for entry in store.entries()}
+    except Exception as e:
+        logging.error(f"Error loading journal: {e}")
+        return {}
 
 def save_journal(journal_data):
-    """Save the development journal"""
+    """Replace the development journal with a {"day_N": entry} dict"""
     try:
-        with open(JOURNAL_FILE, 'w', encoding='utf-8') as f:
-            json.dump(journal_data, f, indent=2, ensure_ascii=False)
+        store.replace_all([v for k, v in journal_data.items() if k.startswith("day_")])
         return True
     except Exception as e:
         logging.error(f"Error saving journal: {e}")
@@ -53,20 +54,13 @@ def log_project_day(day_number: int, accomplishments: str) -> str:
         Confirmation message
     """
     try:
-        journal = load_journal()
-        
-        day_key = f"day_{day_number}"
-        journal[day_key] = {
+        store.put({
             "day": day_number,
             "date": datetime.now().strftime("%Y-%m-%d"),
             "accomplishments": accomplishments,
             "timestamp": datetime.now().isoformat()
-        }
-        
-        if save_journal(journal):
-            return f"Day {day_number} logged to neural archive."
-        else:
-            return "Memory write failed."
+        })
+        return f"Day {day_number} logged to neural archive."
             
     except Exception as e:
         logging.error(f"Journal logging error: {e}")
@@ -82,20 +76,12 @@ def get_project_day() -> str:
         Current day number and summary
     """
     try:
-        journal = load_journal()
+        latest = store.latest()
         
-        if not journal:
+        if not latest:
             return "No project days logged yet. Start by saying: 'Today is day 1 of learning AI'"
         
-        # Find the highest day number
-        day_numbers = [int(key.split('_')[1]) for key in journal.keys() if key.startswith('day_')]
-        
-        if not day_numbers:
-            return "No project days found"
-        
-        current_day = max(day_numbers)
-        
-        return f"We are on day {current_day} of learning AI, sir."
+        return f"We are on day {latest['day']} of learning AI, sir."
         
     except Exception as e:
         logging.error(f"Error getting project day: {e}")
@@ -114,14 +100,11 @@ def get_day_accomplishments(day_number: int) -> str:
         Accomplishments for that day
     """
     try:
-        journal = load_journal()
-        day_key = f"day_{day_number}"
+        day_info = store.get(day_number)
         
-        if day_key not in journal:
+        if not day_info:
             return f"No entry found for Day {day_number}"
         
-        day_info = journal[day_key]
-        
         # Shorter response
         accomplishments = day_info['accomplishments']
         if len(accomplishments) > 100:
@@ -144,20 +127,13 @@ def get_today_summary() -> str:
         Today's accomplishments
     """
     try:
-        journal = load_journal()
-        
-        if not journal:
-            return "No entries logged yet"
-        
         # Get most recent entry
-        day_numbers = sorted([int(key.split('_')[1]) for key in journal.keys() if key.startswith('day_')], reverse=True)
+        day_info = store.latest()
         
-        if not day_numbers:
-            return "No entries found"
+        if not day_info:
+            return "No entries logged yet"
         
-        latest_day = day_numbers[0]
-        day_key = f"day_{latest_day}"
-        day_info = journal[day_key]
+        latest_day = day_info['day']
         
         today = datetime.now().strftime("%Y-%m-%d")
         
@@ -174,38 +150,119 @@ def get_today_summary() -> str:
         return f"Error: {e}"
 
 
+def _shorten(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def iter_project_summary(cursor: int = 0, rollup: str = "day"):
+    """
+    Stream the project timeline one line at a time.
+    
+    Args:
+        cursor: First day (or week, for rollup="week") to include
+        rollup: "day" for one line per day, "week" for one line per project week
+    
+    Yields:
+        (cursor, line) - pass the cursor back in to resume at that line
+    """
+    if rollup == "week":
+        for week, entries in store.iter_weeks(cursor):
+            first, last = (week - 1) * 7 + 1, week * 7
+            highlights = "; ".join(_shorten(entry['accomplishments'], 60) for entry in entries)
+            yield week, f"Week {week} (days {first}-{last}, {len(entries)} logged): {highlights}"
+    else:
+        for entry in store.iter_entries(cursor):
+            yield entry['day'], f"Day {entry['day']}: {entry['accomplishments']}"
+
+
 @tool
-def get_project_summary() -> str:
+def get_project_summary(cursor: int = 0, rollup: str = "day", limit: int = 20, max_chars: int = 1500) -> str:
     """
-    Get a summary of the entire AI learning project.
-    Shows all days and accomplishments.
+    Get a page of the AI learning project timeline.
+    Returns a bounded slice; if more is available the reply ends with the cursor to continue from.
+    
+    Args:
+        cursor: Day to start from (week number when rollup is "week"); 0 for the beginning
+        rollup: "day" for one line per day, "week" for a per-week rollup of long journals
+        limit: Maximum lines to return (default: 20)
+        max_chars: Character budget for the reply (default: 1500)
+    
+    Examples:
+        - "Show me the project summary" → get_project_summary()
+        - "Summarize the project week by week" → get_project_summary(rollup="week")
     
     Returns:
-        Full project timeline
+        Project timeline page
     """
     try:
-        journal = load_journal()
+        total = len(store)
         
-        if not journal:
+        if not total:
             return "No project history yet"
         
-        # Sort by day number
-        day_numbers = sorted([int(key.split('_')[1]) for key in journal.keys() if key.startswith('day_')])
+        lines = [f"🚀 AI Learning Journey - {total} days logged:\n"]
+        used = len(lines[0])
+        next_cursor = None
         
-        summary = f"🚀 AI Learning Journey - {len(day_numbers)} days logged:\n\n"
+        for line_cursor, line in iter_project_summary(cursor, rollup):
+            if len(lines) > limit or (len(lines) > 1 and used + len(line) + 1 > max_chars):
+                next_cursor = line_cursor
+                break
+            line = _shorten(line, max(40, max_chars - used))
+            lines.append(line)
+            used += len(line) + 1
         
-        for day_num in day_numbers:
-            day_key = f"day_{day_num}"
-            day_info = journal[day_key]
-            summary += f"Day {day_num}: {day_info['accomplishments']}\n"
+        if len(lines) == 1:
+            return f"No entries from {'week' if rollup == 'week' else 'day'} {cursor} onwards"
+        if next_cursor is not None:
+            lines.append(f"... more available (cursor={next_cursor})")
         
-        return summary
+        return "\n".join(lines)
         
     except Exception as e:
         logging.error(f"Error getting project summary: {e}")
         return f"Error: {e}"
 
 
+@tool
+def search_journal(query: str, from_date: str = "", to_date: str = "", limit: int = 3) -> str:
+    """
+    Search the development journal by keywords and/or date range.
+    Use this for questions like "when did we add vision?" instead of reading the whole summary.
+    
+    Args:
+        query: Keywords to look for (e.g., "vision", "memory system"); empty to list by date
+        from_date: Optional start date, YYYY-MM-DD
+        to_date: Optional end date, YYYY-MM-DD
+        limit: Maximum number of entries to return (default: 3)
+    
+    Examples:
+        - "When did we add vision?" → search_journal("add vision")
+        - "What did we do in October?" → search_journal("", "2025-10-01", "2025-10-31")
+    
+    Returns:
+        Matching days, best match first, plus streak statistics
+    """
+    try:
+        results = store.search(query, from_date or None, to_date or None, limit)
+        
+        if not results:
+            return f"No journal entries found for '{query}'" if query else "No journal entries in that range"
+        
+        lines = [f"Day {entry['day']} ({entry['date']}): {entry['accomplishments']}" for _, entry in results]
+        
+        stats = store.stats()
+        lines.append(
+            f"Streak: {stats['current_streak']} days (longest {stats['longest_streak']}), "
+            f"{stats['missing_days']} missing days across {stats['gaps']} gaps"
+        )
+        return "\n".join(lines)
+        
+    except Exception as e:
+        logging.error(f"Journal search error: {e}")
+        return f"Error: {e}"
+
+
 # Quick test
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -231,5 +288,9 @@ if __name__ == "__main__":
     result = get_today_summary.invoke({})
     print(f"   {result}")
     
+    print("\n5. Searching the journal...")
+    result = search_journal.invoke({"query": "vision"})
+    print(f"   {result}")
+    
     print("\n✅ Journal system working!")
 
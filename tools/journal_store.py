@@ -0,0 +1,359 @@
+"""
+Journal storage engine for Jarvis
+Append-only JSON Lines log with an in-memory index by day number and date,
+plus an inverted index over accomplishments for ranked full-text search.
+
+Each log_project_day appends one line instead of rewriting the whole journal.
+The index is built lazily on first read and rebuilt only when the log changes
+on disk (another process wrote to it). Superseded entries are dropped by an
+atomic compaction (temp file + rename) once they outnumber live ones.
+"""
+import bisect
+import json
+import logging
+import math
+import os
+import re
+import threading
+
+from tools.storage import atomic_write_text, file_signature
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "for", "from", "in",
+    "is", "it", "of", "on", "or", "the", "to", "we", "was", "were", "what", "when",
+    "which", "with", "our", "us", "you", "i",
+}
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens with stopwords removed and light suffix stripping"""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", (text or "").lower()):
+        if word in STOPWORDS:
+            continue
+        for suffix in ("ing", "ed", "es", "s"):
+            if len(word) > len(suffix) + 2 and word.endswith(suffix):
+                word = word[:-len(suffix)]
+                break
+        tokens.append(word)
+    return tokens
+
+
+def week_of(day: int) -> int:
+    """Project week for a day number (days 1-7 are week 1)"""
+    return (day - 1) // 7 + 1
+
+
+class JournalStore:
+    """Append-only journal log with O(1) lookups by day and date"""
+
+    def __init__(self, log_path: str, legacy_path: str = None, compact_ratio: float = 2.0):
+        """
+        Args:
+            log_path: JSON Lines log file
+            legacy_path: Old whole-file JSON journal, migrated on first load
+            compact_ratio: Compact when log lines exceed live entries by this factor
+        """
+        self.log_path = log_path
+        self.legacy_path = legacy_path
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stat = None
+        self._torn_tail = False
+        self._records = 0
+        self._reset_index()
+
+    # ---------- index ----------
+
+    def _reset_index(self):
+        self._records = 0
+        self._entries = {}
+        self._days = []
+        self._by_date = {}
+        # Full-text index: token -> {day: term frequency}
+        self._postings = {}
+        self._doc_len = {}
+        self._total_len = 0
+        # Project weeks (days 1-7 = week 1), kept up to date on insert: week -> sorted days
+        self._weeks = {}
+        self._week_keys = []
+        # Consecutive-day runs, kept up to date on insert: start -> end and end -> start
+        self._run_end = {}
+        self._run_start = {}
+        self._longest_run = 0
+
+    def _index_text(self, day: int, text: str):
+        tokens = tokenize(text)
+        for token in tokens:
+            postings = self._postings.setdefault(token, {})
+            postings[day] = postings.get(day, 0) + 1
+        self._doc_len[day] = len(tokens)
+        self._total_len += len(tokens)
+
+    def _unindex_text(self, day: int, text: str):
+        for token in set(tokenize(text)):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(day, None)
+                if not postings:
+                    del self._postings[token]
+        self._total_len -= self._doc_len.pop(day, 0)
+
+    def _add_to_runs(self, day: int):
+        """Merge a new day into the run structure (O(1))"""
+        start, end = day, day
+        if day - 1 in self._run_start:
+            start = self._run_start.pop(day - 1)
+        if day + 1 in self._run_end:
+            end = self._run_end.pop(day + 1)
+        self._run_end[start] = end
+        self._run_start[end] = start
+        self._longest_run = max(self._longest_run, end - start + 1)
+
+    def _index(self, entry: dict):
+        """Add or replace one entry in the in-memory index"""
+        day = int(entry["day"])
+        old = self._entries.get(day)
+        if old is None:
+            bisect.insort(self._days, day)
+            self._add_to_runs(day)
+            week = week_of(day)
+            if week not in self._weeks:
+                self._weeks[week] = []
+                bisect.insort(self._week_keys, week)
+            bisect.insort(self._weeks[week], day)
+        else:
+            self._unindex_text(day, old.get("accomplishments", ""))
+            dated = self._by_date.get(old.get("date"), [])
+            if day in dated:
+                dated.remove(day)
+        self._entries[day] = entry
+        self._by_date.setdefault(entry.get("date"), []).append(day)
+        self._index_text(day, entry.get("accomplishments", ""))
+
+    def _disk_stat(self):
+        return file_signature(self.log_path)
+
+    def _legacy_pending(self) -> bool:
+        """An old journal exists that has not been converted into the log yet"""
+        return bool(self.legacy_path) and os.path.exists(self.legacy_path) and not os.path.exists(self.log_path)
+
+    def _migrate_legacy(self):
+        """Convert the old development_journal.json into the log format"""
+        if not self._legacy_pending():
+            return
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+            entries = [v for k, v in legacy.items() if k.startswith("day_")]
+            entries.sort(key=lambda e: int(e["day"]))
+            self._write_log(entries)
+            logging.info(f"📓 Migrated {len(entries)} journal entries to {self.log_path}")
+        except Exception as e:
+            logging.error(f"Error migrating journal: {e}")
+
+    def _load(self):
+        """Rebuild the index from the log"""
+        self._reset_index()
+        self._migrate_legacy()
+        self._torn_tail = False
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line_no, line in enumerate(f, 1):
+                    self._torn_tail = not line.endswith("\n")
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                        if not isinstance(record, dict):
+                            raise ValueError(f"expected an object, got {type(record).__name__}")
+                        self._index(record)
+                        self._records += 1
+                    except (ValueError, KeyError, TypeError) as e:
+                        # A torn final line from a crash mid-append is skipped, not fatal
+                        logging.warning(f"Skipping bad journal line {line_no}: {e}")
+        self._stat = self._disk_stat()
+        self._loaded = True
+
+    def _ensure_fresh(self):
+        if not self._loaded or self._disk_stat() != self._stat:
+            self._load()
+
+    # ---------- writes ----------
+
+    def _write_log(self, entries):
+        text = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+        atomic_write_text(self.log_path, text)
+
+    def put(self, entry: dict):
+        """Append an entry (replacing any earlier entry for the same day)"""
+        with self._lock:
+            self._ensure_fresh()
+            if self._legacy_pending():
+                # Appending would create the log and the old journal would never be migrated
+                self._load()
+                if self._legacy_pending():
+                    raise RuntimeError(f"Could not migrate {self.legacy_path}; not starting a new journal log")
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                if self._torn_tail:
+                    # Terminate a partial line so it cannot swallow this record
+                    f.write("\n")
+                    self._torn_tail = False
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._index(entry)
+            self._records += 1
+            self._stat = self._disk_stat()
+            if self._records > 64 and self._records > self.compact_ratio * len(self._entries):
+                self.compact()
+
+    def compact(self):
+        """Rewrite the log with only live entries, atomically"""
+        with self._lock:
+            self._ensure_fresh()
+            self._write_log(self._entries[day] for day in self._days)
+            self._records = len(self._days)
+            self._stat = self._disk_stat()
+
+    def replace_all(self, entries):
+        """Replace the whole journal with the given entries"""
+        with self._lock:
+            self._write_log(sorted(entries, key=lambda e: int(e["day"])))
+            self._load()
+
+    # ---------- reads ----------
+
+    def get(self, day: int):
+        """Entry for a day number, or None"""
+        with self._lock:
+            self._ensure_fresh()
+            return self._entries.get(int(day))
+
+    def latest(self):
+        """Entry with the highest day number, or None"""
+        with self._lock:
+            self._ensure_fresh()
+            return self._entries[self._days[-1]] if self._days else None
+
+    def on_date(self, date: str) -> list:
+        """Entries logged for a calendar date (YYYY-MM-DD), by day number"""
+        with self._lock:
+            self._ensure_fresh()
+            return [self._entries[day] for day in sorted(self._by_date.get(date, []))]
+
+    def days(self) -> list:
+        """All logged day numbers, ascending"""
+        with self._lock:
+            self._ensure_fresh()
+            return list(self._days)
+
+    def entries(self) -> list:
+        """All entries in day order"""
+        with self._lock:
+            self._ensure_fresh()
+            return [self._entries[day] for day in self._days]
+
+    def iter_entries(self, start_day: int = 0, chunk: int = 64):
+        """
+        Yield entries with day >= start_day in day order.
+        The lock is held per chunk, not across yields, so writers are never blocked by a slow reader.
+        """
+        next_day = start_day
+        while True:
+            with self._lock:
+                self._ensure_fresh()
+                index = bisect.bisect_left(self._days, next_day)
+                batch = [self._entries[day] for day in self._days[index:index + chunk]]
+            if not batch:
+                return
+            yield from batch
+            next_day = int(batch[-1]["day"]) + 1
+
+    def iter_weeks(self, start_week: int = 0):
+        """Yield (week, entries) for each project week >= start_week"""
+        next_week = start_week
+        while True:
+            with self._lock:
+                self._ensure_fresh()
+                index = bisect.bisect_left(self._week_keys, next_week)
+                if index >= len(self._week_keys):
+                    return
+                week = self._week_keys[index]
+                entries = [self._entries[day] for day in self._weeks[week]]
+            yield week, entries
+            next_week = week + 1
+
+    def search(self, query: str, from_date: str = None, to_date: str = None, limit: int = 5) -> list:
+        """
+        Rank entries against a query with BM25 over accomplishments.
+
+        Args:
+            query: Free text; an empty query matches every entry in the date range
+            from_date: Inclusive lower bound (YYYY-MM-DD)
+            to_date: Inclusive upper bound (YYYY-MM-DD)
+            limit: Maximum results
+
+        Returns:
+            List of (score, entry), best first
+        """
+        with self._lock:
+            self._ensure_fresh()
+
+            def in_range(entry):
+                date = entry.get("date") or ""
+                return (not from_date or date >= from_date) and (not to_date or date <= to_date)
+
+            terms = tokenize(query)
+            if not terms:
+                matches = [(0.0, self._entries[day]) for day in reversed(self._days)
+                           if in_range(self._entries[day])]
+                return matches[:limit]
+
+            count = len(self._entries)
+            avg_len = (self._total_len / count) if count else 1.0
+            k1, b = 1.2, 0.75
+            scores = {}
+            for term in set(terms):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for day, tf in postings.items():
+                    norm = tf + k1 * (1 - b + b * self._doc_len.get(day, 0) / (avg_len or 1.0))
+                    scores[day] = scores.get(day, 0.0) + idf * tf * (k1 + 1) / norm
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+            results = []
+            for day, score in ranked:
+                entry = self._entries[day]
+                if in_range(entry):
+                    results.append((score, entry))
+                    if len(results) >= limit:
+                        break
+            return results
+
+    def stats(self) -> dict:
+        """Streak and gap statistics over day numbers, from the incremental run index"""
+        with self._lock:
+            self._ensure_fresh()
+            if not self._days:
+                return {"days_logged": 0, "first_day": None, "latest_day": None,
+                        "current_streak": 0, "longest_streak": 0, "missing_days": 0, "gaps": 0}
+            first, latest = self._days[0], self._days[-1]
+            return {
+                "days_logged": len(self._days),
+                "first_day": first,
+                "latest_day": latest,
+                "current_streak": latest - self._run_start[latest] + 1,
+                "longest_streak": self._longest_run,
+                "missing_days": (latest - first + 1) - len(self._days),
+                "gaps": len(self._run_end) - 1,
+            }
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_fresh()
+            return len(self._days)
@@ -6,6 +6,7 @@ from langchain.tools import tool
 import chromadb
 from chromadb.config import Settings
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
 
@@ -31,6 +32,13 @@ except Exception as e:
     logging.warning(f"⚠️ Memory system unavailable: {e}")
 
 
+def reload_collections():
+    """Re-fetch the collection handles after the collections were replaced (snapshot import)"""
+    global memories, conversations
+    memories = client.get_or_create_collection(name="memories")
+    conversations = client.get_or_create_collection(name="conversations")
+
+
 @tool
 def remember_fact(fact: str, category: str = "general") -> str:
     """
@@ -186,6 +194,46 @@ def get_conversation_context(query: str, limit: int = 5) -> str:
         return f"I had trouble finding that conversation: {e}"
 
 
+def _query_hits(collection, source: str, query: str, limit: int) -> list:
+    """Query one collection and return hits as plain dicts"""
+    if collection.count() == 0:
+        return []
+    results = collection.query(
+        query_texts=[query],
+        n_results=min(limit, collection.count()),
+        include=["documents", "distances"]
+    )
+    documents = results['documents'][0] if results['documents'] else []
+    distances = results['distances'][0] if results.get('distances') else [0.0] * len(documents)
+    return [
+        {"text": doc, "source": source, "distance": dist}
+        for doc, dist in zip(documents, distances)
+    ]
+
+
+def search_memory_hits(query: str, fact_limit: int = 3, conversation_limit: int = 2) -> list:
+    """
+    Search facts and past conversations in parallel without going through the agent.
+    Used for automatic context injection before the LLM is called.
+
+    Returns:
+        List of {"text", "source", "distance"} dicts, closest first
+    """
+    if not MEMORY_AVAILABLE:
+        return []
+
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            facts = pool.submit(_query_hits, memories, "fact", query, fact_limit)
+            convos = pool.submit(_query_hits, conversations, "conversation", query, conversation_limit)
+            hits = facts.result() + convos.result()
+        hits.sort(key=lambda hit: hit["distance"])
+        return hits
+    except Exception as e:
+        logging.error(f"Memory search error: {e}")
+        return []
+
+
 def clear_all_memories():
     """Admin function to clear all memories (use with caution!)"""
     if not MEMORY_AVAILABLE:
@@ -0,0 +1,259 @@
+"""
+Memory snapshots for Jarvis - export/import ~/.jarvis/memory without re-embedding
+
+A snapshot is a directory with one columnar record file and one float16
+embedding matrix (.npy, memory-mappable) per collection:
+
+    manifest.json
+    memories.records.json      {"ids": [...], "documents": [...], "metadatas": [...]}
+    memories.embeddings.npy    float16, shape (count, dim)
+    conversations.records.json
+    conversations.embeddings.npy
+
+Usage:
+    python -m tools.memory_snapshot export ~/jarvis-memory-snapshot
+    python -m tools.memory_snapshot import ~/jarvis-memory-snapshot [--replace]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from tools.memory import client, MEMORY_AVAILABLE, MEMORY_DIR, reload_collections
+
+SNAPSHOT_FORMAT = "jarvis-memory-snapshot"
+SNAPSHOT_VERSION = 1
+COLLECTIONS = ("memories", "conversations")
+PAGE_SIZE = 1000
+# --replace loads into "<name>-import" and only then swaps it in for "<name>"
+STAGING_SUFFIX = "-import"
+PREVIOUS_SUFFIX = "-previous"
+
+
+def _max_batch_size() -> int:
+    """Largest batch Chroma accepts in one add/upsert call"""
+    try:
+        return int(client.get_max_batch_size())
+    except Exception:
+        return 5000
+
+
+def _records_path(path: str, name: str) -> str:
+    return os.path.join(path, f"{name}.records.json")
+
+
+def _embeddings_path(path: str, name: str) -> str:
+    return os.path.join(path, f"{name}.embeddings.npy")
+
+
+def _export_collection(name: str, path: str) -> dict:
+    """Page through a collection and write its records and embeddings"""
+    collection = client.get_or_create_collection(name)
+    count = collection.count()
+    ids, documents, metadatas = [], [], []
+    matrix = None
+    row = 0
+
+    for offset in range(0, count, PAGE_SIZE):
+        page = collection.get(
+            include=["documents", "metadatas", "embeddings"],
+            limit=PAGE_SIZE,
+            offset=offset
+        )
+        embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+        if matrix is None:
+            # Written incrementally so the whole collection never sits in RAM twice
+            matrix = np.lib.format.open_memmap(
+                _embeddings_path(path, name), mode="w+",
+                dtype=np.float16, shape=(count, embeddings.shape[1])
+            )
+        matrix[row:row + len(embeddings)] = embeddings.astype(np.float16)
+        row += len(embeddings)
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+
+    if matrix is None:
+        np.save(_embeddings_path(path, name), np.zeros((0, 0), dtype=np.float16))
+        dim = 0
+    else:
+        matrix.flush()
+        dim = int(matrix.shape[1])
+        del matrix
+
+    with open(_records_path(path, name), "w", encoding="utf-8") as f:
+        json.dump({"ids": ids, "documents": documents, "metadatas": metadatas}, f, ensure_ascii=False)
+
+    return {"count": row, "dim": dim, "metadata": collection.metadata or {}}
+
+
+def export_snapshot(path: str) -> dict:
+    """
+    Export all memory collections to a snapshot directory.
+
+    Returns:
+        The snapshot manifest
+    """
+    if not MEMORY_AVAILABLE:
+        raise RuntimeError("Memory system is not available")
+
+    os.makedirs(path, exist_ok=True)
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created": datetime.now().isoformat(),
+        "source": MEMORY_DIR,
+        "collections": {},
+    }
+    for name in COLLECTIONS:
+        manifest["collections"][name] = _export_collection(name, path)
+        logging.info(f"📦 Exported {manifest['collections'][name]['count']} {name}")
+
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _existing_dim(collection) -> int:
+    """Embedding dimension already used by a collection (0 if empty)"""
+    if collection.count() == 0:
+        return 0
+    peek = collection.peek(1)
+    return len(peek["embeddings"][0])
+
+
+def _drop(name: str):
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+
+
+def _swap_in(name: str):
+    """Replace collection name by its staged import, keeping the old one until the swap worked"""
+    staged = client.get_collection(f"{name}{STAGING_SUFFIX}")
+    _drop(f"{name}{PREVIOUS_SUFFIX}")
+    try:
+        current = client.get_collection(name)
+    except Exception:
+        current = None
+    if current is not None:
+        current.modify(name=f"{name}{PREVIOUS_SUFFIX}")
+    try:
+        staged.modify(name=name)
+    except Exception:
+        if current is not None:
+            current.modify(name=name)
+        raise
+    _drop(f"{name}{PREVIOUS_SUFFIX}")
+
+
+def _load_collection(collection, name: str, info: dict, path: str, batch_size: int) -> int:
+    if info["count"] == 0:
+        return 0
+
+    current_dim = _existing_dim(collection)
+    if current_dim and current_dim != info["dim"]:
+        raise ValueError(f"{name}: snapshot dim {info['dim']} does not match existing dim {current_dim}")
+
+    with open(_records_path(path, name), "r", encoding="utf-8") as f:
+        records = json.load(f)
+    matrix = np.load(_embeddings_path(path, name), mmap_mode="r")
+
+    for start in range(0, info["count"], batch_size):
+        end = start + batch_size
+        collection.upsert(
+            ids=records["ids"][start:end],
+            documents=records["documents"][start:end],
+            metadatas=records["metadatas"][start:end],
+            embeddings=np.asarray(matrix[start:end], dtype=np.float32).tolist()
+        )
+    return info["count"]
+
+
+def import_snapshot(path: str, replace: bool = False) -> dict:
+    """
+    Bulk-load a snapshot into the memory collections using the stored embeddings.
+
+    Args:
+        path: Snapshot directory written by export_snapshot
+        replace: Replace existing collections instead of merging by id. The snapshot
+                 is loaded into staging collections first, so a failed import leaves
+                 the current memory untouched.
+
+    Returns:
+        Number of records loaded per collection
+    """
+    if not MEMORY_AVAILABLE:
+        raise RuntimeError("Memory system is not available")
+
+    with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"{path} is not a Jarvis memory snapshot")
+    if manifest.get("version", 0) > SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot version {manifest['version']} is newer than supported ({SNAPSHOT_VERSION})")
+
+    batch_size = _max_batch_size()
+    loaded = {}
+
+    try:
+        for name, info in manifest["collections"].items():
+            target = name
+            if replace:
+                target = f"{name}{STAGING_SUFFIX}"
+                _drop(target)
+            collection = client.get_or_create_collection(target, metadata=info.get("metadata") or None)
+            loaded[name] = _load_collection(collection, name, info, path, batch_size)
+            logging.info(f"📥 Imported {loaded[name]} {name}")
+
+        if replace:
+            for name in manifest["collections"]:
+                _swap_in(name)
+    finally:
+        if replace:
+            for name in manifest["collections"]:
+                _drop(f"{name}{STAGING_SUFFIX}")
+        # tools.memory keeps collection handles; point them at the current collections
+        reload_collections()
+
+    return loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="jarvis-memory", description="Export or import Jarvis memory snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export", help="Write a snapshot of ~/.jarvis/memory")
+    export_cmd.add_argument("path", help="Snapshot directory")
+
+    import_cmd = sub.add_parser("import", help="Load a snapshot without re-embedding")
+    import_cmd.add_argument("path", help="Snapshot directory")
+    import_cmd.add_argument("--replace", action="store_true", help="Replace existing memories instead of merging")
+
+    args = parser.parse_args(argv)
+    path = os.path.expanduser(args.path)
+    started = time.perf_counter()
+
+    try:
+        if args.command == "export":
+            manifest = export_snapshot(path)
+            counts = {name: info["count"] for name, info in manifest["collections"].items()}
+            print(f"✅ Exported {counts} to {path} in {time.perf_counter() - started:.1f}s")
+        else:
+            counts = import_snapshot(path, replace=args.replace)
+            print(f"✅ Imported {counts} from {path} in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"❌ {args.command.capitalize()} failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
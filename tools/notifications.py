@@ -0,0 +1,258 @@
+"""
+Notification dispatch for Jarvis
+Callers (reminder and timer firings) only enqueue; one worker thread shows
+notifications and plays the alert sound. Alerts that arrive together are
+coalesced into a single notification and a single sound, so simultaneous
+timers never stack up PowerShell/notify-send processes. The alert sound is
+loaded once and played in-process (winsound on Windows, PyAudio elsewhere)
+when possible. Sinks are pluggable; MemorySink records instead of alerting.
+"""
+import io
+import logging
+import math
+import os
+import platform
+import queue
+import struct
+import subprocess
+import threading
+import time
+import wave
+
+PYAUDIO_AVAILABLE = False
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    pass
+
+ALERT_SOUND = os.getenv("JARVIS_ALERT_SOUND", "")
+COALESCE_SECONDS = float(os.getenv("NOTIFY_COALESCE_MS", "250")) / 1000
+
+DEFAULT_SOUNDS = {
+    "Windows": os.path.join(os.environ.get("SystemRoot", r"C:\Windows"), "Media", "Windows Notify System Generic.wav"),
+    "Darwin": "/System/Library/Sounds/Glass.aiff",
+    "Linux": "/usr/share/sounds/freedesktop/stereo/complete.oga",
+}
+
+
+def synthesize_chime(frequency: float = 880.0, seconds: float = 0.35, rate: int = 22050) -> bytes:
+    """A short fading sine tone as WAV bytes (used when no WAV alert sound is available)"""
+    frames = bytearray()
+    count = int(seconds * rate)
+    for i in range(count):
+        fade = 1.0 - i / count
+        frames += struct.pack("<h", int(12000 * fade * math.sin(2 * math.pi * frequency * i / rate)))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+class AlertSound:
+    """Alert sound decoded once at startup and replayed from memory"""
+
+    def __init__(self, path: str = None):
+        self.system = platform.system()
+        self.path = path or DEFAULT_SOUNDS.get(self.system, "")
+        self.wav_bytes = None
+        if self.path.lower().endswith(".wav") and os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                self.wav_bytes = f.read()
+        elif self.system == "Windows" or PYAUDIO_AVAILABLE:
+            self.wav_bytes = synthesize_chime()
+        self._pcm = None
+        self._audio = None
+        if self.wav_bytes and self.system != "Windows" and PYAUDIO_AVAILABLE:
+            with wave.open(io.BytesIO(self.wav_bytes), "rb") as wav:
+                self._pcm = (wav.getsampwidth(), wav.getnchannels(), wav.getframerate(),
+                             wav.readframes(wav.getnframes()))
+
+    def play(self):
+        """Play the alert (blocking; call from the dispatcher thread)"""
+        if self.wav_bytes and self.system == "Windows":
+            import winsound
+            winsound.PlaySound(self.wav_bytes, winsound.SND_MEMORY)
+            return
+        if self._pcm is not None:
+            if self._audio is None:
+                self._audio = pyaudio.PyAudio()
+            width, channels, rate, frames = self._pcm
+            stream = self._audio.open(format=self._audio.get_format_from_width(width),
+                                      channels=channels, rate=rate, output=True)
+            try:
+                stream.write(frames)
+            finally:
+                stream.stop_stream()
+                stream.close()
+            return
+        # No in-process player: fall back to the system player
+        if self.system == "Darwin":
+            subprocess.run(["afplay", self.path], timeout=10)
+        elif self.system == "Linux":
+            subprocess.run(["paplay", self.path], timeout=10)
+
+
+class SystemSink:
+    """Desktop notifications and alert sound for the current OS"""
+
+    def __init__(self, sound_path: str = None, sound: bool = True):
+        self.sound = AlertSound(sound_path or ALERT_SOUND or None) if sound else None
+
+    def alert(self):
+        if self.sound is not None:
+            self.sound.play()
+
+    def show(self, title: str, message: str):
+        system = platform.system()
+        if system == "Windows":
+            # Use PowerShell to show notification
+            safe_title = title.replace("&", "&amp;").replace("<", "&lt;")
+            safe_message = message.replace("&", "&amp;").replace("<", "&lt;")
+            ps_command = f"""
+[Windows.UI.Notifications.ToastNotificationManager, Windows.UI.Notifications, ContentType = WindowsRuntime] | Out-Null
+[Windows.Data.Xml.Dom.XmlDocument, Windows.Data.Xml.Dom.XmlDocument, ContentType = WindowsRuntime] | Out-Null
+
+$template = @"
+<toast>
+    <visual>
+        <binding template="ToastText02">
+            <text id="1">{safe_title}</text>
+            <text id="2">{safe_message}</text>
+        </binding>
+    </visual>
+</toast>
+"@
+
+$xml = New-Object Windows.Data.Xml.Dom.XmlDocument
+$xml.LoadXml($template)
+$toast = [Windows.UI.Notifications.ToastNotification]::new($xml)
+[Windows.UI.Notifications.ToastNotificationManager]::CreateToastNotifier("Jarvis").Show($toast)
+"""
+            subprocess.run(["powershell", "-Command", ps_command],
+                           capture_output=True, timeout=15,
+                           creationflags=subprocess.CREATE_NO_WINDOW)
+        elif system == "Darwin":  # macOS
+            safe_message = message.replace('"', '\\"')
+            safe_title = title.replace('"', '\\"')
+            subprocess.run([
+                "osascript", "-e",
+                f'display notification "{safe_message}" with title "{safe_title}"'
+            ], timeout=10)
+        elif system == "Linux":
+            subprocess.run(["notify-send", title, message], timeout=10)
+
+
+class MemorySink:
+    """Records notifications instead of showing them (tests, headless runs)"""
+
+    def __init__(self):
+        self.alerts = 0
+        self.shown = []
+
+    def alert(self):
+        self.alerts += 1
+
+    def show(self, title: str, message: str):
+        self.shown.append((title, message))
+
+
+class NotificationDispatcher:
+    """Queue + single worker that coalesces alerts arriving within a short window"""
+
+    def __init__(self, sink=None, coalesce_seconds: float = COALESCE_SECONDS):
+        self._sink = sink
+        self.coalesce_seconds = coalesce_seconds
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def sink(self):
+        if self._sink is None:
+            try:
+                self._sink = SystemSink()  # loads the alert sound once, on first use
+            except Exception as e:
+                logging.error(f"Alert sound unavailable, notifying without sound: {e}")
+                self._sink = SystemSink(sound=False)
+        return self._sink
+
+    def set_sink(self, sink):
+        self._sink = sink
+
+    def notify(self, title: str, message: str, sound: bool = True):
+        """Queue a notification and return immediately"""
+        self.start()
+        self._queue.put((title, message, sound))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far has been delivered"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def start(self):
+        """Start the worker, which loads the sink (and its alert sound) before the first alert"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="jarvis-notify", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        """First queued item plus everything else that arrives within the coalesce window"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.coalesce_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, remaining)) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _deliver(self, batch):
+        grouped = {}
+        for title, message, _ in batch:
+            messages = grouped.setdefault(title, [])
+            if message not in messages:
+                messages.append(message)
+
+        try:
+            sink = self.sink
+        except Exception as e:
+            logging.error(f"Notification sink error: {e}")
+            return
+        if any(sound for _, _, sound in batch):
+            try:
+                sink.alert()
+            except Exception as e:
+                logging.error(f"Alert sound error: {e}")
+        for title, messages in grouped.items():
+            text = messages[0] if len(messages) == 1 else f"{len(messages)} alerts: " + "; ".join(messages)
+            try:
+                sink.show(title, text)
+            except Exception as e:
+                logging.error(f"Notification error: {e}")
+
+    def _run(self):
+        try:
+            self.sink
+        except Exception as e:
+            logging.error(f"Notification sink init error: {e}")
+        while True:
+            batch = self._collect()
+            try:
+                self._deliver(batch)
+            except Exception as e:
+                logging.error(f"Notification delivery error: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+# Shared dispatcher for all tools
+dispatcher = NotificationDispatcher()
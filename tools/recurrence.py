@@ -0,0 +1,351 @@
+"""
+RRULE-style recurrence for Jarvis calendar events
+Supports FREQ=DAILY|WEEKLY|MONTHLY|YEARLY with INTERVAL, COUNT and UNTIL;
+BYDAY for WEEKLY (weekdays), MONTHLY and YEARLY (optionally with an ordinal,
+e.g. 1MO = first Monday, -1FR = last Friday); BYMONTHDAY (negative = from the
+end of the month), BYMONTH (YEARLY) and BYSETPOS for MONTHLY and YEARLY.
+Any other part, or a combination these cannot honor, raises ValueError
+instead of being dropped, so a stored rule always means what was given.
+
+Occurrences are generated lazily for a window: the first period inside the
+window is computed arithmetically, so the cost depends on the window size,
+not on how many occurrences already happened.
+"""
+import calendar
+import re
+from datetime import datetime, timedelta
+
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+SUPPORTED_PARTS = ("FREQ", "INTERVAL", "BYDAY", "BYMONTHDAY", "BYMONTH", "BYSETPOS", "COUNT", "UNTIL", "WKST")
+BYDAY_PATTERN = re.compile(r"^([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)$")
+
+# Friendly names accepted in place of a full rule
+PRESETS = {
+    "daily": "FREQ=DAILY",
+    "every day": "FREQ=DAILY",
+    "weekdays": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "every weekday": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "weekly": "FREQ=WEEKLY",
+    "every week": "FREQ=WEEKLY",
+    "biweekly": "FREQ=WEEKLY;INTERVAL=2",
+    "monthly": "FREQ=MONTHLY",
+    "every month": "FREQ=MONTHLY",
+    "yearly": "FREQ=YEARLY",
+    "annually": "FREQ=YEARLY",
+}
+
+
+def _ints(value: str, name: str) -> list:
+    try:
+        return [int(v) for v in value.split(",") if v]
+    except ValueError:
+        raise ValueError(f"Invalid {name} '{value}'")
+
+
+def _ordinal(n: int) -> str:
+    if n == -1:
+        return "last"
+    if n < 0:
+        return f"{_ordinal(-n)} to last"
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+class RecurrenceRule:
+    """A parsed recurrence rule anchored at a start datetime"""
+
+    def __init__(self, freq: str, interval: int = 1, byday=None, count: int = None, until: datetime = None,
+                 bymonthday=None, bymonth=None, bysetpos=None, wkst: str = "MO"):
+        """
+        Args:
+            byday: Weekday numbers (0 = Monday) or (ordinal, weekday) pairs; ordinal 0 = every such weekday
+        """
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unsupported FREQ '{freq}'")
+        if interval < 1:
+            raise ValueError("INTERVAL must be at least 1")
+        self.freq = freq
+        self.interval = interval
+        self.byday = sorted({(0, d) if isinstance(d, int) else tuple(d) for d in byday}) if byday else None
+        self.bymonthday = sorted(set(bymonthday)) if bymonthday else None
+        self.bymonth = sorted(set(bymonth)) if bymonth else None
+        self.bysetpos = sorted(set(bysetpos)) if bysetpos else None
+        self.count = count
+        self.until = until
+        self.wkst = wkst
+        self._validate()
+
+    def _validate(self):
+        """Reject combinations the expansion below would not honor exactly"""
+        if self.wkst not in WEEKDAYS:
+            raise ValueError(f"Invalid WKST '{self.wkst}'")
+        if self.freq == "WEEKLY" and self.interval > 1 and self.byday and self.wkst != "MO":
+            raise ValueError("WKST other than MO is not supported")
+        ordinals = [n for n, _ in self.byday or []]
+        if any(n and not 1 <= abs(n) <= 5 for n in ordinals):
+            raise ValueError("BYDAY ordinals must be between -5 and 5 within a month")
+        if any(not 1 <= abs(d) <= 31 for d in self.bymonthday or []):
+            raise ValueError("BYMONTHDAY must be between -31 and 31 (not 0)")
+        if any(not 1 <= m <= 12 for m in self.bymonth or []):
+            raise ValueError("BYMONTH must be between 1 and 12")
+        if any(p == 0 or abs(p) > 366 for p in self.bysetpos or []):
+            raise ValueError("BYSETPOS must be between -366 and 366 (not 0)")
+
+        if self.freq == "DAILY" and (self.byday or self.bymonthday or self.bymonth or self.bysetpos):
+            raise ValueError("BY* parts are not supported with FREQ=DAILY")
+        if self.freq == "WEEKLY":
+            if any(ordinals):
+                raise ValueError("BYDAY ordinals are not allowed with FREQ=WEEKLY")
+            if self.bymonthday or self.bymonth or self.bysetpos:
+                raise ValueError("Only BYDAY is supported with FREQ=WEEKLY")
+        if self.freq == "MONTHLY" and self.bymonth:
+            raise ValueError("BYMONTH is not supported with FREQ=MONTHLY")
+        if self.freq == "YEARLY" and self.byday and not self.bymonth:
+            raise ValueError("BYDAY with FREQ=YEARLY needs BYMONTH")
+        if self.byday and self.bymonthday:
+            raise ValueError("BYDAY together with BYMONTHDAY is not supported")
+        if self.bysetpos and not (self.byday or self.bymonthday):
+            raise ValueError("BYSETPOS needs BYDAY or BYMONTHDAY")
+
+    @property
+    def weekdays(self) -> list:
+        """BYDAY weekday numbers without ordinals"""
+        return [d for _, d in self.byday] if self.byday else []
+
+    @classmethod
+    def parse(cls, text: str) -> "RecurrenceRule":
+        """Parse 'FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10' (or a preset like 'weekdays')"""
+        text = (text or "").strip()
+        text = PRESETS.get(text.lower(), text)
+        if text.upper().startswith("RRULE:"):
+            text = text[6:]
+        parts = {}
+        for part in text.split(";"):
+            if not part.strip():
+                continue
+            if "=" not in part:
+                raise ValueError(f"Malformed recurrence part '{part}'")
+            key, value = part.split("=", 1)
+            parts[key.strip().upper()] = value.strip().upper()
+        if "FREQ" not in parts:
+            raise ValueError(f"Recurrence rule needs FREQ: '{text}'")
+        unsupported = [key for key in parts if key not in SUPPORTED_PARTS]
+        if unsupported:
+            raise ValueError(f"Unsupported recurrence part(s): {', '.join(unsupported)}")
+
+        byday = None
+        if "BYDAY" in parts:
+            byday = []
+            for token in parts["BYDAY"].split(","):
+                match = BYDAY_PATTERN.match(token.strip())
+                if not match:
+                    raise ValueError(f"Invalid BYDAY '{token}'")
+                byday.append((int(match.group(1) or 0), WEEKDAYS.index(match.group(2))))
+        until = None
+        if "UNTIL" in parts:
+            raw = parts["UNTIL"].rstrip("Z")
+            until = datetime.strptime(raw[:15], "%Y%m%dT%H%M%S") if "T" in raw else \
+                datetime.strptime(raw[:8], "%Y%m%d").replace(hour=23, minute=59, second=59)
+        return cls(
+            freq=parts["FREQ"],
+            interval=int(parts.get("INTERVAL", 1)),
+            byday=byday,
+            count=int(parts["COUNT"]) if "COUNT" in parts else None,
+            until=until,
+            bymonthday=_ints(parts["BYMONTHDAY"], "BYMONTHDAY") if "BYMONTHDAY" in parts else None,
+            bymonth=_ints(parts["BYMONTH"], "BYMONTH") if "BYMONTH" in parts else None,
+            bysetpos=_ints(parts["BYSETPOS"], "BYSETPOS") if "BYSETPOS" in parts else None,
+            wkst=parts.get("WKST", "MO"),
+        )
+
+    def to_string(self) -> str:
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.byday:
+            parts.append("BYDAY=" + ",".join(f"{n or ''}{WEEKDAYS[d]}" for n, d in self.byday))
+        if self.bymonthday:
+            parts.append("BYMONTHDAY=" + ",".join(str(d) for d in self.bymonthday))
+        if self.bymonth:
+            parts.append("BYMONTH=" + ",".join(str(m) for m in self.bymonth))
+        if self.bysetpos:
+            parts.append("BYSETPOS=" + ",".join(str(p) for p in self.bysetpos))
+        if self.count:
+            parts.append(f"COUNT={self.count}")
+        if self.until:
+            parts.append("UNTIL=" + self.until.strftime("%Y%m%dT%H%M%S"))
+        if self.wkst != "MO":
+            parts.append(f"WKST={self.wkst}")
+        return ";".join(parts)
+
+    def describe(self) -> str:
+        """Short human description, e.g. 'every 2 weeks on Mon, Wed'"""
+        unit = {"DAILY": "day", "WEEKLY": "week", "MONTHLY": "month", "YEARLY": "year"}[self.freq]
+        text = f"every {unit}" if self.interval == 1 else f"every {self.interval} {unit}s"
+        if self.bymonth:
+            text += " in " + ", ".join(calendar.month_abbr[m] for m in self.bymonth)
+        if self.byday:
+            names = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+            text += " on " + ", ".join(f"the {_ordinal(n)} {names[d]}" if n else names[d] for n, d in self.byday)
+        if self.bymonthday:
+            text += " on " + ", ".join(f"day {d}" if d > 0 else f"the {_ordinal(d)} day" for d in self.bymonthday)
+        if self.bysetpos:
+            text += " (" + ", ".join(_ordinal(p) for p in self.bysetpos) + " match)"
+        if self.count:
+            text += f", {self.count} times"
+        if self.until:
+            text += f", until {self.until.strftime('%Y-%m-%d')}"
+        return text
+
+    # ---------- expansion ----------
+
+    def occurrences(self, dtstart: datetime, after: datetime, before: datetime):
+        """
+        Yield occurrence start times in [after, before), in order.
+
+        Args:
+            dtstart: First occurrence of the series
+            after: Window start (inclusive)
+            before: Window end (exclusive)
+        """
+        if self.freq == "DAILY":
+            yield from self._fixed_step(dtstart, after, before, timedelta(days=self.interval))
+        elif self.freq == "WEEKLY" and not self.byday:
+            yield from self._fixed_step(dtstart, after, before, timedelta(weeks=self.interval))
+        elif self.freq == "WEEKLY":
+            yield from self._weekly_byday(dtstart, after, before)
+        elif self.byday or self.bymonthday or self.bymonth:
+            yield from self._monthly_by(dtstart, after, before)
+        else:
+            months = self.interval * (12 if self.freq == "YEARLY" else 1)
+            yield from self._monthly(dtstart, after, before, months)
+
+    def _within_limits(self, index: int, when: datetime) -> bool:
+        if self.count is not None and index >= self.count:
+            return False
+        if self.until is not None and when > self.until:
+            return False
+        return True
+
+    def _fixed_step(self, dtstart, after, before, step):
+        k = max(0, int((after - dtstart) / step)) if after > dtstart else 0
+        while True:
+            when = dtstart + k * step
+            if when >= before or not self._within_limits(k, when):
+                return
+            if when >= after:
+                yield when
+            k += 1
+
+    def _weekly_byday(self, dtstart, after, before):
+        week0 = (dtstart - timedelta(days=dtstart.weekday()))
+        period = timedelta(weeks=self.interval)
+        weekdays = self.weekdays
+        first_week = [d for d in weekdays if d >= dtstart.weekday()]
+        per_week = len(weekdays)
+
+        k = max(0, int((after - week0) / period)) if after > week0 else 0
+        while True:
+            base = week0 + k * period
+            if base >= before:
+                return
+            days = first_week if k == 0 else weekdays
+            for j, weekday in enumerate(days):
+                when = base + timedelta(days=weekday)
+                index = j if k == 0 else len(first_week) + (k - 1) * per_week + j
+                if when >= before or not self._within_limits(index, when):
+                    return
+                if when >= after:
+                    yield when
+            k += 1
+
+    def _monthly(self, dtstart, after, before, months):
+        def shifted(k):
+            total = dtstart.month - 1 + k * months
+            year, month = dtstart.year + total // 12, total % 12 + 1
+            try:
+                return dtstart.replace(year=year, month=month)
+            except ValueError:
+                return None  # e.g. the 31st in a 30-day month is skipped, as in RFC 5545
+
+        if after > dtstart:
+            elapsed = (after.year - dtstart.year) * 12 + (after.month - dtstart.month)
+            k = max(0, elapsed // months - 1)
+        else:
+            k = 0
+        # Occurrences skipped before k only matter for COUNT, and only for days 29-31
+        skipped = sum(1 for i in range(k) if shifted(i) is None) if self.count and dtstart.day > 28 else 0
+        while True:
+            when = shifted(k)
+            if when is not None:
+                if when >= before or not self._within_limits(k - skipped, when):
+                    return
+                if when >= after:
+                    yield when
+            else:
+                skipped += 1
+            k += 1
+
+    def _month_days(self, year: int, month: int, dtstart: datetime) -> list:
+        """Days of one month selected by BYMONTHDAY / BYDAY (else DTSTART's day)"""
+        last = calendar.monthrange(year, month)[1]
+        if self.bymonthday:
+            days = [d if d > 0 else last + 1 + d for d in self.bymonthday]
+        elif self.byday:
+            first_weekday = calendar.weekday(year, month, 1)
+            days = []
+            for n, weekday in self.byday:
+                matches = list(range(1 + (weekday - first_weekday) % 7, last + 1, 7))
+                if n == 0:
+                    days.extend(matches)
+                elif n <= len(matches) and -n <= len(matches):
+                    days.append(matches[n - 1] if n > 0 else matches[n])
+        else:
+            days = [dtstart.day]
+        return sorted({d for d in days if 1 <= d <= last})
+
+    def _period_dates(self, k: int, dtstart: datetime):
+        """(period start, sorted candidate datetimes) of the k-th month/year period"""
+        if self.freq == "MONTHLY":
+            total = dtstart.month - 1 + k * self.interval
+            months = [(dtstart.year + total // 12, total % 12 + 1)]
+            period_start = datetime(months[0][0], months[0][1], 1)
+        else:
+            year = dtstart.year + k * self.interval
+            # BYMONTHDAY without BYMONTH applies to every month of the year (RFC 5545)
+            month_numbers = self.bymonth or (range(1, 13) if self.bymonthday else [dtstart.month])
+            months = [(year, m) for m in month_numbers]
+            period_start = datetime(year, 1, 1)
+        dates = [
+            datetime(year, month, day, dtstart.hour, dtstart.minute, dtstart.second)
+            for year, month in months
+            for day in self._month_days(year, month, dtstart)
+        ]
+        if self.bysetpos:
+            dates = sorted({dates[p - 1] if p > 0 else dates[p]
+                            for p in self.bysetpos if p <= len(dates) and -p <= len(dates)})
+        return period_start, dates
+
+    def _monthly_by(self, dtstart, after, before):
+        """MONTHLY / YEARLY with BYDAY, BYMONTHDAY or BYMONTH"""
+        months = self.interval * (12 if self.freq == "YEARLY" else 1)
+        k = 0
+        if self.count is None and after > dtstart:
+            # Without COUNT, earlier periods don't matter: jump to the window
+            elapsed = (after.year - dtstart.year) * 12 + (after.month - dtstart.month)
+            k = max(0, elapsed // months - 1)
+        index = 0
+        while True:
+            period_start, dates = self._period_dates(k, dtstart)
+            if period_start >= before:
+                return
+            for when in dates:
+                if when < dtstart:
+                    continue
+                if when >= before or not self._within_limits(index, when):
+                    return
+                index += 1
+                if when >= after:
+                    yield when
+            k += 1
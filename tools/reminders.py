@@ -1,84 +1,60 @@
 """
 Reminders and Timers for Jarvis
+Pending reminders are kept by a single persistent scheduler (see tools/scheduler.py),
+so they survive restarts and can be listed or cancelled.
 """
 from langchain.tools import tool
-import threading
+import os
 import time
 import logging
-import platform
-import subprocess
+from datetime import datetime
 
+from tools.notifications import dispatcher
+from tools.scheduler import Scheduler
+from tools.time_parser import parse_when, next_fire, describe_schedule
 
-def play_alert_sound():
-    """Play a system alert sound"""
-    try:
-        system = platform.system()
-        if system == "Windows":
-            # Play Windows notification sound
-            import winsound
-            winsound.MessageBeep(winsound.MB_ICONASTERISK)
-        elif system == "Darwin":  # macOS
-            subprocess.run(["afplay", "/System/Library/Sounds/Glass.aiff"])
-        elif system == "Linux":
-            subprocess.run(["paplay", "/usr/share/sounds/freedesktop/stereo/complete.oga"])
-    except Exception as e:
-        logging.error(f"Alert sound error: {e}")
+REMINDERS_FILE = os.path.join(os.path.expanduser("~"), ".jarvis", "reminders.json")
+os.makedirs(os.path.dirname(REMINDERS_FILE), exist_ok=True)
 
 
-def show_notification(title: str, message: str):
-    """Show system notification"""
-    try:
-        system = platform.system()
-        if system == "Windows":
-            # Use PowerShell to show notification
-            ps_command = f"""
-[Windows.UI.Notifications.ToastNotificationManager, Windows.UI.Notifications, ContentType = WindowsRuntime] | Out-Null
-[Windows.Data.Xml.Dom.XmlDocument, Windows.Data.Xml.Dom.XmlDocument, ContentType = WindowsRuntime] | Out-Null
-
-$template = @"
-<toast>
-    <visual>
-        <binding template="ToastText02">
-            <text id="1">{title}</text>
-            <text id="2">{message}</text>
-        </binding>
-    </visual>
-</toast>
-"@
-
-$xml = New-Object Windows.Data.Xml.Dom.XmlDocument
-$xml.LoadXml($template)
-$toast = [Windows.UI.Notifications.ToastNotification]::new($xml)
-[Windows.UI.Notifications.ToastNotificationManager]::CreateToastNotifier("Jarvis").Show($toast)
-"""
-            subprocess.run(["powershell", "-Command", ps_command], 
-                         capture_output=True, 
-                         creationflags=subprocess.CREATE_NO_WINDOW if platform.system() == "Windows" else 0)
-        elif system == "Darwin":  # macOS
-            subprocess.run([
-                "osascript", "-e", 
-                f'display notification "{message}" with title "{title}"'
-            ])
-        elif system == "Linux":
-            subprocess.run(["notify-send", title, message])
-    except Exception as e:
-        logging.error(f"Notification error: {e}")
+def fire_job(job: dict):
+    """Alert for a due reminder or timer (called on the scheduler thread; only enqueues)"""
+    if job["kind"] == "timer":
+        title, text = "Jarvis Timer", f"{job['message']} completed!"
+    else:
+        title, text = "Jarvis Reminder", job["message"]
+    if job.get("missed"):
+        text += f" (missed at {datetime.fromtimestamp(job['due']).strftime('%H:%M')})"
+    dispatcher.notify(title, text)
+
+
+def next_job_due(job: dict, after: float):
+    """Next due time of a repeating reminder (None for one-off jobs)"""
+    schedule = job.get("schedule")
+    if not schedule or schedule["type"] == "once":
+        return None
+    return next_fire(schedule, after)
 
 
-def reminder_thread(message: str, minutes: int):
-    """Background thread for reminder"""
-    time.sleep(minutes * 60)
-    play_alert_sound()
-    show_notification("Jarvis Reminder", message)
-    logging.info(f"Reminder fired: {message}")
+# One timer thread for every pending reminder and timer; missed ones fire on start
+scheduler = Scheduler(REMINDERS_FILE, on_fire=fire_job, next_due=next_job_due)
+scheduler.start()
+dispatcher.start()
 
 
-def timer_thread(seconds: int, label: str = "Timer"):
-    """Background thread for timer"""
-    time.sleep(seconds)
-    play_alert_sound()
-    show_notification("Jarvis Timer", f"{label} completed!")
-    logging.info(f"Timer fired: {label}")
+def format_remaining(seconds: float) -> str:
+    """Human 'in 1h 5m' style countdown"""
+    seconds = max(0, int(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, _ = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
 
 
 @tool
@@ -101,20 +77,56 @@ def set_reminder(message: str, minutes: int) -> str:
     try:
         if minutes < 1:
             return "Reminder must be at least 1 minute"
-        if minutes > 1440:  # 24 hours
-            return "Reminder cannot be more than 24 hours"
         
-        # Start reminder in background thread
-        thread = threading.Thread(target=reminder_thread, args=(message, minutes), daemon=True)
-        thread.start()
+        job = scheduler.add(time.time() + minutes * 60, "reminder", message)
         
-        return f"Reminder set: '{message}' in {minutes} minute{'s' if minutes != 1 else ''}"
+        return f"Reminder set: '{message}' in {minutes} minute{'s' if minutes != 1 else ''} (#{job['id']})"
         
     except Exception as e:
         logging.error(f"Reminder error: {e}")
         return f"Failed to set reminder: {e}"
 
 
+def schedule_reminder(message: str, schedule: dict) -> str:
+    """Schedule a reminder from a parsed schedule; shared by set_reminder_at and direct voice/text routing"""
+    due = next_fire(schedule, time.time())
+    if due is None:
+        return "That time has no upcoming occurrence"
+    job = scheduler.add(due, "reminder", message, schedule=schedule)
+    at = datetime.fromtimestamp(due).strftime("%a %b %d at %H:%M")
+    if schedule["type"] == "once":
+        return f"Reminder set: '{message}' on {at} (#{job['id']})"
+    return f"Repeating reminder set: '{message}' {describe_schedule(schedule)}, next on {at} (#{job['id']})"
+
+
+@tool
+def set_reminder_at(message: str, when: str) -> str:
+    """
+    Set a reminder for an absolute or repeating time, described in plain words.
+    The time is parsed locally (no extra model call).
+    
+    Args:
+        message: Reminder message
+        when: When to remind, e.g. "at 3pm Friday", "tomorrow at 9:30", "nov 5 at 14:00",
+              "at 9am london time", "in 2 hours", "every weekday at 8:30",
+              "every monday and thursday at 6pm", "every 2 hours", or a cron string "0 9 * * 1-5"
+    
+    Examples:
+        - "Remind me at 3pm Friday to submit the report" → set_reminder_at("submit the report", "at 3pm Friday")
+        - "Remind me every weekday at 8:30 to stand up" → set_reminder_at("stand up", "every weekday at 8:30")
+    
+    Returns:
+        Confirmation message with the next time it will fire
+    """
+    try:
+        return schedule_reminder(message, parse_when(when))
+    except ValueError as e:
+        return f"Couldn't understand the time: {e}"
+    except Exception as e:
+        logging.error(f"Reminder error: {e}")
+        return f"Failed to set reminder: {e}"
+
+
 @tool
 def set_timer(minutes: int, label: str = "Timer") -> str:
     """
@@ -140,11 +152,9 @@ def set_timer(minutes: int, label: str = "Timer") -> str:
         
         seconds = minutes * 60
         
-        # Start timer in background thread
-        thread = threading.Thread(target=timer_thread, args=(seconds, label), daemon=True)
-        thread.start()
+        job = scheduler.add(time.time() + seconds, "timer", label)
         
-        return f"Timer set for {minutes} minute{'s' if minutes != 1 else ''}: {label}"
+        return f"Timer set for {minutes} minute{'s' if minutes != 1 else ''}: {label} (#{job['id']})"
         
     except Exception as e:
         logging.error(f"Timer error: {e}")
@@ -172,12 +182,80 @@ def quick_timer(seconds: int) -> str:
         if seconds > 300:  # 5 minutes
             return "For timers over 5 minutes, use set_timer with minutes"
         
-        # Start timer in background thread
-        thread = threading.Thread(target=timer_thread, args=(seconds, f"{seconds}s timer"), daemon=True)
-        thread.start()
+        job = scheduler.add(time.time() + seconds, "timer", f"{seconds}s timer")
         
-        return f"Timer set for {seconds} second{'s' if seconds != 1 else ''}"
+        return f"Timer set for {seconds} second{'s' if seconds != 1 else ''} (#{job['id']})"
         
     except Exception as e:
         logging.error(f"Timer error: {e}")
         return f"Failed to set timer: {e}"
+
+
+@tool
+def list_reminders() -> str:
+    """
+    List pending reminders and timers, soonest first.
+    
+    Examples:
+        - "What reminders do I have?"
+        - "Show my timers"
+    
+    Returns:
+        Pending reminders with their ids and time left
+    """
+    try:
+        jobs = scheduler.pending()
+        if not jobs:
+            return "No pending reminders or timers"
+        
+        now = time.time()
+        lines = [
+            f"• #{job['id']} {job['kind']}: {job['message']} - "
+            f"{datetime.fromtimestamp(job['due']).strftime('%a %H:%M')} (in {format_remaining(job['due'] - now)})"
+            + (f" 🔁 {describe_schedule(job['schedule'])}" if next_job_due(job, job["due"]) else "")
+            for job in jobs[:20]
+        ]
+        if len(jobs) > 20:
+            lines.append(f"... and {len(jobs) - 20} more")
+        return f"⏰ Pending ({len(jobs)}):\n" + "\n".join(lines)
+        
+    except Exception as e:
+        logging.error(f"Reminder list error: {e}")
+        return f"Failed to list reminders: {e}"
+
+
+@tool
+def cancel_reminder(reminder: str) -> str:
+    """
+    Cancel a pending reminder or timer.
+    
+    Args:
+        reminder: The reminder id (e.g. "3" or "#3") or part of its message
+    
+    Examples:
+        - "Cancel reminder 3"
+        - "Cancel the pizza timer"
+    
+    Returns:
+        Confirmation message
+    """
+    try:
+        key = reminder.strip().lstrip("#")
+        job = scheduler.cancel(key)
+        if job is None:
+            matches = [j for j in scheduler.pending() if key.lower() in j["message"].lower()]
+            exact = [j for j in matches if j["message"].lower() == key.lower()]
+            matches = exact or matches
+            if len(matches) > 1:
+                options = ", ".join(f"#{j['id']} {j['message']}" for j in matches[:5])
+                return f"Several reminders match '{reminder}': {options}. Which one?"
+            if matches:
+                job = scheduler.cancel(matches[0]["id"])
+        
+        if job is None:
+            return f"No pending reminder matching '{reminder}'"
+        return f"Cancelled {job['kind']} #{job['id']}: {job['message']}"
+        
+    except Exception as e:
+        logging.error(f"Reminder cancel error: {e}")
+        return f"Failed to cancel reminder: {e}"
@@ -0,0 +1,243 @@
+"""
+Persistent scheduler for Jarvis reminders and timers
+One background thread sleeps until the earliest due job (a min-heap of due
+times), so any number of pending jobs costs a single thread. Jobs are saved
+to a JSON file under ~/.jarvis and reloaded on start; jobs that came due
+while Jarvis was not running fire immediately, marked as missed.
+Repeating jobs are moved to their next due time (and saved) before they fire,
+so a crash or a cancel while firing never loses or revives them.
+Text and voice mode may run at the same time: the file is re-read whenever
+another process changed it, every change (add, cancel, firing) re-reads and
+saves it under the short <file>.write.lock, and only the process holding the
+<file>.lock lock fires jobs (another one takes over when it exits).
+"""
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from tools.storage import atomic_write_json, file_lock, file_signature, try_lock_file
+
+# Wake up at least this often so wall-clock changes and sleep/resume are noticed
+MAX_WAIT_SECONDS = 60
+
+
+class Scheduler:
+    """Min-heap scheduler with one timer thread and JSON persistence"""
+
+    def __init__(self, path: str, on_fire=None, next_due=None):
+        """
+        Args:
+            path: JSON file the pending jobs are saved to
+            on_fire: Called with the job dict when a job comes due
+            next_due: Called as next_due(job, after) after a job fires; returns the
+                      next due time for repeating jobs, or None to finish the job
+        """
+        self.path = path
+        self.on_fire = on_fire
+        self.next_due = next_due
+        self._cond = threading.Condition()
+        self._jobs = {}
+        self._heap = []  # (due, tiebreak, job_id); cancelled/rescheduled entries are dropped lazily
+        self._counter = itertools.count()
+        self._next_id = 1
+        self._signature = None
+        self._owner_lock = None  # Held while this process is the one firing jobs
+        self._write_lock = path + ".write.lock"  # Held around each read-modify-write of the file
+        self._thread = None
+        self._stopping = False
+
+    # ---------- persistence ----------
+
+    def _load(self):
+        """Replace the in-memory jobs with the saved ones (the file is the source of truth)"""
+        signature = file_signature(self.path)
+        if signature is None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logging.error(f"Scheduler load error: {e}")
+            return
+        self._jobs = {job["id"]: job for job in data.get("jobs", [])}
+        self._heap = [(job["due"], next(self._counter), job["id"]) for job in self._jobs.values()]
+        heapq.heapify(self._heap)
+        self._next_id = max(int(data.get("next_id", 1)), self._next_id)
+        self._signature = signature
+
+    def _ensure_fresh(self):
+        """Pick up jobs another Jarvis process added, cancelled or fired"""
+        if file_signature(self.path) != self._signature:
+            self._load()
+
+    def _save(self):
+        try:
+            jobs = sorted(self._jobs.values(), key=lambda job: job["due"])
+            atomic_write_json(self.path, {"next_id": self._next_id, "jobs": jobs}, indent=None)
+            self._signature = file_signature(self.path)
+        except Exception as e:
+            logging.error(f"Scheduler save error: {e}")
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        """Load saved jobs and start the timer thread (idempotent)"""
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._load()
+            missed = [job for job in self._jobs.values() if job["due"] <= time.time()]
+            for job in missed:
+                job["missed"] = True
+            if missed:
+                logging.info(f"⏰ Catching up on {len(missed)} reminder(s) missed while offline")
+            self._thread = threading.Thread(target=self._run, name="jarvis-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._owner_lock:
+            self._owner_lock.close()
+            self._owner_lock = None
+
+    def _owns_firing(self) -> bool:
+        """True once this process holds the lock that makes it the only one firing jobs"""
+        if self._owner_lock is None:
+            try:
+                self._owner_lock = try_lock_file(self.path + ".lock")
+            except OSError as e:
+                logging.error(f"Scheduler lock error: {e}")
+        return self._owner_lock is not None
+
+    # ---------- jobs ----------
+
+    def add(self, due: float, kind: str, message: str, **extra) -> dict:
+        """
+        Schedule a job.
+
+        Args:
+            due: Unix timestamp to fire at
+            kind: "reminder" or "timer"
+            message: Text shown when it fires
+            extra: Additional fields stored with the job
+
+        Returns:
+            The stored job (with its id)
+        """
+        with self._cond, file_lock(self._write_lock):
+            self._ensure_fresh()
+            job = {
+                "id": str(self._next_id),
+                "kind": kind,
+                "message": message,
+                "due": float(due),
+                "created_at": datetime.now().isoformat(),
+                **extra,
+            }
+            self._next_id += 1
+            self._jobs[job["id"]] = job
+            heapq.heappush(self._heap, (job["due"], next(self._counter), job["id"]))
+            self._save()
+            # Wake the timer thread in case this job is now the earliest
+            self._cond.notify()
+            return job
+
+    def cancel(self, job_id: str):
+        """Cancel a pending job; returns the removed job or None"""
+        with self._cond, file_lock(self._write_lock):
+            self._ensure_fresh()
+            job = self._jobs.pop(str(job_id), None)
+            if job is None:
+                return None
+            self._save()
+            # Its heap entry is skipped when it reaches the top; rebuild if stale entries dominate
+            if len(self._heap) > 64 and len(self._heap) > 2 * len(self._jobs):
+                self._heap = [entry for entry in self._heap if self._is_live(entry)]
+                heapq.heapify(self._heap)
+            self._cond.notify()
+            return job
+
+    def pending(self) -> list:
+        """Pending jobs, soonest first"""
+        with self._cond:
+            self._ensure_fresh()
+            return sorted((dict(job) for job in self._jobs.values()), key=lambda job: job["due"])
+
+    def __len__(self):
+        with self._cond:
+            self._ensure_fresh()
+            return len(self._jobs)
+
+    def _advance(self, job: dict):
+        """Move a due job to its next occurrence, or drop it if it does not repeat"""
+        due = None
+        if self.next_due:
+            try:
+                # From the later of the old due time and now, so a missed repeat fires once, not N times
+                due = self.next_due(job, max(job["due"], time.time()))
+            except Exception as e:
+                logging.error(f"Scheduler could not reschedule job {job['id']}: {e}")
+        if due is None:
+            del self._jobs[job["id"]]
+            return
+        following = dict(job, due=float(due))
+        following.pop("missed", None)
+        self._jobs[job["id"]] = following
+        heapq.heappush(self._heap, (following["due"], next(self._counter), job["id"]))
+
+    # ---------- timer thread ----------
+
+    def _is_live(self, entry) -> bool:
+        job = self._jobs.get(entry[2])
+        return job is not None and job["due"] == entry[0]
+
+    def _next_due_job(self):
+        """Block until a job is due (or stop); returns it, already advanced and saved"""
+        with self._cond:
+            while not self._stopping:
+                self._ensure_fresh()
+                while self._heap and not self._is_live(self._heap[0]):
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, job_id = self._heap[0]
+                delay = due - time.time()
+                if delay <= 0 and not self._owns_firing():
+                    # Another Jarvis process fires it; check again in case that one exits
+                    self._cond.wait(MAX_WAIT_SECONDS)
+                    continue
+                if delay <= 0:
+                    with file_lock(self._write_lock):
+                        self._ensure_fresh()
+                        if not self._heap or self._heap[0][2] != job_id or not self._is_live(self._heap[0]):
+                            continue  # Changed by another process meanwhile: look again
+                        heapq.heappop(self._heap)
+                        job = self._jobs[job_id]
+                        # Persist the next occurrence first: a crash or cancel during on_fire keeps it right
+                        self._advance(job)
+                        self._save()
+                    return job
+                self._cond.wait(min(delay, MAX_WAIT_SECONDS))
+            return None
+
+    def _run(self):
+        while True:
+            job = self._next_due_job()
+            if job is None:
+                return
+            try:
+                if self.on_fire:
+                    self.on_fire(job)
+                logging.info(f"{job['kind'].capitalize()} fired: {job['message']}")
+            except Exception as e:
+                logging.error(f"Scheduler job {job['id']} error: {e}")
@@ -0,0 +1,96 @@
+"""
+Shared file helpers for Jarvis tool storage under ~/.jarvis
+"""
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_writer(path: str, newline: str = None, binary: bool = False):
+    """
+    Open a temp file next to path for streaming writes; it replaces path only
+    if the block finishes, so readers never see a partial file.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.basename(path))
+    try:
+        f = os.fdopen(fd, "wb") if binary else os.fdopen(fd, "w", encoding="utf-8", newline=newline)
+        with f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path: str, text: str):
+    """Write a file via temp file + rename so readers never see a partial file"""
+    with atomic_writer(path) as f:
+        f.write(text)
+
+
+def atomic_write_json(path: str, data, indent: int = 2):
+    """Serialize data to JSON and write it atomically"""
+    atomic_write_text(path, json.dumps(data, indent=indent, ensure_ascii=False))
+
+
+def file_signature(path: str):
+    """(mtime_ns, size) of a file, or None if missing - used to detect outside changes"""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return None
+
+
+def _lock(f, blocking: bool):
+    if sys.platform == "win32":
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _unlock(f):
+    if sys.platform == "win32":
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def try_lock_file(path: str):
+    """
+    Take an exclusive lock on path without blocking, held until the returned file is
+    closed (or the process exits). Returns the open file, or None if another process holds it.
+    """
+    f = open(path, "a+")
+    try:
+        _lock(f, blocking=False)
+        return f
+    except OSError:
+        f.close()
+        return None
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock on path for the duration of the block, waiting for other processes"""
+    with open(path, "a+") as f:
+        _lock(f, blocking=True)
+        try:
+            yield
+        finally:
+            _unlock(f)
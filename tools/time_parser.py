@@ -0,0 +1,437 @@
+"""
+Deterministic natural-language time parsing for Jarvis reminders
+Turns phrases like "in 20 minutes", "at 3pm Friday", "tomorrow at 9:30 london time",
+"every weekday at 8:30", "every 2 hours" or a cron string ("0 9 * * 1-5")
+into a schedule dict the reminder scheduler can store and advance, without an
+LLM round-trip. City names come from the tools/time.py timezone table.
+A bare hour ("at 3") is the next one to come - 3pm if it is past 3am - and
+"tonight" / "this evening" make it pm.
+
+Schedules (JSON-serializable):
+    {"type": "once", "at": <unix time>}
+    {"type": "interval", "every": <seconds>, "start": <unix time>}
+    {"type": "cron", "expr": "<min> <hour> <dom> <month> <dow>", "tz": <zone or None>}
+"""
+import bisect
+import re
+from datetime import datetime, timedelta
+
+import pytz
+
+from tools.time import CITY_TIMEZONES
+
+WEEKDAY_NAMES = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3, "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+MONTH_NAMES = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+    "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8,
+    "september": 9, "sep": 9, "sept": 9, "october": 10, "oct": 10, "november": 11, "nov": 11,
+    "december": 12, "dec": 12,
+}
+UNIT_SECONDS = {
+    "second": 1, "sec": 1, "minute": 60, "min": 60, "hour": 3600, "hr": 3600,
+    "day": 86400, "week": 604800,
+}
+PARTS_OF_DAY = {"morning": (9, 0), "noon": (12, 0), "afternoon": (15, 0), "evening": (18, 0),
+                "tonight": (20, 0), "night": (21, 0), "midnight": (0, 0)}
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+                "ten": 10, "fifteen": 15, "twenty": 20, "thirty": 30, "forty five": 45, "half an": 0.5}
+DEFAULT_TIME = (9, 0)
+
+_WEEKDAY_RE = "|".join(sorted(WEEKDAY_NAMES, key=len, reverse=True))
+_MONTH_RE = "|".join(sorted(MONTH_NAMES, key=len, reverse=True))
+_UNIT_RE = r"(second|sec|minute|min|hour|hr|day|week)s?"
+_NUMBER_RE = r"(\d+(?:\.\d+)?|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True)) + ")"
+CRON_RE = re.compile(r"^[\d*/,\-]+(\s+[\d*/,\-a-z]+){4}$")
+# Words that make a bare hour ("at 9 tonight", "this evening at 7") mean pm
+PM_HINT_RE = re.compile(r"\b(tonight|this evening|in the evening|at night)\b")
+TIME_RE = re.compile(r"\b(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)|\b(?:at\s+)?(\d{1,2}):(\d{2})\b|\bat\s+(\d{1,2})\b")
+
+
+# ---------- cron ----------
+
+class CronExpr:
+    """Five-field cron expression (minute hour day-of-month month day-of-week, Sunday = 0)"""
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expr: str):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron needs 5 fields: '{expr}'")
+        parsed = [self._field(text, lo, hi) for text, (lo, hi) in zip(fields, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, dows = parsed
+        self.dows = sorted({d % 7 for d in dows})
+        self.any_day = fields[2] == "*"
+        self.any_dow = fields[4] == "*"
+        self.expr = expr
+
+    @staticmethod
+    def _field(text: str, lo: int, hi: int) -> list:
+        names = dict(MONTH_NAMES) if hi == 12 else {k: (v + 1) % 7 for k, v in WEEKDAY_NAMES.items()} if hi == 7 else {}
+        values = set()
+        for part in text.lower().split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+            if part == "*":
+                start, end = lo, hi
+            elif "-" in part:
+                a, b = part.split("-", 1)
+                start, end = int(names.get(a, a)), int(names.get(b, b))
+            else:
+                start = int(names.get(part, part))
+                end = hi if step > 1 else start
+            if start < lo or end > hi or start > end or step < 1:
+                raise ValueError(f"Cron field '{text}' out of range {lo}-{hi}")
+            values.update(range(start, end + 1, step))
+        return sorted(values)
+
+    def _day_matches(self, t: datetime) -> bool:
+        dom = t.day in self.days
+        dow = (t.weekday() + 1) % 7 in self.dows
+        if self.any_day and self.any_dow:
+            return True
+        if self.any_day:
+            return dow
+        if self.any_dow:
+            return dom
+        return dom or dow  # both restricted: either matches, as in cron
+
+    def next_after(self, after: datetime):
+        """First matching wall-clock minute strictly after `after`, or None within 5 years"""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = after.year + 5
+        while t.year <= limit:
+            if t.month not in self.months:
+                i = bisect.bisect_right(self.months, t.month)
+                t = datetime(t.year, self.months[i], 1) if i < len(self.months) else datetime(t.year + 1, self.months[0], 1)
+                continue
+            if not self._day_matches(t):
+                t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+                continue
+            if t.hour not in self.hours:
+                i = bisect.bisect_right(self.hours, t.hour)
+                if i < len(self.hours):
+                    t = t.replace(hour=self.hours[i], minute=0)
+                else:
+                    t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+                continue
+            if t.minute not in self.minutes:
+                i = bisect.bisect_right(self.minutes, t.minute)
+                if i < len(self.minutes):
+                    t = t.replace(minute=self.minutes[i])
+                else:
+                    t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            return t
+        return None
+
+
+# ---------- schedules ----------
+
+def _to_timestamp(wall: datetime, tz_name: str = None) -> float:
+    if tz_name:
+        return pytz.timezone(tz_name).localize(wall).timestamp()
+    return wall.timestamp()
+
+
+def _to_wall(ts: float, tz_name: str = None) -> datetime:
+    if tz_name:
+        return datetime.fromtimestamp(ts, pytz.timezone(tz_name)).replace(tzinfo=None)
+    return datetime.fromtimestamp(ts)
+
+
+def next_fire(schedule: dict, after: float):
+    """
+    Next fire time strictly after `after` (unix time), or None when the schedule is finished.
+    Computed from the previous fire time, so cost does not grow with how often it has fired.
+    """
+    kind = schedule["type"]
+    if kind == "once":
+        return schedule["at"] if schedule["at"] > after else None
+    if kind == "interval":
+        start, every = schedule["start"], schedule["every"]
+        if after < start:
+            return start
+        return start + (int((after - start) // every) + 1) * every
+    if kind == "cron":
+        wall = CronExpr(schedule["expr"]).next_after(_to_wall(after, schedule.get("tz")))
+        return _to_timestamp(wall, schedule.get("tz")) if wall else None
+    raise ValueError(f"Unknown schedule type '{kind}'")
+
+
+def describe_schedule(schedule: dict) -> str:
+    """Short description such as 'every weekday at 08:30'"""
+    kind = schedule["type"]
+    if kind == "once":
+        return datetime.fromtimestamp(schedule["at"]).strftime("%a %b %d at %H:%M")
+    if kind == "interval":
+        every = schedule["every"]
+        for unit, size in (("week", 604800), ("day", 86400), ("hour", 3600), ("minute", 60)):
+            if every % size == 0:
+                count = every // size
+                return f"every {unit}" if count == 1 else f"every {int(count)} {unit}s"
+        return f"every {int(every)} seconds"
+    cron = CronExpr(schedule["expr"])
+    fields = schedule["expr"].split()
+    at = f"at {cron.hours[0]:02d}:{cron.minutes[0]:02d}" if len(cron.hours) == 1 and len(cron.minutes) == 1 else f"({schedule['expr']})"
+    names = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+    if fields[2:] == ["*", "*", "*"]:
+        text = f"every day {at}"
+    elif fields[2:4] == ["*", "*"] and cron.dows == [1, 2, 3, 4, 5]:
+        text = f"every weekday {at}"
+    elif fields[2:4] == ["*", "*"]:
+        text = "every " + ", ".join(names[d] for d in cron.dows) + f" {at}"
+    elif fields[3:] == ["*", "*"] and len(cron.days) == 1:
+        text = f"monthly on day {cron.days[0]} {at}"
+    else:
+        text = f"cron {schedule['expr']}"
+    return text + (f" ({schedule['tz']})" if schedule.get("tz") else "")
+
+
+# ---------- parsing ----------
+
+def _normalize(text: str) -> str:
+    text = text.lower().strip()
+    text = re.sub(r"[?!]+$", "", text)
+    text = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", text)
+    return re.sub(r"\s+", " ", text.replace(",", " ")).strip(" .")
+
+
+def _extract_timezone(text: str):
+    """Remove a 'london time' / 'in tokyo' / 'utc' suffix; returns (text, tz_name)"""
+    for zone in ("utc", "gmt"):
+        match = re.search(rf"\b{zone}\b", text)
+        if match:
+            return (text[:match.start()] + text[match.end():]).strip(), "UTC"
+    for city in sorted(CITY_TIMEZONES, key=len, reverse=True):
+        match = re.search(rf"\b(?:in\s+)?{re.escape(city)}(?:\s+time)?\b", text)
+        if match:
+            return (text[:match.start()] + text[match.end():]).strip(), CITY_TIMEZONES[city]
+    return text, None
+
+
+def _number(word: str) -> float:
+    return NUMBER_WORDS[word] if word in NUMBER_WORDS else float(word)
+
+
+def _extract_time(text: str):
+    """
+    Remove a time of day from text; returns (text, (hour, minute) or None, ambiguous).
+    ambiguous: a bare hour 1-11 without am/pm or a pm word, which may mean either
+    """
+    match = TIME_RE.search(text)
+    if match:
+        ambiguous = False
+        if match.group(1):
+            hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)[0]
+            if hour > 12:
+                raise ValueError(f"'{match.group(0)}' is not a valid time")
+            hour = hour % 12 + (12 if meridiem == "p" else 0)
+        else:
+            if match.group(4):
+                hour, minute = int(match.group(4)), int(match.group(5))
+            else:
+                hour, minute = int(match.group(6)), 0
+            if 1 <= hour <= 11:
+                if PM_HINT_RE.search(text):
+                    hour += 12
+                else:
+                    ambiguous = True
+        if hour > 23 or minute > 59:
+            raise ValueError(f"'{match.group(0)}' is not a valid time")
+        text = (text[:match.start()] + text[match.end():]).strip()
+        # "tonight" / "this evening" also name the day; the other pm words only the time
+        text = re.sub(r"\b(tonight|this evening)\b", "today", text)
+        text = re.sub(r"\b(in the evening|at night)\b", "", text).strip()
+        return text, (hour, minute), ambiguous
+    for word, hm in PARTS_OF_DAY.items():
+        match = re.search(rf"\b(?:at |in the |this )?{word}\b", text)
+        if match:
+            keep = "today " if word == "tonight" else ""
+            return (text[:match.start()] + keep + text[match.end():]).strip(), hm, False
+    return text, None, False
+
+
+def _parse_date(text: str, today: datetime):
+    """Date mentioned in text (None if there is none); raises ValueError on leftovers"""
+    text = re.sub(r"\b(on|the|of|this|at)\b", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    if not text or text == "today":
+        return None if not text else today
+    if text == "tomorrow":
+        return today + timedelta(days=1)
+    if text in ("day after tomorrow", "the day after tomorrow"):
+        return today + timedelta(days=2)
+
+    match = re.fullmatch(r"(next )?(" + _WEEKDAY_RE + ")", text)
+    if match:
+        ahead = (WEEKDAY_NAMES[match.group(2)] - today.weekday()) % 7
+        if match.group(1) and ahead == 0:
+            ahead = 7
+        return today + timedelta(days=ahead)
+
+    match = re.fullmatch(r"(\d{4})-(\d{1,2})-(\d{1,2})", text)
+    if match:
+        return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+    match = re.fullmatch(r"(" + _MONTH_RE + r") (\d{1,2})(?: (\d{4}))?", text) or \
+        re.fullmatch(r"(\d{1,2}) (" + _MONTH_RE + r")(?: (\d{4}))?", text)
+    if match:
+        a, b, year = match.groups()
+        month, day = (MONTH_NAMES[a], int(b)) if a in MONTH_NAMES else (MONTH_NAMES[b], int(a))
+        return datetime(int(year) if year else today.year, month, day), not year
+
+    match = re.fullmatch(r"(\d{1,2})", text)
+    if match:
+        return datetime(today.year, today.month, int(match.group(1))), "month"
+
+    raise ValueError(f"I couldn't understand the time '{text}'")
+
+
+def _parse_recurring(text: str, now: datetime, tz_name: str):
+    text, hm, _ = _extract_time(text)
+    hour, minute = hm or DEFAULT_TIME
+    text = re.sub(r"^(every|each)\s+", "", text).strip()
+    text = re.sub(r"\b(on|at|the|of)\b", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+
+    match = re.fullmatch(_NUMBER_RE + r"? ?" + _UNIT_RE, text)
+    if match and (match.group(1) or match.group(2) in ("second", "sec", "minute", "min", "hour", "hr")):
+        count = _number(match.group(1)) if match.group(1) else 1
+        every = int(count * UNIT_SECONDS[match.group(2)])
+        if every < 60:
+            raise ValueError("Repeating reminders must be at least a minute apart")
+        if UNIT_SECONDS[match.group(2)] >= 86400:
+            # Every N days/weeks: anchored at the first occurrence of the requested time
+            first = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if first <= now:
+                first += timedelta(days=1)
+            return {"type": "interval", "every": every, "start": _to_timestamp(first, tz_name)}
+        return {"type": "interval", "every": every, "start": now.timestamp() + every}
+    if text in ("hourly",):
+        return {"type": "interval", "every": 3600, "start": now.timestamp() + 3600}
+
+    if text in ("", "day", "daily", "today"):
+        dom, dow = "*", "*"
+    elif text in ("weekday", "weekdays", "workday", "workdays"):
+        dom, dow = "*", "1-5"
+    elif text in ("weekend", "weekends"):
+        dom, dow = "*", "0,6"
+    elif text in ("week", "weekly"):
+        dom, dow = "*", str((now.weekday() + 1) % 7)
+    elif re.fullmatch(r"(month|monthly)( \d{1,2})?", text):
+        day = re.search(r"\d{1,2}", text)
+        dom, dow = (day.group(0) if day else str(now.day)), "*"
+    elif re.fullmatch(r"(month|monthly) (last day|end)", text):
+        raise ValueError("'last day of the month' is not supported; use a day number")
+    else:
+        days = [w for w in re.split(r" and | ", text.replace("weekly", "").strip()) if w]
+        days = [w[:-1] if w.endswith("s") and w[:-1] in WEEKDAY_NAMES else w for w in days]
+        if not days or any(w not in WEEKDAY_NAMES for w in days):
+            raise ValueError(f"I couldn't understand the repeat '{text}'")
+        dom, dow = "*", ",".join(str((WEEKDAY_NAMES[w] + 1) % 7) for w in days)
+    return {"type": "cron", "expr": f"{minute} {hour} {dom} * {dow}", "tz": tz_name}
+
+
+def parse_when(text: str, now: datetime = None) -> dict:
+    """
+    Parse a natural-language time into a schedule dict.
+
+    Raises:
+        ValueError: if the phrase cannot be understood
+    """
+    now = now or datetime.now()
+    raw = re.sub(r"^cron\s+", "", (text or "").strip().lower())
+    if CRON_RE.match(raw):
+        CronExpr(raw)
+        return {"type": "cron", "expr": raw, "tz": None}
+
+    text = _normalize(text or "")
+    if not text:
+        raise ValueError("No time given")
+
+    text, tz_name = _extract_timezone(text)
+    local_now = _to_wall(now.timestamp(), tz_name) if tz_name else now
+
+    if re.match(r"^(every|each|daily|weekly|monthly|hourly|weekdays)\b", text):
+        return _parse_recurring(text, local_now, tz_name)
+
+    # Relative: "in 10 minutes", "in an hour and a half", "in 1 hour 30 minutes"
+    match = re.fullmatch(r"(?:in |after )?((?:" + _NUMBER_RE + r" ?" + _UNIT_RE + r"(?: and| )?\s*)+)(?: and a half)?(?: from now)?", text)
+    if match and (text.startswith(("in ", "after ")) or "from now" in text):
+        seconds = sum(_number(n) * UNIT_SECONDS[u] for n, u in re.findall(_NUMBER_RE + r" ?" + _UNIT_RE, match.group(1)))
+        if text.endswith("and a half"):
+            last_unit = re.findall(_UNIT_RE, match.group(1))[-1]
+            seconds += UNIT_SECONDS[last_unit] / 2
+        return {"type": "once", "at": now.timestamp() + seconds}
+
+    text, hm, ambiguous = _extract_time(text)
+    today = local_now.replace(hour=0, minute=0, second=0, microsecond=0)
+    date = _parse_date(text, today)
+    roll = None
+    if isinstance(date, tuple):
+        date, roll = date
+    if date is None and hm is None:
+        raise ValueError(f"I couldn't understand the time '{text}'")
+
+    hour, minute = hm or DEFAULT_TIME
+    when = (date or today).replace(hour=hour, minute=minute)
+    if ambiguous and when <= local_now and (date is None or date == today):
+        # "at 3" said after 3am means 3pm if that is still ahead
+        later = when + timedelta(hours=12)
+        if later > local_now:
+            when = later
+    if when <= local_now:
+        # A bare time, "the 15th" or "nov 5" that already passed means the next one
+        if date is None:
+            when += timedelta(days=1)
+        elif roll is True:
+            when = when.replace(year=when.year + 1)
+        elif roll == "month":
+            when = (when.replace(day=1) + timedelta(days=32)).replace(day=when.day)
+        elif (when.date() == today.date()) and re.search(_WEEKDAY_RE, text):
+            when += timedelta(days=7)
+        else:
+            raise ValueError(f"{when.strftime('%Y-%m-%d %H:%M')} is in the past")
+    return {"type": "once", "at": _to_timestamp(when, tz_name)}
+
+
+_SPLIT_WORDS = r"\b(in|at|on|every|each|tomorrow|today|tonight|next|this|daily|weekly|monthly|hourly|noon|midnight|" + _WEEKDAY_RE + r"|\d{1,2}(?::\d{2})?\s*(?:am|pm))\b"
+
+
+def parse_reminder_request(text: str, now: datetime = None):
+    """
+    Split "remind me to call mom tomorrow at 5pm" / "remind me every monday at 9 to ..."
+    into (message, schedule). Returns None if text is not a reminder request or has no time.
+    """
+    match = re.search(r"\bremind me\b\s*(.*)", text.strip(), re.IGNORECASE)
+    if not match:
+        return None
+    body = match.group(1).strip(" .?!")
+
+    # Time first: "remind me at 5pm to call mom"
+    if not re.match(r"(to|about|that)\b", body, re.IGNORECASE):
+        split = re.match(r"(.+?)\s+(?:to|about|that)\s+(.+)", body, re.IGNORECASE)
+        if split:
+            try:
+                return split.group(2), parse_when(split.group(1), now)
+            except ValueError:
+                pass
+
+    # Message first: try each candidate start of the time phrase, left to right
+    body = re.sub(r"^(to|about|that)\s+", "", body, flags=re.IGNORECASE)
+    for candidate in re.finditer(_SPLIT_WORDS, body, re.IGNORECASE):
+        message = body[:candidate.start()].strip()
+        if not message:
+            continue
+        try:
+            return message, parse_when(body[candidate.start():], now)
+        except (ValueError, OverflowError):
+            continue
+    return None
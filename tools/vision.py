@@ -28,7 +28,7 @@ def analyze_screen(question: str = "What do you see on the screen?") -> str:
         - "What app am I using?" → analyze_screen("What application is open?")
     """
     if not vision.available:
-        return "Vision system is not available. Please check VISION_URL environment variable."
+        return "Vision system is not available. Please check VISION_URL and that the vision server is running."
     
     logging.info(f"🔧 Tool: analyze_screen('{question}')")
     result = vision.analyze_screen(question)
@@ -54,7 +54,7 @@ def analyze_camera(question: str = "What do you see?") -> str:
         - "Look at me" → analyze_camera("Describe what you see")
     """
     if not vision.available:
-        return "Vision system is not available. Please check VISION_URL environment variable."
+        return "Vision system is not available. Please check VISION_URL and that the vision server is running."
     
     logging.info(f"🔧 Tool: analyze_camera('{question}')")
     result = vision.analyze_camera(question)
@@ -79,7 +79,7 @@ def analyze_image(image_path: str, question: str = "What's in this image?") -> s
         - "Describe screenshot.png" → analyze_image("screenshot.png", "Describe this image")
     """
     if not vision.available:
-        return "Vision system is not available. Please check VISION_URL environment variable."
+        return "Vision system is not available. Please check VISION_URL and that the vision server is running."
     
     logging.info(f"🔧 Tool: analyze_image('{image_path}', '{question}')")
     result = vision.analyze_image_file(image_path, question)
@@ -6,11 +6,16 @@ import logging
 import requests
 import base64
 import os
+import time
 from PIL import ImageGrab, Image
 import io
 import cv2
 import numpy as np
 
+from main.health import HEALTH_TIMEOUT_SECONDS, backend_down, get_monitor
+
+VISION_TIMEOUT_SECONDS = 60
+
 
 class RemoteVision:
     def __init__(self, server_url: str = None):
@@ -22,22 +27,62 @@ class RemoteVision:
                        Falls back to env var VISION_URL
         """
         self.server_url = server_url or os.getenv("VISION_URL")
-        self.available = self._check_server()
-        
-    def _check_server(self) -> bool:
-        """Check if vision server is reachable"""
-        if not self.server_url:
+        if self.server_url:
+            self.server_url = self.server_url.rstrip('/')
+            # Shared background /health probe + circuit breaker (main/health.py)
+            self.monitor = get_monitor(f"{self.server_url}/health", name="Remote vision")
+        else:
             logging.warning("⚠️ VISION_URL not set")
+            self.monitor = None
+    
+    @property
+    def available(self) -> bool:
+        """Vision server configured and not known to be down (re-evaluated on every call)"""
+        if self.monitor is None:
             return False
+        if self.monitor.online is None:
+            # Right after startup: give the first probe a moment
+            self.monitor.wait_checked(HEALTH_TIMEOUT_SECONDS + 1)
+        return self.monitor.available
+    
+    def _ask(self, img_bytes: bytes, question: str) -> str:
+        """Send an image to the vision API, failing fast while the server is down"""
+        if self.monitor is None or not self.monitor.allow():
+            return "Vision system unavailable"
+        
+        # Encode to base64
+        img_base64 = base64.b64encode(img_bytes).decode('utf-8')
+        
+        # Send to vision API
+        logging.info("👁️ Analyzing with AI vision...")
+        headers = {"ngrok-skip-browser-warning": "true"}
+        started = time.perf_counter()
         try:
-            headers = {"ngrok-skip-browser-warning": "true"}
-            r = requests.get(f"{self.server_url}/health", headers=headers, timeout=5)
-            if r.status_code == 200:
-                logging.info("✅ Remote Vision connected")
-                return True
-        except Exception as e:
-            logging.warning(f"⚠️ Remote Vision unavailable: {e}")
-        return False
+            response = requests.post(
+                f"{self.server_url}/vision",
+                json={
+                    "image": img_base64,
+                    "question": question
+                },
+                headers=headers,
+                timeout=VISION_TIMEOUT_SECONDS
+            )
+        except requests.RequestException:
+            self.monitor.report_failure()
+            raise
+        
+        if backend_down(response):
+            self.monitor.report_failure()
+        else:
+            self.monitor.report_success(time.perf_counter() - started)
+        
+        if response.status_code == 200:
+            result = response.json()
+            answer = result.get('answer', 'No response')
+            logging.info("✅ Vision analysis complete")
+            return answer
+        logging.error(f"❌ Vision failed: {response.status_code}")
+        return "Vision analysis failed"
     
     def capture_screenshot(self) -> bytes:
         """Capture current screen and return as bytes"""
@@ -107,30 +152,7 @@ class RemoteVision:
             if not img_bytes:
                 return "Failed to capture screen"
             
-            # Encode to base64
-            img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-            
-            # Send to vision API
-            logging.info("👁️ Analyzing with AI vision...")
-            headers = {"ngrok-skip-browser-warning": "true"}
-            response = requests.post(
-                f"{self.server_url}/vision",
-                json={
-                    "image": img_base64,
-                    "question": question
-                },
-                headers=headers,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                answer = result.get('answer', 'No response')
-                logging.info("✅ Vision analysis complete")
-                return answer
-            else:
-                logging.error(f"❌ Vision failed: {response.status_code}")
-                return "Vision analysis failed"
+            return self._ask(img_bytes, question)
                 
         except Exception as e:
             logging.error(f"❌ Vision error: {e}")
@@ -156,30 +178,7 @@ class RemoteVision:
             if not img_bytes:
                 return "Failed to capture from camera"
             
-            # Encode to base64
-            img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-            
-            # Send to vision API
-            logging.info("👁️ Analyzing with AI vision...")
-            headers = {"ngrok-skip-browser-warning": "true"}
-            response = requests.post(
-                f"{self.server_url}/vision",
-                json={
-                    "image": img_base64,
-                    "question": question
-                },
-                headers=headers,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                answer = result.get('answer', 'No response')
-                logging.info("✅ Vision analysis complete")
-                return answer
-            else:
-                logging.error(f"❌ Vision failed: {response.status_code}")
-                return "Vision analysis failed"
+            return self._ask(img_bytes, question)
                 
         except Exception as e:
             logging.error(f"❌ Vision error: {e}")
@@ -204,30 +203,8 @@ class RemoteVision:
             with open(image_path, 'rb') as f:
                 img_bytes = f.read()
             
-            # Encode to base64
-            img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-            
-            # Send to vision API
             logging.info(f"👁️ Analyzing image: {image_path}")
-            headers = {"ngrok-skip-browser-warning": "true"}
-            response = requests.post(
-                f"{self.server_url}/vision",
-                json={
-                    "image": img_base64,
-                    "question": question
-                },
-                headers=headers,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                answer = result.get('answer', 'No response')
-                logging.info("✅ Vision analysis complete")
-                return answer
-            else:
-                logging.error(f"❌ Vision failed: {response.status_code}")
-                return "Vision analysis failed"
+            return self._ask(img_bytes, question)
                 
         except Exception as e:
             logging.error(f"❌ Vision error: {e}")